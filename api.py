@@ -1,29 +1,92 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
-import google.generativeai as genai
 import json
 import re
 import time
 from datetime import datetime
-from linkedin_scrapper import scrape_candidates
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from starlette.concurrency import run_in_threadpool
+from linkedin_scrapper import scrape_candidates, pool_profile, PoolCache
+from rubric import incremental_breakdown, fit_score, TopK
+from candidate_parser import parse_candidate, parse_job
+from scoring import score_dimension
+from dedup import CandidateDeduplicator
+from candidate_store import CandidateStore
+import export
+from ranking import RankingConfig, build_reranker, rerank_shortlist
+import metrics
+from serialization import FastJSONResponse
+from shared_cache import load_cache, cache_key
+from single_flight import SingleFlight
+from profiling import profile_mode, profile_run, caches_bypassed
+from instrumentation import pipeline_timer, timed_stage, timed_llm_call, in_current_context
+from rate_limit import AdaptiveModel, LLM_CONCURRENCY
+from llm_backend import load_backend, estimate_tokens
+from jd_parser import parse_job_description, job_hash
+import llm_budget
 from dotenv import load_dotenv
 import os
+import logging
 
 load_dotenv()
 
-gemini_api_key = os.getenv("GEMINI_API_KEY")
+logging.basicConfig(level=logging.INFO)
 
-# Configure Gemini API
-genai.configure(api_key=gemini_api_key)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Gemini by default; SYNAPSE_LLM_BACKEND=fake swaps in the offline stand-in.
+# Calls share the process-wide adaptive concurrency limit (see rate_limit.py)
+model = AdaptiveModel(load_backend("gemini-1.5-flash"), LLM_CONCURRENCY)
+
+# Shared by every worker process, so a job computed by one is a hit on all (see shared_cache.py)
+shared_cache = load_cache()
+SOURCING_CACHE_TTL = float(os.getenv("SYNAPSE_SOURCING_CACHE_TTL", "3600"))
+LLM_CACHE_TTL = float(os.getenv("SYNAPSE_LLM_CACHE_TTL", "86400"))
+# Output tokens reserved per outreach message: about 200 words, or 120 for the short prompt
+OUTREACH_OUTPUT_TOKENS = {"full": 300, "short": 160}
+
+# Every run's results are kept, so past jobs can be paged through without re-sourcing
+store = CandidateStore(os.getenv("SYNAPSE_CANDIDATES_DB", "candidates.db"))
+
+# Optional second ranking stage over the rubric shortlist (see ranking.py)
+ranking_config = RankingConfig.from_env()
+reranker = build_reranker(ranking_config, model)
+
+# Responses smaller than this are sent uncompressed
+GZIP_MINIMUM_SIZE = int(os.getenv("SYNAPSE_GZIP_MINIMUM_SIZE", "1000"))
 
 app = FastAPI(title="Synapse LinkedIn Sourcing Agent API", version="1.0.0")
+# Large candidate lists compress about 5x; clients opt in with Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests, time them and track how many are in flight"""
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        # Label by route template, not raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.REQUEST_LATENCY.labels(request.method, path).observe(time.perf_counter() - start)
+        metrics.REQUESTS.labels(request.method, path, status).inc()
 
 class JobRequest(BaseModel):
     job_description: str
+    top_k: int = Field(20, ge=1, le=5000)
+    num_candidates: int = Field(100, ge=1, le=100_000)
 
 class CandidateResponse(BaseModel):
+    candidate_id: str
     name: str
     linkedin_url: str
     headline: str
@@ -34,187 +97,142 @@ class CandidateResponse(BaseModel):
     company: str
     fit_score: float
     score_breakdown: Dict[str, float]
+    rerank_score: Optional[float] = None
+    final_score: Optional[float] = None
     outreach_message: str
 
+# Candidate fields copied into each response entry, in CandidateResponse order
+RESPONSE_FIELDS = tuple(field for field in CandidateResponse.model_fields if field != "outreach_message")
+
 class SourcingResponse(BaseModel):
     job_id: str
     candidates_found: int
     total_candidates_scored: int
     top_candidates: List[CandidateResponse]
+    timings: Optional[Dict[str, Any]] = None
+    usage: Optional[Dict[str, Any]] = None
+    profile: Optional[Dict[str, Any]] = None
+
+class StoredCandidate(BaseModel):
+    candidate_id: str
+    name: Optional[str] = None
+    linkedin_url: Optional[str] = None
+    headline: Optional[str] = None
+    location: Optional[str] = None
+    experience: Optional[str] = None
+    education: Optional[str] = None
+    skills: Optional[str] = None
+    company: Optional[str] = None
+    fit_score: float
+    score_breakdown: Dict[str, float]
+    outreach_message: str
+    scored_at: str
+
+class CandidatePage(BaseModel):
+    job_id: str
+    job_hash: str
+    candidates: List[StoredCandidate]
+    next_cursor: Optional[str] = None
+
+class JobScore(BaseModel):
+    job_id: Optional[str] = None
+    job_hash: str
+    job_description: Optional[str] = None
+    fit_score: float
+    score_breakdown: Dict[str, float]
+    outreach_message: str
+    scored_at: str
+
+class ScoreHistoryPage(BaseModel):
+    candidate_id: str
+    scores: List[JobScore]
+    next_cursor: Optional[str] = None
 
 class LinkedInSourcingAgent:
     def __init__(self):
-        pass
+        self.candidate_pools = PoolCache()  # (pool profile, size) -> parsed candidates, LRU
+        # Backed by the store, so a person keeps one candidate_id across jobs
+        self.deduplicator = CandidateDeduplicator(store)
     
-    def search_linkedin(self, job_description: str) -> List[Dict[str, Any]]:
+    def search_linkedin(self, job_description: str, num_candidates: int = 100) -> List[Dict[str, Any]]:
         """Search for LinkedIn profiles based on job description"""
+        # Job description edits that keep the same pool profile reuse the pool,
+        # along with the job-independent scores cached on its candidates
+        profile = (pool_profile(job_description), num_candidates)
+        # Profiled runs generate the pool again, so the profile shows that work
+        cached = None if caches_bypassed() else self.candidate_pools.get(profile)
+        metrics.record_cache("candidate_pool", cached is not None)
+        if cached is not None:
+            return cached
+        
+        with timed_stage("generate", items=num_candidates):
+            # Use the fake dataset instead of Gemini
+            candidates = scrape_candidates(job_description, num_candidates=num_candidates)
+            
+            # Parse profile strings into typed scoring fields once, at ingest
+            candidates = [parse_candidate(candidate) for candidate in candidates]
         
-        # Use the fake dataset instead of Gemini
-        candidates = scrape_candidates(job_description, num_candidates=100)
+        with timed_stage("dedupe", items=len(candidates)):
+            # Collapse repeated people before paying to score them
+            candidates = self.deduplicator.dedupe(candidates)
         
         # Add some delay to simulate processing
         time.sleep(1)
         
+        self.candidate_pools.put(profile, candidates)
         return candidates  # Return all candidates for scoring
     
-    def score_candidates(self, candidates: List[Dict[str, Any]], job_description: str) -> List[Dict[str, Any]]:
+    def score_candidates(self, candidates: List[Dict[str, Any]], job_description: str, top_k: int = 20) -> List[Dict[str, Any]]:
         """Score candidates using the fit score algorithm"""
         
-        scored_candidates = []
-        for candidate in candidates:
-            score_breakdown = self.calculate_fit_score(candidate, job_description)
-            total_score = sum(score_breakdown.values()) / len(score_breakdown)
-            
-            scored_candidate = {
-                **candidate,
-                "fit_score": round(total_score, 1),
-                "score_breakdown": score_breakdown
-            }
-            scored_candidates.append(scored_candidate)
-        
-        # Sort by fit score (highest first)
-        scored_candidates.sort(key=lambda x: x["fit_score"], reverse=True)
-        
-        # Return top 20 candidates
-        return scored_candidates[:20]
+        top = TopK(top_k)
+        pruned = 0
+        with timed_stage("score", items=len(candidates)):
+            for candidate in candidates:
+                # Scoring stops early once a candidate can't beat the current K-th best
+                score_breakdown = self.calculate_fit_score(candidate, job_description, threshold=top.threshold)
+                if score_breakdown is None:
+                    pruned += 1
+                    continue
+                
+                scored_candidate = {
+                    **candidate,
+                    "fit_score": fit_score(score_breakdown),
+                    "score_breakdown": score_breakdown
+                }
+                top.push(scored_candidate["fit_score"], scored_candidate)
+        
+        metrics.CANDIDATES_PRUNED.inc(pruned)
+        
+        # Return top K candidates, highest fit score first
+        with timed_stage("rank", items=len(top.heap)):
+            return top.items()
     
-    def calculate_fit_score(self, candidate: Dict[str, Any], job_description: str) -> Dict[str, float]:
-        """Calculate fit score using the provided rubric"""
-        breakdown = {}
+    def calculate_fit_score(self, candidate: Dict[str, Any], job_description: str, threshold: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Calculate fit score using the provided rubric (None if it can't beat threshold)"""
+        candidate = parse_candidate(candidate)
+        job = parse_job(job_description)
         
-        # Education (20%)
-        education_score = self.score_education(candidate.get("education", ""))
-        breakdown["education"] = education_score
-        
-        # Career Trajectory (20%)
-        trajectory_score = self.score_trajectory(candidate.get("experience", ""))
-        breakdown["trajectory"] = trajectory_score
-        
-        # Company Relevance (15%)
-        company_score = self.score_company(candidate.get("company", ""), job_description)
-        breakdown["company"] = company_score
-        
-        # Experience Match (25%)
-        experience_score = self.score_experience(candidate.get("skills", ""), job_description)
-        breakdown["skills"] = experience_score
-        
-        # Location Match (10%)
-        location_score = self.score_location(candidate.get("location", ""), job_description)
-        breakdown["location"] = location_score
-        
-        # Tenure (10%)
-        tenure_score = self.score_tenure(candidate.get("tenure", ""))
-        breakdown["tenure"] = tenure_score
-        
-        return breakdown
-    
-    def score_education(self, education: str) -> float:
-        """Score education based on school prestige"""
-        elite_schools = ["stanford", "mit", "harvard", "berkeley", "cmu", "caltech", "princeton", "yale"]
-        strong_schools = ["ucla", "usc", "nyu", "columbia", "cornell", "georgia tech", "michigan", "illinois", "ut austin"]
-        
-        education_lower = education.lower()
-        
-        for school in elite_schools:
-            if school in education_lower:
-                return 9.5
-        
-        for school in strong_schools:
-            if school in education_lower:
-                return 7.5
-        
-        return 6.0
-    
-    def score_trajectory(self, experience: str) -> float:
-        """Score career trajectory"""
-        try:
-            years = int(re.findall(r'\d+', experience)[0])
-            if years >= 5:
-                return 8.0
-            elif years >= 3:
-                return 7.0
-            elif years >= 1:
-                return 6.0
-            else:
-                return 4.0
-        except:
-            return 5.0
-    
-    def score_company(self, company: str, job_description: str) -> float:
-        """Score company relevance"""
-        top_companies = ["google", "microsoft", "apple", "amazon", "meta", "netflix", "airbnb", "uber", "openai", "anthropic", "stripe", "palantir", "databricks"]
-        relevant_companies = ["salesforce", "adobe", "oracle", "intel", "nvidia", "amd", "cisco", "vmware", "splunk", "mongodb", "datadog", "snowflake", "twilio"]
-        
-        company_lower = company.lower()
-        
-        for top_company in top_companies:
-            if top_company in company_lower:
-                return 9.0
-        
-        for relevant_company in relevant_companies:
-            if relevant_company in company_lower:
-                return 7.5
-        
-        # Check if company is in same industry
-        if "ai" in company_lower or "tech" in company_lower:
-            return 7.0
-        
-        return 6.0
-    
-    def score_experience(self, skills: str, job_description: str) -> float:
-        """Score experience/skills match"""
-        job_lower = job_description.lower()
-        skills_lower = skills.lower()
-        
-        # Count matching skills
-        relevant_terms = ["python", "machine learning", "ai", "ml", "tensorflow", "pytorch", "deep learning", "llm", "code generation", "neural networks", "scikit-learn"]
-        matches = sum(1 for term in relevant_terms if term in skills_lower and term in job_lower)
-        
-        if matches >= 3:
-            return 9.0
-        elif matches >= 2:
-            return 7.5
-        elif matches >= 1:
-            return 6.0
-        else:
-            return 4.0
-    
-    def score_location(self, location: str, job_description: str) -> float:
-        """Score location match"""
-        job_lower = job_description.lower()
-        location_lower = location.lower()
-        
-        if "mountain view" in job_lower and "mountain view" in location_lower:
-            return 10.0
-        elif "california" in job_lower and "california" in location_lower:
-            return 8.0
-        elif "remote" in job_lower:
-            return 6.0
-        else:
-            return 4.0
-    
-    def score_tenure(self, tenure: str) -> float:
-        """Score tenure at current role"""
-        try:
-            years = int(re.findall(r'\d+', tenure)[0])
-            if 2 <= years <= 4:
-                return 9.0
-            elif 1 <= years < 2:
-                return 7.0
-            elif years >= 5:
-                return 6.0
-            else:
-                return 4.0
-        except:
-            return 5.0
+        # Only dimensions whose inputs changed since the candidate was last scored are recomputed
+        return incremental_breakdown(candidate, job, score_dimension, threshold)
     
     def generate_outreach(self, scored_candidates: List[Dict[str, Any]], job_description: str) -> List[Dict[str, Any]]:
         """Generate personalized outreach messages"""
         
+        outreach_targets = scored_candidates[:10]  # Generate outreach for top 10
+        with timed_stage("outreach", items=len(outreach_targets)):
+            # Budget is reserved in rank order, so the best candidates get the fullest messages
+            plans = [self.plan_outreach(candidate, job_description) for candidate in outreach_targets]
+            # Messages are written concurrently; the adaptive limiter decides how many calls actually run at once
+            with ThreadPoolExecutor(max_workers=max(1, len(outreach_targets))) as executor:
+                futures = [
+                    executor.submit(in_current_context(self.create_personalized_message), candidate, job_description, detail, reservation)
+                    for candidate, (detail, reservation) in zip(outreach_targets, plans)
+                ]
+                messages = [future.result() for future in futures]
+        
         outreach_candidates = []
-        for candidate in scored_candidates[:10]:  # Generate outreach for top 10
-            message = self.create_personalized_message(candidate, job_description)
-            
+        for candidate, message in zip(outreach_targets, messages):
             outreach_candidate = {
                 **candidate,
                 "outreach_message": message
@@ -223,9 +241,44 @@ class LinkedInSourcingAgent:
         
         return outreach_candidates
     
-    def create_personalized_message(self, candidate: Dict[str, Any], job_description: str) -> str:
-        """Create personalized LinkedIn message"""
-        prompt = f"""
+    def plan_outreach(self, candidate: Dict[str, Any], job_description: str):
+        """
+        Pick the most detailed message the token budget still allows.
+        
+        Returns (detail, reservation): "full" or "short" with the tokens set
+        aside for the call, or "template" with None when even the short
+        prompt would overrun the budget.
+        """
+        for detail in ("full", "short"):
+            prompt = self.outreach_prompt(candidate, job_description, detail)
+            # A cached message costs nothing, so it needs no reservation
+            if not caches_bypassed() and shared_cache.get("llm", cache_key(model.name, prompt)) is not None:
+                return detail, None
+            reservation = llm_budget.reserve(estimate_tokens(prompt), OUTREACH_OUTPUT_TOKENS[detail])
+            if reservation is not None:
+                if detail != "full":
+                    llm_budget.record_degradation("outreach", detail)
+                return detail, reservation
+        llm_budget.record_degradation("outreach", "template")
+        return "template", None
+    
+    def outreach_prompt(self, candidate: Dict[str, Any], job_description: str, detail: str = "full") -> str:
+        """Outreach prompt; the short one summarizes the job instead of quoting all of it"""
+        if detail == "short":
+            job = parse_job_description(job_description)
+            job_summary = job["title"]
+            if job["company"]:
+                job_summary += f" at {job['company']}"
+            if job["location"]:
+                job_summary += f" in {job['location']}"
+            if job["skills"]:
+                job_summary += f", needing {job['skills']}"
+            return f"""
+        Write a LinkedIn outreach message under 120 words to {candidate['name']} ({candidate['headline']}, {candidate['company']}) about this role: {job_summary}
+        
+        Mention one of their skills ({candidate['skills']}), keep a professional tone and end with a call to action. Start with "Hi [Name],"
+        """
+        return f"""
         Create a personalized LinkedIn outreach message for this candidate:
         
         Candidate: {candidate['name']}
@@ -246,83 +299,231 @@ class LinkedInSourcingAgent:
         
         Start with "Hi [Name],"
         """
-        
+    
+    def template_message(self, candidate: Dict[str, Any], job_description: str) -> str:
+        """Outreach written without the model"""
+        return f"Hi {candidate['name']}, I noticed your impressive background in {candidate['skills']} at {candidate['company']}. Your experience aligns perfectly with our {job_description[:50]}... role. Would you be interested in discussing this opportunity?"
+    
+    def create_personalized_message(self, candidate: Dict[str, Any], job_description: str, detail: str = "full",
+                                    reservation: Optional[llm_budget.Reservation] = None) -> str:
+        """Create personalized LinkedIn message at the detail plan_outreach chose"""
         try:
-            response = model.generate_content(prompt)
-            return response.text.strip()
-        except:
-            return f"Hi {candidate['name']}, I noticed your impressive background in {candidate['skills']} at {candidate['company']}. Your experience aligns perfectly with our {job_description[:50]}... role. Would you be interested in discussing this opportunity?"
+            if detail == "template":
+                return self.template_message(candidate, job_description)
+            prompt = self.outreach_prompt(candidate, job_description, detail)
+            
+            # Identical prompts (same candidate, same job) reuse the message any worker generated
+            key = cache_key(model.name, prompt)
+            message = None if caches_bypassed() else shared_cache.get("llm", key)
+            metrics.record_cache("llm", message is not None)
+            if message is not None:
+                return message
+            
+            try:
+                with timed_llm_call():
+                    response = model.generate_content(prompt)
+                message = response.text.strip()
+                shared_cache.set("llm", key, message, LLM_CACHE_TTL)
+                return message
+            except:
+                metrics.LLM_FALLBACKS.labels("outreach").inc()
+                return self.template_message(candidate, job_description)
+        finally:
+            if reservation is not None:
+                reservation.release()
 
 # Initialize the agent
 agent = LinkedInSourcingAgent()
 
+# In-flight /sourcing computations, keyed like the sourcing cache
+sourcing_flights = SingleFlight("sourcing")
+
 @app.get("/")
 async def root():
     return {"message": "Synapse LinkedIn Sourcing Agent API", "version": "1.0.0"}
 
-@app.post("/sourcing", response_model=SourcingResponse)
-async def source_candidates(request: JobRequest):
+@app.post("/sourcing", response_model=SourcingResponse, response_class=FastJSONResponse)
+async def source_candidates(request: JobRequest, x_profile: Optional[str] = Header(None, description="cprofile or pyinstrument to profile this request")):
     """
     Source LinkedIn candidates for a job description.
     
-    Scores all candidates and returns top 20 with fit scores and personalized outreach messages.
+    Scores all candidates and returns the top K (20 by default) with fit scores; the top 10 get personalized outreach messages.
     """
+    # Every input that shapes the response is part of the key
+    key = cache_key(request.job_description.strip(), request.top_k, request.num_candidates,
+                    ranking_config.reranker, ranking_config.shortlist_size, ranking_config.rerank_weight)
+    
     try:
-        # Step 1: Search for candidates
-        candidates = agent.search_linkedin(request.job_description)
-        
-        if not candidates:
-            raise HTTPException(status_code=404, detail="No candidates found")
-        
-        # Step 2: Score all candidates and get top 20
-        scored_candidates = agent.score_candidates(candidates, request.job_description)
-        
-        # Step 3: Generate outreach for top 10
-        final_candidates = agent.generate_outreach(scored_candidates, request.job_description)
-        
-        # Convert to response format
-        candidate_responses = []
-        for candidate in scored_candidates:  # Include all top 20 candidates
-            # Check if outreach message exists (only for top 10)
-            outreach_message = ""
-            for final_candidate in final_candidates:
-                if final_candidate["name"] == candidate["name"]:
-                    outreach_message = final_candidate["outreach_message"]
-                    break
+        profiler = profile_mode(x_profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    if profiler is not None:
+        # A profiled request has to do the work, so it skips the response cache and
+        # coalescing here, and the pool and LLM caches inside the pipeline
+        response = await run_in_threadpool(run_sourcing_pipeline, request, key, profiler)
+        return FastJSONResponse(response)
+    
+    cached = shared_cache.get("sourcing", key)
+    metrics.record_cache("sourcing", cached is not None)
+    if cached is not None:
+        return FastJSONResponse(cached)
+    
+    # Identical requests arriving while this one runs await its result instead of recomputing it
+    response = await sourcing_flights.run(key, lambda: run_sourcing_pipeline(request, key))
+    return FastJSONResponse(response)
+
+def run_sourcing_pipeline(request: JobRequest, key: str, profiler: Optional[str] = None) -> Dict[str, Any]:
+    """Search, score, re-rank and write outreach for one request; runs in the thread pool"""
+    # The random suffix keeps runs of the same job started in the same second apart
+    job_id = f"job_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{job_hash(request.job_description)[:8]}_{uuid.uuid4().hex[:8]}"
+    # Only profiled on request (see profiling.py)
+    profiling = profile_run(job_id, profiler) if profiler else nullcontext()
+    try:
+        # Every LLM call below is charged to this job's token and cost budget
+        with profiling as profile, pipeline_timer("sourcing") as timer, llm_budget.job_budget() as budget:
+            # Step 1: Search for candidates
+            candidates = agent.search_linkedin(request.job_description, request.num_candidates)
             
-            candidate_response = CandidateResponse(
-                name=candidate["name"],
-                linkedin_url=candidate["linkedin_url"],
-                headline=candidate["headline"],
-                location=candidate["location"],
-                experience=candidate["experience"],
-                education=candidate["education"],
-                skills=candidate["skills"],
-                company=candidate["company"],
-                fit_score=candidate["fit_score"],
-                score_breakdown=candidate["score_breakdown"],
-                outreach_message=outreach_message
-            )
-            candidate_responses.append(candidate_response)
-        
-        # Create response
-        job_id = f"job_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        response = SourcingResponse(
-            job_id=job_id,
-            candidates_found=len(candidate_responses),
-            total_candidates_scored=len(candidates),
-            top_candidates=candidate_responses
-        )
+            if not candidates:
+                raise HTTPException(status_code=404, detail="No candidates found")
+            
+            # Step 2: Score all candidates, keeping enough for the re-ranking shortlist
+            ranked = agent.score_candidates(candidates, request.job_description, top_k=max(request.top_k, ranking_config.shortlist_size))
+            
+            # Step 2b: Re-rank the shortlist with the expensive scorer, if any, and keep the top K
+            scored_candidates = rerank_shortlist(ranked, request.job_description, reranker, ranking_config)[:request.top_k]
+            
+            # Step 3: Generate outreach for top 10
+            final_candidates = agent.generate_outreach(scored_candidates, request.job_description)
+            
+            # Convert to response format
+            with timed_stage("respond", items=len(scored_candidates)):
+                # Outreach exists only for the top 10; join on candidate_id, since names repeat
+                outreach_messages = {final_candidate["candidate_id"]: final_candidate["outreach_message"] for final_candidate in final_candidates}
+                # Candidates are already validated plain data, so they are serialized
+                # directly instead of building and validating a model per candidate
+                candidate_responses = []
+                for candidate in scored_candidates:  # Include all top K candidates
+                    candidate_response = {field: candidate.get(field) for field in RESPONSE_FIELDS}
+                    candidate_response["outreach_message"] = outreach_messages.get(candidate["candidate_id"], "")
+                    candidate_responses.append(candidate_response)
+            
+            # Step 4: Keep the results for the history endpoints
+            with timed_stage("persist", items=len(scored_candidates)):
+                store.save_candidates(
+                    [{**candidate, "outreach_message": outreach_messages.get(candidate["candidate_id"], "")} for candidate in scored_candidates],
+                    request.job_description, job_id, len(candidates)
+                )
+            
+            # Create response
+            response = {
+                "job_id": job_id,
+                "candidates_found": len(candidate_responses),
+                "total_candidates_scored": len(candidates),
+                "top_candidates": candidate_responses,
+            }
         
+        # Expose where the time and tokens went for this request
+        response["timings"] = timer.summary()
+        response["usage"] = budget.summary()
+        shared_cache.set("sourcing", key, response, SOURCING_CACHE_TTL)
+        if profile is not None:
+            # Added after caching, since the files belong to this request only
+            profile.save_summary({"timings": response["timings"], "usage": response["usage"]})
+            response["profile"] = profile.summary()
         return response
-        
+    
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
+@app.get("/jobs/{job_id}/candidates", response_model=CandidatePage, response_class=FastJSONResponse)
+def job_candidates(
+    job_id: str,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Fit score order"),
+    min_education: Optional[float] = None,
+    min_trajectory: Optional[float] = None,
+    min_company: Optional[float] = None,
+    min_skills: Optional[float] = None,
+    min_location: Optional[float] = None,
+    min_tenure: Optional[float] = None,
+):
+    """
+    Page through a past job's scored candidates without re-sourcing.
+    
+    job_id is the one /sourcing returned, for exactly the candidates that run
+    returned, or a job description hash, for the latest score of every
+    candidate sourced for it. Pages follow each other through next_cursor;
+    the min_* parameters keep only candidates scoring at least that much on
+    a breakdown dimension.
+    """
+    description_hash = store.resolve_job(job_id)
+    if description_hash is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    
+    minimums = {
+        "education": min_education, "trajectory": min_trajectory, "company": min_company,
+        "skills": min_skills, "location": min_location, "tenure": min_tenure,
+    }
+    try:
+        candidates, next_cursor = store.job_candidates(
+            job_id, limit, cursor, ascending=order == "asc",
+            min_scores={dimension: minimum for dimension, minimum in minimums.items() if minimum is not None}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"job_id": job_id, "job_hash": description_hash, "candidates": candidates, "next_cursor": next_cursor})
+
+@app.get("/candidates/{candidate_id}/scores", response_model=ScoreHistoryPage, response_class=FastJSONResponse)
+def candidate_scores(
+    candidate_id: str,
+    limit: int = Query(50, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    """A candidate's scores across every job they were sourced for, most recent first"""
+    try:
+        scores, next_cursor = store.candidate_history(candidate_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not scores and cursor is None:
+        raise HTTPException(status_code=404, detail=f"Unknown candidate: {candidate_id}")
+    return FastJSONResponse({"candidate_id": candidate_id, "scores": scores, "next_cursor": next_cursor})
+
+@app.get("/jobs/{job_id}/export")
+def export_job(
+    job_id: str,
+    format: str = Query("csv", pattern="^(csv|jsonl|parquet)$"),
+    chunk_size: int = Query(export.DEFAULT_CHUNK_SIZE, ge=1, le=50_000),
+):
+    """
+    Download every saved candidate of a past job as CSV, JSONL or Parquet.
+    
+    The file is streamed a chunk of rows at a time straight from the store,
+    so exports of any size use constant memory. Parquet needs pyarrow.
+    """
+    if store.resolve_job(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    try:
+        chunks = export.stream_export(store, job_id, format, chunk_size)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    _, media_type, extension = export.FORMATS[format]
+    return StreamingResponse(chunks, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="{job_id}.{extension}"'
+    })
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
@@ -1,117 +1,140 @@
 import streamlit as st
-import google.generativeai as genai
 import pandas as pd
 import requests
 import json
 import re
-import time
-import sqlite3
+import math
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 import os
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm_backend import load_backend, iter_json_objects, estimate_tokens
 from dotenv import load_dotenv
+from candidate_parser import parse_candidate, parse_job, display_fields
+import scoring
+from rubric import incremental_breakdown
+from dedup import CandidateDeduplicator
+from candidate_store import CandidateStore
+from jd_parser import JobDescriptionParser, parse_job_description
+from rate_limit import LLM_RATE_LIMITER, AdaptiveModel, LLM_CONCURRENCY
+from shared_cache import load_cache
+from instrumentation import in_current_context
+import llm_budget
 
 load_dotenv()
 
-gemini_api_key = os.getenv("GEMINI_API_KEY")
+# Gemini by default; SYNAPSE_LLM_BACKEND=fake swaps in the offline stand-in.
+# Calls, retries included, share the process-wide adaptive concurrency limit
+# and requests-per-minute token bucket (see rate_limit.py)
+model = AdaptiveModel(load_backend("gemini-1.5-flash"), LLM_CONCURRENCY, LLM_RATE_LIMITER)
 
-# Configure Gemini API
-genai.configure(api_key=gemini_api_key)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Enriched job profiles are shared with other processes (see shared_cache.py)
+shared_cache = load_cache()
+
+# Profiles requested from the model per search query
+PROFILES_PER_QUERY = 5
+MAX_QUERIES = 20
+MAX_PARALLEL_QUERIES = 8
+
+# Tokens reserved per profile query (prompt on top of the job description, five profiles out)
+# and per outreach message (about 200 words, or 120 for the short prompt)
+PROFILE_PROMPT_TOKENS = 120
+PROFILE_OUTPUT_TOKENS = 600
+OUTREACH_OUTPUT_TOKENS = {"full": 300, "short": 160}
 
 class LinkedInSourcingAgent:
-    def __init__(self):
-        self.db_path = "candidates.db"
-        self.init_database()
-        
-    def init_database(self):
-        """Initialize SQLite database for caching"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS candidates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                linkedin_url TEXT UNIQUE,
-                headline TEXT,
-                location TEXT,
-                experience TEXT,
-                education TEXT,
-                skills TEXT,
-                company TEXT,
-                job_description TEXT,
-                fit_score REAL,
-                score_breakdown TEXT,
-                outreach_message TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    def __init__(self, store: CandidateStore):
+        self.store = store
+        # Backed by the store, so a person keeps one candidate_id across jobs
+        self.deduplicator = CandidateDeduplicator(store)
+        self.jd_parser = JobDescriptionParser(model, shared_cache=shared_cache)
     
-    def search_linkedin(self, job_description: str) -> List[Dict[str, Any]]:
+    def search_linkedin(self, job_description: str, pool_size: int = 20) -> List[Dict[str, Any]]:
         """Search for LinkedIn profiles based on job description"""
         st.info("🔍 Searching LinkedIn profiles...")
         
         # Extract key terms from job description
         search_terms = self.extract_search_terms(job_description)
         
-        # Generate search queries
-        search_queries = self.generate_search_queries(search_terms)
-        
-        candidates = []
-        for query in search_queries[:3]:  # Limit to 3 queries for demo
-            try:
-                # Use Gemini to generate realistic LinkedIn profiles
-                profiles = self.generate_profiles_with_gemini(query, job_description)
-                candidates.extend(profiles)
-                time.sleep(1)  # Rate limiting
-            except Exception as e:
-                st.error(f"Error searching with query '{query}': {str(e)}")
-        
-        return candidates[:20]  # Return top 20 candidates
+        # Enough queries to fill the pool; each returns PROFILES_PER_QUERY profiles
+        query_count = min(MAX_QUERIES, math.ceil(pool_size / PROFILES_PER_QUERY))
+        search_queries = self.generate_search_queries(search_terms, query_count)
+        
+        # Queries are budgeted in order, most specific first; the rest are dropped once the job runs out of tokens
+        reservations = []
+        for query in search_queries:
+            reservation = llm_budget.reserve(estimate_tokens(job_description) + PROFILE_PROMPT_TOKENS, PROFILE_OUTPUT_TOKENS)
+            if reservation is None:
+                llm_budget.record_degradation("profiles", "skipped")
+                continue
+            reservations.append((query, reservation))
+        
+        # Queries run concurrently, paced by the shared LLM rate limiter rather than fixed sleeps
+        candidates, seen = [], set()
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_QUERIES, len(reservations)) or 1) as executor:
+            futures = {
+                executor.submit(in_current_context(self.source_query), query, job_description, reservation): query
+                for query, reservation in reservations
+            }
+            for future in as_completed(futures):
+                try:
+                    profiles = future.result()
+                except Exception as e:
+                    st.error(f"Error searching with query '{futures[future]}': {str(e)}")
+                    continue
+                # Queries overlap, so the same person often comes back more than once
+                candidates.extend(self.deduplicator.dedupe(profiles, seen))
+        
+        return candidates[:pool_size]
     
     def extract_search_terms(self, job_description: str) -> Dict[str, str]:
         """Extract key terms from job description"""
-        prompt = f"""
-        Extract key information from this job description:
-        {job_description}
-        
-        Return as JSON with these fields:
-        - title: job title
-        - skills: key technical skills
-        - location: preferred location
-        - company: company name
-        - experience: required experience level
-        """
-        
-        try:
-            response = model.generate_content(prompt)
-            return json.loads(response.text)
-        except:
-            # Fallback extraction
-            return {
-                "title": "Software Engineer",
-                "skills": "Python, Machine Learning",
-                "location": "Mountain View",
-                "company": "Windsurf",
-                "experience": "Senior"
-            }
+        # Parsed locally; a model only enriches the terms in the background, if enabled
+        return self.jd_parser.search_terms(job_description)
     
-    def generate_search_queries(self, search_terms: Dict[str, str]) -> List[str]:
-        """Generate search queries for LinkedIn"""
+    def generate_search_queries(self, search_terms: Dict[str, str], count: int = 3) -> List[str]:
+        """Generate up to count distinct search queries for LinkedIn"""
+        skills = [skill.strip() for skill in search_terms.get("skills", "").split(",") if skill.strip()]
+        
+        # Basic queries first, then one title and one location query per individual skill
+        combinations = [
+            (search_terms.get("title"), search_terms.get("skills"), search_terms.get("location")),
+            (search_terms.get("title"), search_terms.get("company")),
+            (search_terms.get("skills"), search_terms.get("location")),
+        ]
+        for skill in skills:
+            combinations.append((search_terms.get("title"), skill))
+            combinations.append((skill, search_terms.get("location")))
+        
+        # Skip terms the job description didn't mention, and repeated queries
         queries = []
-        
-        # Basic queries
-        queries.append(f'"{search_terms["title"]}" "{search_terms["skills"]}" "{search_terms["location"]}"')
-        queries.append(f'"{search_terms["title"]}" "{search_terms["company"]}"')
-        queries.append(f'"{search_terms["skills"]}" "{search_terms["location"]}"')
+        for terms in combinations:
+            query = " ".join(f'"{term}"' for term in terms if term)
+            if query and query not in queries:
+                queries.append(query)
+            if len(queries) >= count:
+                break
         
         return queries
     
-    def generate_profiles_with_gemini(self, search_query: str, job_description: str) -> List[Dict[str, Any]]:
-        """Generate realistic LinkedIn profiles using Gemini"""
+    def source_query(self, search_query: str, job_description: str, reservation: Optional[llm_budget.Reservation] = None) -> List[Dict[str, Any]]:
+        """Generate profiles for one query, parsing and scoring each one as soon as it streams in"""
+        candidates = []
+        try:
+            for profile in self.generate_profiles_with_gemini(search_query, job_description):
+                # Parse profile strings into typed scoring fields once, at ingest
+                candidate = parse_candidate(profile)
+                # Caches the dimension scores on the candidate, so score_candidates only looks them up
+                self.calculate_fit_score(candidate, job_description)
+                candidates.append(candidate)
+        finally:
+            if reservation is not None:
+                reservation.release()
+        return candidates
+    
+    def generate_profiles_with_gemini(self, search_query: str, job_description: str) -> Iterator[Dict[str, Any]]:
+        """Generate realistic LinkedIn profiles using Gemini, yielding each one as soon as it is complete"""
         prompt = f"""
         Based on this search query: "{search_query}"
         And this job description: "{job_description}"
@@ -130,24 +153,29 @@ class LinkedInSourcingAgent:
         Return as a JSON array of objects.
         """
         
+        profiles = 0
         try:
-            response = model.generate_content(prompt)
-            profiles = json.loads(response.text)
-            return profiles
-        except:
+            response = model.generate_content(prompt, stream=True)
+            # Objects are parsed as they complete; a broken one doesn't discard the rest
+            for profile in iter_json_objects(chunk.text for chunk in response):
+                if isinstance(profile, dict) and profile.get("name"):
+                    profiles += 1
+                    yield profile
+        except Exception:
+            pass
+        
+        if not profiles:
             # Fallback profiles
-            return [
-                {
-                    "name": "Sarah Chen",
-                    "linkedin_url": "linkedin.com/in/sarah-chen-ml",
-                    "headline": "Senior ML Engineer at Google",
-                    "location": "Mountain View, CA",
-                    "experience": "6 years",
-                    "education": "Stanford University, MS Computer Science",
-                    "skills": "Python, TensorFlow, PyTorch, Machine Learning",
-                    "company": "Google"
-                }
-            ]
+            yield {
+                "name": "Sarah Chen",
+                "linkedin_url": "linkedin.com/in/sarah-chen-ml",
+                "headline": "Senior ML Engineer at Google",
+                "location": "Mountain View, CA",
+                "experience": "6 years",
+                "education": "Stanford University, MS Computer Science",
+                "skills": "Python, TensorFlow, PyTorch, Machine Learning",
+                "company": "Google"
+            }
     
     def score_candidates(self, candidates: List[Dict[str, Any]], job_description: str) -> List[Dict[str, Any]]:
         """Score candidates using the fit score algorithm"""
@@ -171,127 +199,18 @@ class LinkedInSourcingAgent:
     
     def calculate_fit_score(self, candidate: Dict[str, Any], job_description: str) -> Dict[str, float]:
         """Calculate fit score using the provided rubric"""
-        breakdown = {}
-        
-        # Education (20%)
-        education_score = self.score_education(candidate.get("education", ""))
-        breakdown["education"] = education_score
-        
-        # Career Trajectory (20%)
-        trajectory_score = self.score_trajectory(candidate.get("experience", ""))
-        breakdown["trajectory"] = trajectory_score
-        
-        # Company Relevance (15%)
-        company_score = self.score_company(candidate.get("company", ""), job_description)
-        breakdown["company"] = company_score
-        
-        # Experience Match (25%)
-        experience_score = self.score_experience(candidate.get("skills", ""), job_description)
-        breakdown["skills"] = experience_score
+        candidate = parse_candidate(candidate)
+        job = parse_job(job_description)
         
-        # Location Match (10%)
-        location_score = self.score_location(candidate.get("location", ""), job_description)
-        breakdown["location"] = location_score
-        
-        # Tenure (10%)
-        tenure_score = self.score_tenure(candidate.get("experience", ""))
-        breakdown["tenure"] = tenure_score
-        
-        return breakdown
+        # Dimension scores are cached on the candidate; only inputs that changed are rescored
+        return incremental_breakdown(candidate, job, self.score_dimension)
     
-    def score_education(self, education: str) -> float:
-        """Score education based on school prestige"""
-        elite_schools = ["stanford", "mit", "harvard", "berkeley", "cmu", "caltech"]
-        strong_schools = ["ucla", "usc", "nyu", "columbia", "cornell", "georgia tech"]
-        
-        education_lower = education.lower()
-        
-        for school in elite_schools:
-            if school in education_lower:
-                return 9.5
-        
-        for school in strong_schools:
-            if school in education_lower:
-                return 7.5
-        
-        return 6.0
-    
-    def score_trajectory(self, experience: str) -> float:
-        """Score career trajectory"""
-        try:
-            years = int(re.findall(r'\d+', experience)[0])
-            if years >= 5:
-                return 8.0
-            elif years >= 3:
-                return 7.0
-            elif years >= 1:
-                return 6.0
-            else:
-                return 4.0
-        except:
-            return 5.0
-    
-    def score_company(self, company: str, job_description: str) -> float:
-        """Score company relevance"""
-        top_companies = ["google", "microsoft", "apple", "amazon", "meta", "netflix", "airbnb", "uber"]
-        company_lower = company.lower()
-        
-        for top_company in top_companies:
-            if top_company in company_lower:
-                return 9.0
-        
-        # Check if company is in same industry
-        if "ai" in company_lower or "tech" in company_lower:
-            return 7.5
-        
-        return 6.0
-    
-    def score_experience(self, skills: str, job_description: str) -> float:
-        """Score experience/skills match"""
-        job_lower = job_description.lower()
-        skills_lower = skills.lower()
-        
-        # Count matching skills
-        relevant_terms = ["python", "machine learning", "ai", "ml", "tensorflow", "pytorch", "deep learning"]
-        matches = sum(1 for term in relevant_terms if term in skills_lower and term in job_lower)
-        
-        if matches >= 3:
-            return 9.0
-        elif matches >= 2:
-            return 7.5
-        elif matches >= 1:
-            return 6.0
-        else:
-            return 4.0
-    
-    def score_location(self, location: str, job_description: str) -> float:
-        """Score location match"""
-        job_lower = job_description.lower()
-        location_lower = location.lower()
-        
-        if "mountain view" in job_lower and "mountain view" in location_lower:
-            return 10.0
-        elif "california" in job_lower and "california" in location_lower:
-            return 8.0
-        elif "remote" in job_lower:
-            return 6.0
-        else:
-            return 4.0
-    
-    def score_tenure(self, experience: str) -> float:
-        """Score tenure at current role"""
-        try:
-            years = int(re.findall(r'\d+', experience)[0])
-            if 2 <= years <= 4:
-                return 9.0
-            elif 1 <= years < 2:
-                return 7.0
-            elif years >= 5:
-                return 6.0
-            else:
-                return 4.0
-        except:
-            return 5.0
+    def score_dimension(self, dimension: str, candidate: Dict[str, Any], job: Dict[str, Any]) -> float:
+        """Score a single rubric dimension for a parsed candidate (see scoring.py)"""
+        # Generated profiles have no tenure, so fall back to total experience
+        if dimension == "tenure" and candidate["tenure_months"] is None and candidate["experience_years"] is not None:
+            return scoring.score_tenure(candidate["experience_years"] * 12)
+        return scoring.score_dimension(dimension, candidate, job)
     
     def generate_outreach(self, scored_candidates: List[Dict[str, Any]], job_description: str) -> List[Dict[str, Any]]:
         """Generate personalized outreach messages"""
@@ -299,7 +218,8 @@ class LinkedInSourcingAgent:
         
         outreach_candidates = []
         for candidate in scored_candidates[:5]:  # Top 5 candidates
-            message = self.create_personalized_message(candidate, job_description)
+            detail, reservation = self.plan_outreach(candidate, job_description)
+            message = self.create_personalized_message(candidate, job_description, detail, reservation)
             
             outreach_candidate = {
                 **candidate,
@@ -309,9 +229,41 @@ class LinkedInSourcingAgent:
         
         return outreach_candidates
     
-    def create_personalized_message(self, candidate: Dict[str, Any], job_description: str) -> str:
-        """Create personalized LinkedIn message"""
-        prompt = f"""
+    def plan_outreach(self, candidate: Dict[str, Any], job_description: str):
+        """
+        Pick the most detailed message the token budget still allows.
+        
+        Returns (detail, reservation): "full" or "short" with the tokens set
+        aside for the call, or "template" with None when even the short
+        prompt would overrun the budget.
+        """
+        for detail in ("full", "short"):
+            prompt = self.outreach_prompt(candidate, job_description, detail)
+            reservation = llm_budget.reserve(estimate_tokens(prompt), OUTREACH_OUTPUT_TOKENS[detail])
+            if reservation is not None:
+                if detail != "full":
+                    llm_budget.record_degradation("outreach", detail)
+                return detail, reservation
+        llm_budget.record_degradation("outreach", "template")
+        return "template", None
+    
+    def outreach_prompt(self, candidate: Dict[str, Any], job_description: str, detail: str = "full") -> str:
+        """Outreach prompt; the short one summarizes the job instead of quoting all of it"""
+        if detail == "short":
+            job = parse_job_description(job_description)
+            job_summary = job["title"]
+            if job["company"]:
+                job_summary += f" at {job['company']}"
+            if job["location"]:
+                job_summary += f" in {job['location']}"
+            if job["skills"]:
+                job_summary += f", needing {job['skills']}"
+            return f"""
+        Write a LinkedIn outreach message under 120 words to {candidate['name']} ({candidate['headline']}, {candidate['company']}) about this role: {job_summary}
+        
+        Mention one of their skills ({candidate['skills']}), keep a professional tone and end with a call to action. Start with "Hi [Name],"
+        """
+        return f"""
         Create a personalized LinkedIn outreach message for this candidate:
         
         Candidate: {candidate['name']}
@@ -332,44 +284,39 @@ class LinkedInSourcingAgent:
         
         Start with "Hi [Name],"
         """
-        
+    
+    def template_message(self, candidate: Dict[str, Any], job_description: str) -> str:
+        """Outreach written without the model"""
+        return f"Hi {candidate['name']}, I noticed your impressive background in {candidate['skills']} at {candidate['company']}. Your experience aligns perfectly with our {job_description[:50]}... role. Would you be interested in discussing this opportunity?"
+    
+    def create_personalized_message(self, candidate: Dict[str, Any], job_description: str, detail: str = "full",
+                                    reservation: Optional[llm_budget.Reservation] = None) -> str:
+        """Create personalized LinkedIn message at the detail plan_outreach chose"""
         try:
-            response = model.generate_content(prompt)
-            return response.text.strip()
-        except:
-            return f"Hi {candidate['name']}, I noticed your impressive background in {candidate['skills']} at {candidate['company']}. Your experience aligns perfectly with our {job_description[:50]}... role. Would you be interested in discussing this opportunity?"
+            if detail == "template":
+                return self.template_message(candidate, job_description)
+            prompt = self.outreach_prompt(candidate, job_description, detail)
+            
+            try:
+                response = model.generate_content(prompt)
+                return response.text.strip()
+            except:
+                return self.template_message(candidate, job_description)
+        finally:
+            if reservation is not None:
+                reservation.release()
     
     def save_to_database(self, candidates: List[Dict[str, Any]], job_description: str):
         """Save candidates to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for candidate in candidates:
-            cursor.execute('''
-                INSERT OR REPLACE INTO candidates 
-                (name, linkedin_url, headline, location, experience, education, skills, company, 
-                 job_description, fit_score, score_breakdown, outreach_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                candidate.get('name', ''),
-                candidate.get('linkedin_url', ''),
-                candidate.get('headline', ''),
-                candidate.get('location', ''),
-                candidate.get('experience', ''),
-                candidate.get('education', ''),
-                candidate.get('skills', ''),
-                candidate.get('company', ''),
-                job_description,
-                candidate.get('fit_score', 0),
-                json.dumps(candidate.get('score_breakdown', {})),
-                candidate.get('outreach_message', '')
-            ))
-        
-        conn.commit()
-        conn.close()
+        self.store.save_candidates(candidates, job_description)
+
+@st.cache_resource
+def get_candidate_store() -> CandidateStore:
+    """Shared database connection, created once per server process"""
+    return CandidateStore("candidates.db")
 
 # Initialize the agent
-agent = LinkedInSourcingAgent()
+agent = LinkedInSourcingAgent(get_candidate_store())
 
 # Streamlit UI
 st.set_page_config(page_title="Synapse LinkedIn Sourcing Agent", layout="wide")
@@ -384,13 +331,15 @@ job_description = st.sidebar.text_area(
     height=200,
     placeholder="Paste the job description here..."
 )
+pool_size = st.sidebar.selectbox("Candidates to source", [20, 50, 100], index=0)
 
 # Main content
 if st.sidebar.button("🔍 Start Sourcing", type="primary"):
     if job_description:
-        with st.spinner("Processing..."):
+        # Every LLM call for this job is charged to its token and cost budget
+        with st.spinner("Processing..."), llm_budget.job_budget() as budget:
             # Step 1: Search for candidates
-            candidates = agent.search_linkedin(job_description)
+            candidates = agent.search_linkedin(job_description, pool_size)
             
             if candidates:
                 # Step 2: Score candidates
@@ -404,6 +353,10 @@ if st.sidebar.button("🔍 Start Sourcing", type="primary"):
                 
                 # Display results
                 st.success(f"✅ Found {len(final_candidates)} top candidates!")
+                usage = budget.summary()
+                st.caption(f"LLM tokens: {usage['total_tokens']:,} (${usage['cost_usd']:.4f})")
+                if usage["degraded"]:
+                    st.warning(f"Over the token budget, some calls were shortened or skipped: {usage['degraded']}")
                 
                 # Create tabs for different views
                 tab1, tab2, tab3 = st.tabs(["📊 Top Candidates", "📈 Score Breakdown", "💬 Outreach Messages"])
@@ -445,7 +398,7 @@ if st.sidebar.button("🔍 Start Sourcing", type="primary"):
                 # Export results
                 st.download_button(
                     label="📥 Download Results (JSON)",
-                    data=json.dumps(final_candidates, indent=2),
+                    data=json.dumps([display_fields(candidate) for candidate in final_candidates], indent=2),
                     file_name=f"candidates_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                     mime="application/json"
                 )
@@ -0,0 +1,221 @@
+"""
+Sourcing Pipeline Benchmarks
+Reproducible throughput, latency and peak memory measurements for fit
+scoring, persistence and the /sourcing endpoint, on seeded candidate pools.
+
+Usage:
+    python benchmark.py                                # 1k and 100k pools
+    python benchmark.py --sizes 1000 100000 1000000 --output bench.json
+    python benchmark.py --output new.json --compare old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Optional
+
+from linkedin_scrapper import scrape_candidates, get_sample_job_description
+from candidate_parser import parse_candidate, SCORE_CACHE_FIELD
+from candidate_store import CandidateStore
+from llm_backend import FakeModelBackend
+from rate_limit import AdaptiveModel, LLM_CONCURRENCY
+from shared_cache import NullCache
+
+DEFAULT_SIZES = [1_000, 100_000]
+SEED = 2025
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3, setup: Optional[Callable[[], Any]] = None, memory: bool = True) -> Dict[str, Any]:
+    """
+    Time fn over several runs and record its peak Python memory.
+
+    setup runs before every run and is not timed. Peak memory comes from one
+    extra run under tracemalloc so tracing overhead never skews the timings.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    result = {
+        "runs": repeat,
+        "best_seconds": round(min(times), 6),
+        "median_seconds": round(statistics.median(times), 6),
+    }
+    if memory:
+        if setup:
+            setup()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_memory_mb"] = round(peak / 2**20, 2)
+    return result
+
+
+def with_throughput(result: Dict[str, Any], items: int) -> Dict[str, Any]:
+    result["items"] = items
+    result["items_per_second"] = round(items / result["best_seconds"], 1) if result["best_seconds"] else None
+    result["mean_latency_us"] = round(result["best_seconds"] / items * 1e6, 3) if items else None
+    return result
+
+
+def bench_pool(agent, job_description: str, size: int, repeat: int, memory: bool) -> List[Dict[str, Any]]:
+    """Benchmark generation, parsing, scoring and persistence on one seeded pool"""
+    results = []
+
+    def record(name: str, result: Dict[str, Any], items: int):
+        result = with_throughput(result, items)
+        result.update({"benchmark": name, "pool_size": size})
+        results.append(result)
+        print(f"  {name:<28} {result['best_seconds']:>10.4f}s  {result['items_per_second'] or 0:>14,.0f}/s"
+              f"  peak {result.get('peak_memory_mb', '-')} MB", file=sys.stderr)
+
+    record("generate", measure(lambda: scrape_candidates(job_description, size, seed=SEED), 1, memory=memory), size)
+    raw_pool = scrape_candidates(job_description, size, seed=SEED)
+
+    record("parse", measure(lambda: [parse_candidate(dict(candidate)) for candidate in raw_pool], 1, memory=memory), size)
+    pool = [parse_candidate(dict(candidate)) for candidate in raw_pool]
+    del raw_pool
+
+    def clear_score_cache():
+        for candidate in pool:
+            candidate.pop(SCORE_CACHE_FIELD, None)
+
+    def score_each():
+        for candidate in pool:
+            agent.calculate_fit_score(candidate, job_description)
+
+    record("calculate_fit_score_cold", measure(score_each, repeat, setup=clear_score_cache, memory=memory), size)
+    record("calculate_fit_score_warm", measure(score_each, repeat, memory=memory), size)
+    record("score_candidates", measure(lambda: agent.score_candidates(pool, job_description), repeat, setup=clear_score_cache, memory=memory), size)
+
+    scored = []
+    for candidate in pool:
+        breakdown = agent.calculate_fit_score(candidate, job_description)
+        scored.append({**candidate, "fit_score": round(sum(breakdown.values()) / len(breakdown), 1), "score_breakdown": breakdown})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = CandidateStore(os.path.join(tmp, "bench.db"))
+        record("save_to_database", measure(lambda: store.save_candidates(scored, job_description), repeat, memory=memory), size)
+        store.close()
+
+    return results
+
+
+def bench_sourcing_endpoint(job_description: str, requests: int, llm_latency: float) -> Dict[str, Any]:
+    """Benchmark POST /sourcing end to end against the offline fake model"""
+    from fastapi.testclient import TestClient
+    import api
+
+    api.model = AdaptiveModel(FakeModelBackend(latency_ms=llm_latency * 1000, latency_sigma=0.0, seed=SEED), LLM_CONCURRENCY)
+    # Measure the pipeline itself, not responses cached by earlier runs
+    api.shared_cache = NullCache()
+    client = TestClient(api.app)
+
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Results are persisted; keep them out of the real candidates.db
+        api.store = CandidateStore(os.path.join(tmp, "bench.db"))
+        api.agent.deduplicator.store = api.store
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.post("/sourcing", json={"job_description": job_description})
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+        api.store.close()
+
+    # The first request generates the pool; the rest reuse it
+    warm = sorted(latencies[1:]) or latencies
+    result = {
+        "benchmark": "sourcing_endpoint",
+        "requests": requests,
+        "fake_llm_latency_seconds": llm_latency,
+        "cold_ms": round(latencies[0] * 1000, 1),
+        "warm_p50_ms": round(statistics.median(warm) * 1000, 1),
+        "warm_p95_ms": round(warm[min(len(warm) - 1, int(len(warm) * 0.95))] * 1000, 1),
+        "warm_max_ms": round(warm[-1] * 1000, 1),
+    }
+    print(f"  sourcing_endpoint            cold {result['cold_ms']}ms  warm p50 {result['warm_p50_ms']}ms", file=sys.stderr)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base: Dict[str, Any], current: Dict[str, Any]):
+    """Print best-time ratios of current vs base for benchmarks present in both"""
+    def index(report):
+        return {(r["benchmark"], r.get("pool_size")): r for r in report["results"]}
+
+    base_results = index(base)
+    print(f"\n{'benchmark':<28} {'pool':>9} {'base s':>10} {'new s':>10} {'speedup':>8}")
+    for key, result in index(current).items():
+        old = base_results.get(key)
+        if not old or "best_seconds" not in result:
+            continue
+        speedup = old["best_seconds"] / result["best_seconds"] if result["best_seconds"] else float("inf")
+        print(f"{key[0]:<28} {key[1]:>9} {old['best_seconds']:>10.4f} {result['best_seconds']:>10.4f} {speedup:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sourcing pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="candidate pool sizes")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak memory runs")
+    parser.add_argument("--requests", type=int, default=10, help="/sourcing requests to send (0 to skip)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake LLM latency in seconds")
+    parser.add_argument("--output", help="write JSON results to this file (default: stdout)")
+    parser.add_argument("--compare", help="previous JSON results to compare against")
+    args = parser.parse_args()
+
+    import api
+
+    job_description = get_sample_job_description()
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": SEED,
+        },
+        "results": [],
+    }
+
+    for size in args.sizes:
+        print(f"pool of {size:,} candidates", file=sys.stderr)
+        report["results"].extend(bench_pool(api.agent, job_description, size, args.repeat, not args.no_memory))
+
+    if args.requests:
+        report["results"].append(bench_sourcing_endpoint(job_description, args.requests, args.llm_latency))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Candidate and Job Parsing
+Turns raw profile strings into typed fields once, at ingest, so the
+fit score rubric never has to re-parse text while scoring.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, Optional
+
+from entity_tiers import resolve_school, resolve_company
+from skill_embeddings import SKILL_MATCHING, SKILL_INDEX, job_skill_phrases
+
+# Skill terms the experience score looks for in both the profile and the job
+RELEVANT_SKILL_TERMS = ["python", "machine learning", "ai", "ml", "tensorflow", "pytorch", "deep learning", "llm", "code generation", "neural networks", "scikit-learn"]
+
+# Fields added by parse_candidate; everything else is the original display data
+PARSED_FIELDS = ("experience_years", "tenure_months", "skill_set", "school_id", "school_tier", "company_id", "company_tier", "location_normalized")
+
+# Per-candidate cache of rubric dimension scores (see rubric.incremental_breakdown)
+SCORE_CACHE_FIELD = "dimension_scores"
+
+_YEARS_PATTERN = re.compile(r'(\d+)\s*(?:years?|yrs?)', re.IGNORECASE)
+_MONTHS_PATTERN = re.compile(r'(\d+)\s*(?:months?|mos?)', re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def _text(value: Any) -> str:
+    return str(value) if value is not None else ""
+
+
+def parse_years(text: str) -> Optional[int]:
+    """Return the leading number of years in strings like "6 years", or None"""
+    match = _NUMBER_PATTERN.search(_text(text))
+    return int(match.group()) if match else None
+
+
+def parse_months(text: str) -> Optional[int]:
+    """
+    Return the total number of months in strings like "3 years 4 months".
+
+    A bare number is read as years so "2" and "2 years" parse the same way.
+    """
+    text = _text(text)
+    years = _YEARS_PATTERN.search(text)
+    months = _MONTHS_PATTERN.search(text)
+    if not years and not months:
+        bare = parse_years(text)
+        return bare * 12 if bare is not None else None
+
+    total = 0
+    if years:
+        total += int(years.group(1)) * 12
+    if months:
+        total += int(months.group(1))
+    return total
+
+
+def normalize_skill(skill: str) -> str:
+    return " ".join(skill.lower().split())
+
+
+def parse_skills(skills: str) -> FrozenSet[str]:
+    """
+    Split a comma-joined skills string into a set of normalized skills.
+
+    Plural skills are also stored in singular form so "LLMs" matches "llm".
+    """
+    skill_set = set()
+    for skill in _text(skills).split(","):
+        skill = normalize_skill(skill)
+        if not skill:
+            continue
+        skill_set.add(skill)
+        if len(skill) > 3 and skill.endswith("s") and not skill.endswith("ss"):
+            skill_set.add(skill[:-1])
+    return frozenset(skill_set)
+
+
+def parse_candidate(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add typed scoring fields to a raw candidate profile.
+
+    The original string fields are kept untouched for display; calling this
+    on an already parsed candidate is a no-op.
+
+    Args:
+        candidate: Raw candidate dictionary as produced by the scraper or LLM
+
+    Returns:
+        The same candidate with PARSED_FIELDS filled in
+    """
+    if "skill_set" in candidate:
+        return candidate
+
+    candidate["experience_years"] = parse_years(candidate.get("experience", ""))
+    candidate["tenure_months"] = parse_months(candidate.get("tenure", ""))
+    candidate["skill_set"] = parse_skills(candidate.get("skills", ""))
+    if SKILL_MATCHING == "semantic":
+        # Embed new skills now so scoring never has to
+        SKILL_INDEX.add(candidate["skill_set"])
+    candidate["school_id"], candidate["school_tier"] = resolve_school(candidate.get("education", ""))
+    candidate["company_id"], candidate["company_tier"] = resolve_company(candidate.get("company", ""))
+    candidate["location_normalized"] = _text(candidate.get("location")).lower()
+    return candidate
+
+
+def display_fields(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a copy of the candidate without the parsed scoring fields (for export)"""
+    return {key: value for key, value in candidate.items() if key not in PARSED_FIELDS and key != SCORE_CACHE_FIELD}
+
+
+@lru_cache(maxsize=128)
+def parse_job(job_description: str) -> Dict[str, Any]:
+    """
+    Extract the job-side inputs of the rubric once per job description.
+
+    Returns:
+        Dictionary with the relevant skill terms mentioned in the job (every
+        skill-like phrase of the job in semantic matching mode) and the
+        location flags used by the location score
+    """
+    job_lower = job_description.lower()
+    if SKILL_MATCHING == "semantic":
+        skill_terms = job_skill_phrases(job_lower)
+    else:
+        skill_terms = frozenset(term for term in RELEVANT_SKILL_TERMS if term in job_lower)
+    return {
+        "skill_terms": skill_terms,
+        "mountain_view": "mountain view" in job_lower,
+        "california": "california" in job_lower,
+        "remote": "remote" in job_lower,
+    }
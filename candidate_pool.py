@@ -0,0 +1,278 @@
+"""
+Columnar Candidate Pools
+On-disk, memory-mappable layout for a parsed candidate pool, so one large
+pool can be scored against many jobs, from many worker processes, without
+deserializing a dict per candidate.
+
+A pool is a directory:
+
+    meta.json               row count, column names, rubric input dictionaries, skill vocabulary
+    <field>.codes.npy       one int32 code per candidate for each dictionary encoded rubric input
+    skill_set.offsets.npy   int64 offsets into skill_set.skills.npy, one run of skills per candidate
+    skill_set.skills.npy    int32 skill vocabulary codes, concatenated
+    skill_set.distinct.npy  whether each skill still counts once plural forms are folded
+    <column>.offsets.npy    int64 byte offsets into <column>.utf8 per display column
+    <column>.utf8           concatenated UTF-8 display strings
+    skill_vectors.npz       skill embeddings, in semantic skill matching mode
+
+Rubric inputs with few distinct values (a school tier, a tenure, ...) are
+dictionary encoded: each distinct value is stored once in meta.json and
+candidates hold its code. Scoring a job scores each distinct value once
+through score_dimension (see scoring.py) and gathers the totals with NumPy.
+Skill sets are nearly unique per candidate, so they are stored as runs of
+skill vocabulary codes instead. A job is matched against the vocabulary
+once, and each candidate's match count is a cumulative sum over the runs.
+
+Only the top K rows are ever turned back into candidate dicts. Arrays are
+opened with mmap_mode="r", so every process shares the operating system's
+page cache.
+
+Usage:
+    python candidate_pool.py export pool/ --size 1000000 --seed 7
+    python candidate_pool.py score pool/ --top-k 20
+"""
+
+import argparse
+import json
+import os
+from typing import Dict, Any, List, Callable, Iterable, FrozenSet
+
+import numpy as np
+
+from candidate_parser import parse_candidate, parse_job
+from rubric import RUBRIC_DEPENDENCIES, DIMENSIONS
+from scoring import score_dimension
+from skill_embeddings import SKILL_MATCHING, SKILL_INDEX, distinct_skills, vocabulary_matches
+
+FORMAT_VERSION = 2
+
+# Display columns kept for materializing the top candidates
+DISPLAY_COLUMNS = ("candidate_id", "name", "linkedin_url", "headline", "location", "experience", "education", "skills", "company", "tenure")
+
+# Candidate fields the rubric reads, in a stable order
+RUBRIC_FIELDS = tuple(sorted({field for deps in RUBRIC_DEPENDENCIES.values() for field in deps["candidate"]}))
+
+# Stored as runs of vocabulary codes; every other rubric input is dictionary encoded
+SKILL_FIELD = "skill_set"
+DICTIONARY_FIELDS = tuple(field for field in RUBRIC_FIELDS if field != SKILL_FIELD)
+
+
+def write_pool(candidates: Iterable[Dict[str, Any]], path: str) -> int:
+    """
+    Write candidates to a columnar pool directory.
+
+    Candidates are parsed if they are not already. Returns the number of rows written.
+    """
+    os.makedirs(path, exist_ok=True)
+    value_codes: Dict[str, Dict[Any, int]] = {field: {} for field in DICTIONARY_FIELDS}
+    codes: Dict[str, List[int]] = {field: [] for field in DICTIONARY_FIELDS}
+    strings: Dict[str, List[bytes]] = {column: [] for column in DISPLAY_COLUMNS}
+    skill_codes: Dict[str, int] = {}
+    skill_offsets, skills, distinct = [0], [], []
+
+    count = 0
+    for candidate in candidates:
+        parse_candidate(candidate)
+        for field in DICTIONARY_FIELDS:
+            value = candidate.get(field)
+            codes[field].append(value_codes[field].setdefault(value, len(value_codes[field])))
+        skill_set = candidate[SKILL_FIELD]
+        counted = set(distinct_skills(skill_set))
+        for skill in sorted(skill_set):
+            skills.append(skill_codes.setdefault(skill, len(skill_codes)))
+            distinct.append(skill in counted)
+        skill_offsets.append(len(skills))
+        for column in DISPLAY_COLUMNS:
+            value = candidate.get(column)
+            strings[column].append(b"" if value is None else str(value).encode("utf-8"))
+        count += 1
+
+    for field in DICTIONARY_FIELDS:
+        np.save(os.path.join(path, f"{field}.codes.npy"), np.asarray(codes[field], dtype=np.int32))
+    np.save(os.path.join(path, f"{SKILL_FIELD}.offsets.npy"), np.asarray(skill_offsets, dtype=np.int64))
+    np.save(os.path.join(path, f"{SKILL_FIELD}.skills.npy"), np.asarray(skills, dtype=np.int32))
+    np.save(os.path.join(path, f"{SKILL_FIELD}.distinct.npy"), np.asarray(distinct, dtype=bool))
+
+    for column in DISPLAY_COLUMNS:
+        values = strings[column]
+        offsets = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in values], out=offsets[1:])
+        np.save(os.path.join(path, f"{column}.offsets.npy"), offsets)
+        with open(os.path.join(path, f"{column}.utf8"), "wb") as f:
+            f.writelines(values)
+
+    if SKILL_MATCHING == "semantic":
+        # Ship the pool's skill embeddings so scoring processes don't recompute them
+        SKILL_INDEX.save(os.path.join(path, "skill_vectors.npz"), skill_codes)
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "count": count,
+        "display_columns": list(DISPLAY_COLUMNS),
+        "dictionaries": {field: list(value_codes[field]) for field in DICTIONARY_FIELDS},
+        "skill_vocabulary": list(skill_codes),
+    }
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return count
+
+
+class CandidatePool:
+    """Read-only, memory-mapped view of a pool directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported pool format version {meta.get('version')} in {path}")
+
+        self.count = meta["count"]
+        self.display_columns = tuple(meta["display_columns"])
+        self.dictionaries = meta["dictionaries"]
+        self.codes = {field: np.load(os.path.join(path, f"{field}.codes.npy"), mmap_mode="r") for field in self.dictionaries}
+        self.skill_vocabulary: List[str] = meta["skill_vocabulary"]
+        self.skill_offsets = np.load(os.path.join(path, f"{SKILL_FIELD}.offsets.npy"), mmap_mode="r")
+        self.skills = np.load(os.path.join(path, f"{SKILL_FIELD}.skills.npy"), mmap_mode="r")
+        self.skill_distinct = np.load(os.path.join(path, f"{SKILL_FIELD}.distinct.npy"), mmap_mode="r")
+        self.offsets = {column: np.load(os.path.join(path, f"{column}.offsets.npy"), mmap_mode="r") for column in self.display_columns}
+        self.blobs = {column: self._map_blob(column) for column in self.display_columns}
+
+        skill_vectors = os.path.join(path, "skill_vectors.npz")
+        if SKILL_MATCHING == "semantic" and os.path.exists(skill_vectors):
+            SKILL_INDEX.load(skill_vectors)
+
+    def _map_blob(self, column: str) -> np.ndarray:
+        blob_path = os.path.join(self.path, f"{column}.utf8")
+        # np.memmap refuses empty files
+        if os.path.getsize(blob_path) == 0:
+            return np.zeros(0, dtype=np.uint8)
+        return np.memmap(blob_path, dtype=np.uint8, mode="r")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def candidate(self, index: int) -> Dict[str, Any]:
+        """Materialize one row as a parsed candidate dict"""
+        candidate = {}
+        for column in self.display_columns:
+            start, end = self.offsets[column][index], self.offsets[column][index + 1]
+            candidate[column] = self.blobs[column][start:end].tobytes().decode("utf-8")
+        return parse_candidate(candidate)
+
+    def skill_set(self, index: int) -> FrozenSet[str]:
+        start, end = self.skill_offsets[index], self.skill_offsets[index + 1]
+        return frozenset(self.skill_vocabulary[code] for code in self.skills[start:end])
+
+    def skill_match_counts(self, skill_terms: FrozenSet[str]) -> np.ndarray:
+        """Number of each row's skills that match the job (skill_embeddings.skill_matches for every row)"""
+        matched = vocabulary_matches(self.skill_vocabulary, skill_terms)[self.skills]
+        if SKILL_MATCHING == "semantic":
+            matched &= self.skill_distinct
+        totals = np.zeros(len(matched) + 1, dtype=np.int32)
+        np.cumsum(matched, out=totals[1:])
+        return totals[self.skill_offsets[1:]] - totals[self.skill_offsets[:-1]]
+
+    def dimension_scores(self, dimension: str, job: Dict[str, Any], score_dimension: Callable[[str, Dict[str, Any], Dict[str, Any]], float]) -> np.ndarray:
+        """
+        Score one dimension for every row.
+
+        Each distinct value of the dimension's candidate input is scored
+        once; the per-row scores are a gather over the codes. The skills
+        score depends only on how many skills match, so it is scored once
+        per distinct match count, on a row with that count.
+        """
+        fields = RUBRIC_DEPENDENCIES[dimension]["candidate"]
+        if len(fields) != 1:
+            raise ValueError(f"Columnar scoring supports one candidate input per dimension, {dimension} has {fields}")
+        field = fields[0]
+        if field == SKILL_FIELD:
+            counts = self.skill_match_counts(job["skill_terms"])
+            _, first_rows, inverse = np.unique(counts, return_index=True, return_inverse=True)
+            table = np.array([score_dimension(dimension, {field: self.skill_set(row)}, job) for row in first_rows], dtype=np.float64)
+            return table[inverse]
+        table = np.array([score_dimension(dimension, {field: value}, job) for value in self.dictionaries[field]], dtype=np.float64)
+        return table[self.codes[field]]
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first.
+
+    Ties keep pool order, matching heapq.nlargest over the same rows.
+    """
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - len(above)]
+    indices = np.concatenate([above, ties])
+    return indices[np.argsort(-scores[indices], kind="stable")]
+
+
+def score_pool(
+    pool: CandidatePool,
+    job_description: str,
+    score_dimension: Callable[[str, Dict[str, Any], Dict[str, Any]], float],
+    top_k: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    Score a columnar pool against a job and materialize the top K.
+
+    Produces the same fit scores, breakdowns and order as
+    LinkedInSourcingAgent.score_candidates on the equivalent list of dicts.
+    """
+    job = parse_job(job_description)
+    breakdowns = {dimension: pool.dimension_scores(dimension, job, score_dimension) for dimension in DIMENSIONS}
+
+    total = np.zeros(len(pool), dtype=np.float64)
+    for dimension in DIMENSIONS:
+        total += breakdowns[dimension]
+    fit_scores = np.round(total / len(DIMENSIONS), 1)
+
+    top_candidates = []
+    for index in top_k_indices(fit_scores, top_k):
+        candidate = pool.candidate(index)
+        candidate["fit_score"] = float(fit_scores[index])
+        candidate["score_breakdown"] = {dimension: float(breakdowns[dimension][index]) for dimension in DIMENSIONS}
+        top_candidates.append(candidate)
+    return top_candidates
+
+
+def main():
+    from linkedin_scrapper import scrape_candidates, get_sample_job_description
+    from dedup import CandidateDeduplicator
+
+    parser = argparse.ArgumentParser(description="Export and score columnar candidate pools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="generate a candidate pool and write it to disk")
+    export.add_argument("path")
+    export.add_argument("--size", type=int, default=100_000)
+    export.add_argument("--seed", type=int, default=None)
+    export.add_argument("--job-description", help="job description the pool is generated for (default: sample job)")
+
+    score = subparsers.add_parser("score", help="score a pool against a job description")
+    score.add_argument("path")
+    score.add_argument("--top-k", type=int, default=20)
+    score.add_argument("--job-description", help="job description to score against (default: sample job)")
+
+    args = parser.parse_args()
+    if args.command == "score" and args.top_k < 1:
+        parser.error("--top-k must be at least 1")
+    job_description = args.job_description or get_sample_job_description()
+
+    if args.command == "export":
+        candidates = CandidateDeduplicator().dedupe(scrape_candidates(job_description, args.size, seed=args.seed))
+        count = write_pool(candidates, args.path)
+        print(f"Wrote {count:,} candidates to {args.path}")
+    else:
+        pool = CandidatePool(args.path)
+        for rank, candidate in enumerate(score_pool(pool, job_description, score_dimension, args.top_k), 1):
+            print(f"{rank:>3}. {candidate['fit_score']:>4}  {candidate['name']} - {candidate['headline']}")
+
+
+if __name__ == "__main__":
+    main()
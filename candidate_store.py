@@ -0,0 +1,364 @@
+"""
+Candidate Store
+SQLite persistence for scored candidates over one long-lived connection,
+so callers can share it (e.g. via st.cache_resource) instead of reconnecting
+on every save.
+
+Scores are kept two ways: candidate_scores holds each candidate's latest
+score per job description, and run_scores holds exactly what each sourcing
+run (job_id) returned, so re-running a job description never changes an
+earlier run's results.
+
+Past results are read back a page at a time with keyset pagination: a page
+ends with an opaque cursor holding the sort key of its last row, and the
+next page continues strictly after that key. Every page is one range scan of
+an index, however deep into the results it is, and rows written meanwhile
+never shift a page's contents.
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from jd_parser import job_hash
+from rubric import DIMENSIONS
+
+# SQLite caps host parameters per statement; look identities up in chunks
+LOOKUP_CHUNK_SIZE = 500
+
+# Breakdown dimensions get their own candidate_scores columns, so they can be filtered on in SQL
+DIMENSION_COLUMNS = {dimension: f"{dimension}_score" for dimension in DIMENSIONS}
+
+# Profile fields returned with each historical score, from the candidate's latest row
+PROFILE_COLUMNS = ("name", "linkedin_url", "headline", "location", "experience", "education", "skills", "company")
+
+
+def encode_cursor(*key: Any) -> str:
+    """Opaque, URL-safe cursor for the sort key of a page's last row"""
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Sort key from encode_cursor; raises ValueError for a malformed cursor"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return key
+
+
+class CandidateStore:
+    def __init__(self, db_path: str = "candidates.db"):
+        self.db_path = db_path
+        # Streamlit and FastAPI call in from different threads; writes are serialized by the lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.init_database()
+
+    def init_database(self):
+        """Initialize SQLite database for caching"""
+        with self.lock:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS candidates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT,
+                    linkedin_url TEXT UNIQUE,
+                    headline TEXT,
+                    location TEXT,
+                    experience TEXT,
+                    education TEXT,
+                    skills TEXT,
+                    company TEXT,
+                    job_description TEXT,
+                    fit_score REAL,
+                    score_breakdown TEXT,
+                    outreach_message TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            # Databases created before de-duplication lack candidate_id
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(candidates)")}
+            if "candidate_id" not in columns:
+                self.conn.execute("ALTER TABLE candidates ADD COLUMN candidate_id TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_candidate_id ON candidates (candidate_id)")
+            # Identity key (see dedup.identity_keys) -> stable candidate id
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS candidate_identities (
+                    identity_key TEXT PRIMARY KEY,
+                    candidate_id TEXT NOT NULL
+                )
+            ''')
+            # One row per candidate per job, so a new job never overwrites an older association
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS candidate_scores (
+                    candidate_id TEXT NOT NULL,
+                    job_hash TEXT NOT NULL,
+                    job_description TEXT,
+                    fit_score REAL,
+                    score_breakdown TEXT,
+                    outreach_message TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (candidate_id, job_hash)
+                )
+            ''')
+            # Databases created before the history API lack the per-dimension columns; fill them from the JSON
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(candidate_scores)")}
+            missing = [column for column in DIMENSION_COLUMNS.values() if column not in columns]
+            for column in missing:
+                self.conn.execute(f"ALTER TABLE candidate_scores ADD COLUMN {column} REAL")
+            if missing:
+                self.conn.execute("UPDATE candidate_scores SET " + ", ".join(
+                    f"{column} = json_extract(score_breakdown, '$.{dimension}')" for dimension, column in DIMENSION_COLUMNS.items()
+                ))
+            # Serve a job's candidates in fit score order, and a candidate's history newest first
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_candidate_scores_job ON candidate_scores (job_hash, fit_score DESC, candidate_id)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_candidate_scores_history ON candidate_scores (candidate_id, created_at DESC, job_hash DESC)")
+            # Sourcing runs
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    job_hash TEXT NOT NULL,
+                    candidates_scored INTEGER,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_job_hash ON jobs (job_hash, created_at)")
+            # Databases created before run_scores record no run on a latest score; attribute it to the job's latest run
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(candidate_scores)")}
+            if "job_id" not in columns:
+                self.conn.execute("ALTER TABLE candidate_scores ADD COLUMN job_id TEXT")
+                self.conn.execute('''
+                    UPDATE candidate_scores SET job_id = (
+                        SELECT job_id FROM jobs WHERE jobs.job_hash = candidate_scores.job_hash ORDER BY created_at DESC LIMIT 1
+                    )
+                ''')
+            # What each sourcing run returned, one row per candidate per run
+            created = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'run_scores'").fetchone() is None
+            self.conn.execute(f'''
+                CREATE TABLE IF NOT EXISTS run_scores (
+                    job_id TEXT NOT NULL,
+                    candidate_id TEXT NOT NULL,
+                    fit_score REAL,
+                    score_breakdown TEXT,
+                    outreach_message TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    {", ".join(f"{column} REAL" for column in DIMENSION_COLUMNS.values())},
+                    PRIMARY KEY (job_id, candidate_id)
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_run_scores_job ON run_scores (job_id, fit_score DESC, candidate_id)")
+            if created:
+                # Earlier runs only left their latest scores behind; keep those as the run's results
+                score_columns = ", ".join(["candidate_id", "fit_score", "score_breakdown", "outreach_message", "created_at", *DIMENSION_COLUMNS.values()])
+                self.conn.execute(f'''
+                    INSERT OR IGNORE INTO run_scores (job_id, {score_columns})
+                    SELECT job_id, {score_columns} FROM candidate_scores WHERE job_id IS NOT NULL
+                ''')
+            self.conn.commit()
+
+    def lookup_identities(self, identity_keys: Iterable[str]) -> Dict[str, str]:
+        """Return the known candidate_id for each of the given identity keys"""
+        keys = list(identity_keys)
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT identity_key, candidate_id FROM candidate_identities WHERE identity_key IN ({placeholders})",
+                    chunk
+                ))
+        return found
+
+    def save_identities(self, identities: Dict[str, str]):
+        """Record identity key -> candidate_id pairs; existing keys keep their id"""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO candidate_identities (identity_key, candidate_id) VALUES (?, ?)",
+                identities.items()
+            )
+            self.conn.commit()
+
+    def save_candidates(self, candidates: List[Dict[str, Any]], job_description: str,
+                        job_id: Optional[str] = None, candidates_scored: Optional[int] = None):
+        """
+        Save scored candidates and their per-job scores in a single transaction.
+
+        With a job_id, the run and exactly these candidates are also recorded
+        as its results (see job_candidates). Saving a job_id that already
+        exists raises sqlite3.IntegrityError and saves nothing.
+        """
+        description_hash = job_hash(job_description)
+        rows = []
+        score_rows = []
+        for candidate in candidates:
+            breakdown = candidate.get('score_breakdown', {})
+            score_breakdown = json.dumps(breakdown)
+            rows.append((
+                candidate.get('candidate_id'),
+                candidate.get('name', ''),
+                candidate.get('linkedin_url', ''),
+                candidate.get('headline', ''),
+                candidate.get('location', ''),
+                candidate.get('experience', ''),
+                candidate.get('education', ''),
+                candidate.get('skills', ''),
+                candidate.get('company', ''),
+                job_description,
+                candidate.get('fit_score', 0),
+                score_breakdown,
+                candidate.get('outreach_message', '')
+            ))
+            if candidate.get('candidate_id'):
+                score_rows.append((
+                    candidate['candidate_id'],
+                    description_hash,
+                    job_id,
+                    job_description,
+                    candidate.get('fit_score', 0),
+                    score_breakdown,
+                    candidate.get('outreach_message', ''),
+                    *(breakdown.get(dimension) for dimension in DIMENSION_COLUMNS)
+                ))
+
+        # The connection commits on success and rolls the whole save back if any
+        # statement fails, e.g. a job_id that is already taken
+        with self.lock, self.conn:
+            if job_id is not None:
+                self.conn.execute(
+                    "INSERT INTO jobs (job_id, job_hash, candidates_scored) VALUES (?, ?, ?)",
+                    (job_id, description_hash, candidates_scored if candidates_scored is not None else len(candidates))
+                )
+            self.conn.executemany('''
+                INSERT OR REPLACE INTO candidates
+                (candidate_id, name, linkedin_url, headline, location, experience, education, skills, company,
+                 job_description, fit_score, score_breakdown, outreach_message)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            self.conn.executemany(f'''
+                INSERT OR REPLACE INTO candidate_scores
+                (candidate_id, job_hash, job_id, job_description, fit_score, score_breakdown, outreach_message, {", ".join(DIMENSION_COLUMNS.values())})
+                VALUES (?, ?, ?, ?, ?, ?, ?{", ?" * len(DIMENSION_COLUMNS)})
+            ''', score_rows)
+            if job_id is not None:
+                self.conn.executemany(f'''
+                    INSERT OR REPLACE INTO run_scores
+                    (job_id, candidate_id, fit_score, score_breakdown, outreach_message, {", ".join(DIMENSION_COLUMNS.values())})
+                    VALUES (?, ?, ?, ?, ?{", ?" * len(DIMENSION_COLUMNS)})
+                ''', [(job_id, row[0], *row[4:]) for row in score_rows])
+
+    def resolve_job(self, job_id: str) -> Optional[str]:
+        """Job description hash of a sourcing run's job_id; the hash itself is accepted too"""
+        with self.lock:
+            row = self.conn.execute("SELECT job_hash FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                row = self.conn.execute("SELECT job_hash FROM candidate_scores WHERE job_hash = ? LIMIT 1", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def job_candidates(self, job_id: str, limit: int = 50, cursor: Optional[str] = None, ascending: bool = False,
+                       min_scores: Optional[Dict[str, float]] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of a job's scored candidates, ordered by fit score.
+
+        Args:
+            job_id: A sourcing run's job_id, for exactly what that run
+                returned, or a job description hash, for every candidate's
+                latest score for that description
+            limit: Page size
+            cursor: next_cursor of the previous page, or None for the first page
+            ascending: Lowest fit scores first instead of highest
+            min_scores: Breakdown dimension -> minimum score on that dimension
+
+        Returns:
+            (candidates, next_cursor); next_cursor is None on the last page
+        """
+        # Ties on fit_score are broken by candidate_id in the opposite direction, matching the index
+        fit_order, id_order = ("ASC", "DESC") if ascending else ("DESC", "ASC")
+        with self.lock:
+            is_run = self.conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+        table, key_column = ("run_scores", "job_id") if is_run else ("candidate_scores", "job_hash")
+        conditions, params = [f"s.{key_column} = ?"], [job_id]
+        if cursor is not None:
+            fit_score, candidate_id = decode_cursor(cursor, 2)
+            past, tie_past = (">", "<") if ascending else ("<", ">")
+            conditions.append(f"(s.fit_score {past} ? OR (s.fit_score = ? AND s.candidate_id {tie_past} ?))")
+            params.extend([fit_score, fit_score, candidate_id])
+        for dimension, minimum in (min_scores or {}).items():
+            if dimension not in DIMENSION_COLUMNS:
+                raise ValueError(f"Unknown score dimension {dimension!r}, expected one of {tuple(DIMENSION_COLUMNS)}")
+            conditions.append(f"s.{DIMENSION_COLUMNS[dimension]} >= ?")
+            params.append(minimum)
+        # One extra row tells whether there is a next page
+        params.append(limit + 1)
+
+        with self.lock:
+            rows = self.conn.execute(f'''
+                SELECT s.candidate_id, s.fit_score, s.score_breakdown, s.outreach_message, s.created_at,
+                       {", ".join(f"c.{column}" for column in PROFILE_COLUMNS)}
+                FROM {table} s
+                LEFT JOIN candidates c ON c.id = (SELECT MAX(id) FROM candidates WHERE candidate_id = s.candidate_id)
+                WHERE {" AND ".join(conditions)}
+                ORDER BY s.fit_score {fit_order}, s.candidate_id {id_order}
+                LIMIT ?
+            ''', params).fetchall()
+
+        candidates = []
+        for candidate_id, fit_score, score_breakdown, outreach_message, created_at, *profile in rows[:limit]:
+            candidates.append({
+                "candidate_id": candidate_id,
+                **dict(zip(PROFILE_COLUMNS, profile)),
+                "fit_score": fit_score,
+                "score_breakdown": json.loads(score_breakdown or "{}"),
+                "outreach_message": outreach_message or "",
+                "scored_at": created_at,
+            })
+        next_cursor = encode_cursor(candidates[-1]["fit_score"], candidates[-1]["candidate_id"]) if len(rows) > limit else None
+        return candidates, next_cursor
+
+    def candidate_history(self, candidate_id: str, limit: int = 50,
+                          cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        One page of a candidate's latest score for each job description, most recent first.
+
+        job_id is the run that produced the score, or None for runs saved without one.
+
+        Returns:
+            (scores, next_cursor); next_cursor is None on the last page
+        """
+        conditions, params = ["s.candidate_id = ?"], [candidate_id]
+        if cursor is not None:
+            scored_at, last_hash = decode_cursor(cursor, 2)
+            conditions.append("(s.created_at < ? OR (s.created_at = ? AND s.job_hash < ?))")
+            params.extend([scored_at, scored_at, last_hash])
+        params.append(limit + 1)
+
+        with self.lock:
+            rows = self.conn.execute(f'''
+                SELECT s.job_hash, s.job_description, s.fit_score, s.score_breakdown, s.outreach_message, s.created_at, s.job_id
+                FROM candidate_scores s
+                WHERE {" AND ".join(conditions)}
+                ORDER BY s.created_at DESC, s.job_hash DESC
+                LIMIT ?
+            ''', params).fetchall()
+
+        scores = []
+        for description_hash, job_description, fit_score, score_breakdown, outreach_message, created_at, job_id in rows[:limit]:
+            scores.append({
+                "job_id": job_id,
+                "job_hash": description_hash,
+                "job_description": job_description,
+                "fit_score": fit_score,
+                "score_breakdown": json.loads(score_breakdown or "{}"),
+                "outreach_message": outreach_message or "",
+                "scored_at": created_at,
+            })
+        next_cursor = encode_cursor(scores[-1]["scored_at"], scores[-1]["job_hash"]) if len(rows) > limit else None
+        return scores, next_cursor
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
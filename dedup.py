@@ -0,0 +1,136 @@
+"""
+Candidate De-duplication
+Hashed identity keys for candidate profiles and an identity index that
+collapses duplicates before scoring and gives every person a stable
+candidate_id across runs and sources.
+
+A profile has up to two identity keys:
+    url     its normalized LinkedIn URL
+    person  its normalized name plus resolved company and school ids
+
+Two profiles are the same person when they share either key, so a repeated
+name with a different random URL suffix still collapses when the company
+and school agree, and a renamed profile still matches on its URL.
+"""
+
+import hashlib
+import re
+import threading
+from typing import Dict, Any, List, Optional, Set, TYPE_CHECKING
+
+import metrics
+from candidate_parser import parse_candidate
+from entity_tiers import normalize_entity
+
+if TYPE_CHECKING:
+    from candidate_store import CandidateStore
+
+CONTENT_FIELDS = ("name", "headline", "company", "location", "education")
+
+_URL_PREFIX = re.compile(r"^(?:https?://)?(?:[a-z]{2,3}\.|www\.)?")
+
+
+def normalize_url(url: str) -> str:
+    """Reduce a profile URL to "linkedin.com/in/<slug>" form (scheme, www, country subdomain, query and trailing slash dropped)"""
+    url = str(url or "").strip().lower()
+    url = _URL_PREFIX.sub("", url, count=1)
+    url = url.split("?", 1)[0].split("#", 1)[0]
+    return url.rstrip("/")
+
+
+def normalize_name(name: str) -> str:
+    """First and last name tokens, so middle names and initials don't split a person"""
+    tokens = [token for token in normalize_entity(name).split() if len(token) > 1]
+    if len(tokens) > 2:
+        tokens = [tokens[0], tokens[-1]]
+    return " ".join(tokens)
+
+
+def _hash_key(kind: str, value: str) -> str:
+    return hashlib.sha1(f"{kind}:{value}".encode("utf-8")).hexdigest()[:16]
+
+
+def content_key(candidate: Dict[str, Any]) -> str:
+    """Key for a profile with no identity key: a hash of its normalized display fields, so it is stable across runs"""
+    fields = [normalize_entity(str(candidate.get(field) or "")) for field in CONTENT_FIELDS]
+    return _hash_key("content", "|".join(fields))
+
+
+def identity_keys(candidate: Dict[str, Any]) -> List[str]:
+    """
+    Hashed identity keys for a parsed candidate, URL key first.
+
+    The person key is only built when the name, company and school are all
+    known; a bare name is too common to identify anyone.
+    """
+    keys = []
+    url = normalize_url(candidate.get("linkedin_url", ""))
+    if url:
+        keys.append(_hash_key("url", url))
+    name = normalize_name(candidate.get("name", ""))
+    if name and candidate.get("company_id") and candidate.get("school_id"):
+        keys.append(_hash_key("person", f"{name}|{candidate['company_id']}|{candidate['school_id']}"))
+    return keys
+
+
+class CandidateDeduplicator:
+    """
+    Identity index over every candidate seen so far.
+
+    Keys are cached in memory and, when a store is given, persisted in its
+    candidate_identities table so ids stay stable across processes and runs.
+    """
+
+    def __init__(self, store: Optional["CandidateStore"] = None):
+        self.store = store
+        self.ids: Dict[str, str] = {}  # identity key -> candidate_id
+        self.lock = threading.Lock()
+
+    def dedupe(self, candidates: List[Dict[str, Any]], seen: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Assign a candidate_id to each candidate and drop repeats of the same person.
+
+        Args:
+            candidates: Candidates to de-duplicate
+            seen: Ids already kept from earlier batches of the same search; repeats
+                of them are dropped too, and the kept ids are added to it
+
+        Returns:
+            The first occurrence of each person, in input order
+        """
+        keyed = []
+        for candidate in candidates:
+            parse_candidate(candidate)
+            keyed.append((candidate, identity_keys(candidate)))
+
+        with self.lock:
+            all_keys = {key for _, keys in keyed for key in keys}
+            known = {key: self.ids[key] for key in all_keys if key in self.ids}
+            if self.store is not None and len(known) < len(all_keys):
+                known.update(self.store.lookup_identities(all_keys - known.keys()))
+
+            new_identities = {}
+            unique = []
+            if seen is None:
+                seen = set()
+            for candidate, keys in keyed:
+                candidate_id = next((known[key] for key in keys if key in known), None)
+                if candidate_id is None:
+                    # Profiles without any usable key are kept under a key derived from their content
+                    candidate_id = keys[0] if keys else content_key(candidate)
+                for key in keys:
+                    if key not in known:
+                        known[key] = new_identities[key] = candidate_id
+                candidate["candidate_id"] = candidate_id
+                if candidate_id in seen:
+                    continue
+                seen.add(candidate_id)
+                unique.append(candidate)
+
+            self.ids.update(known)
+            if self.store is not None and new_identities:
+                self.store.save_identities(new_identities)
+
+        if len(unique) < len(candidates):
+            metrics.DUPLICATES_DROPPED.inc(len(candidates) - len(unique))
+        return unique
@@ -0,0 +1,199 @@
+"""
+Entity Tiers
+Canonical school and company ids with their aliases, compiled once into
+hash maps so a profile's school or company resolves to a tier with one
+lookup after normalization instead of substring scans over tier lists.
+"""
+
+import re
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# canonical id -> (tier, aliases); the canonical id is always an alias too
+SCHOOLS: Dict[str, Tuple[str, List[str]]] = {
+    # Elite
+    "mit": ("elite", ["massachusetts institute of technology"]),
+    "stanford": ("elite", ["stanford university"]),
+    "harvard": ("elite", ["harvard university", "harvard college"]),
+    "berkeley": ("elite", ["uc berkeley", "university of california berkeley", "ucb"]),
+    "cmu": ("elite", ["carnegie mellon", "carnegie mellon university"]),
+    "caltech": ("elite", ["california institute of technology"]),
+    "princeton": ("elite", ["princeton university"]),
+    "yale": ("elite", ["yale university"]),
+    # Strong
+    "ucla": ("strong", ["university of california los angeles", "uc los angeles"]),
+    "usc": ("strong", ["university of southern california"]),
+    "nyu": ("strong", ["new york university"]),
+    "columbia": ("strong", ["columbia university"]),
+    "cornell": ("strong", ["cornell university"]),
+    "georgia tech": ("strong", ["georgia institute of technology", "gatech"]),
+    "umich": ("strong", ["university of michigan", "michigan ann arbor", "university of michigan ann arbor"]),
+    "uiuc": ("strong", ["university of illinois", "university of illinois urbana champaign", "illinois urbana champaign"]),
+    "ut austin": ("strong", ["university of texas austin", "university of texas"]),
+    # Standard
+    "sjsu": ("standard", ["san jose state", "san jose state university"]),
+    "santa clara": ("standard", ["santa clara university", "scu"]),
+    "uc davis": ("standard", ["university of california davis"]),
+    "uc irvine": ("standard", ["university of california irvine", "uci"]),
+    "ucsd": ("standard", ["uc san diego", "university of california san diego"]),
+    "uw": ("standard", ["university of washington"]),
+    "uoregon": ("standard", ["university of oregon"]),
+}
+
+COMPANIES: Dict[str, Tuple[str, List[str]]] = {
+    # Top
+    "google": ("top", ["alphabet", "google deepmind", "deepmind"]),
+    "microsoft": ("top", ["msft", "microsoft research"]),
+    "apple": ("top", []),
+    "amazon": ("top", ["aws", "amazon web services"]),
+    "meta": ("top", ["facebook", "meta platforms", "meta ai"]),
+    "netflix": ("top", []),
+    "airbnb": ("top", []),
+    "uber": ("top", []),
+    "openai": ("top", ["open ai"]),
+    "anthropic": ("top", []),
+    "stripe": ("top", []),
+    "palantir": ("top", []),
+    "databricks": ("top", []),
+    # Relevant
+    "salesforce": ("relevant", []),
+    "adobe": ("relevant", []),
+    "oracle": ("relevant", []),
+    "intel": ("relevant", []),
+    "nvidia": ("relevant", []),
+    "amd": ("relevant", ["advanced micro devices"]),
+    "cisco": ("relevant", ["cisco systems"]),
+    "vmware": ("relevant", []),
+    "splunk": ("relevant", []),
+    "mongodb": ("relevant", []),
+    "datadog": ("relevant", []),
+    "snowflake": ("relevant", []),
+    "twilio": ("relevant", []),
+    # Standard
+    "bank of america": ("standard", ["bofa"]),
+    "wells fargo": ("standard", []),
+    "jp morgan": ("standard", ["jpmorgan", "jpmorgan chase", "jp morgan chase"]),
+    "goldman sachs": ("standard", []),
+    "mckinsey": ("standard", ["mckinsey and company"]),
+    "bain": ("standard", ["bain and company"]),
+    "bcg": ("standard", ["boston consulting group"]),
+    "deloitte": ("standard", []),
+    "pwc": ("standard", ["pricewaterhousecoopers"]),
+    "ey": ("standard", ["ernst and young"]),
+}
+
+# University system names that double as the flagship's name. They only match
+# a whole education segment, so "University of Texas at Dallas" doesn't
+# resolve to UT Austin through the shorter system name.
+WHOLE_SEGMENT_SCHOOL_ALIASES = frozenset([
+    "university of texas", "university of illinois", "university of michigan", "university of washington",
+])
+
+DEFAULT_SCHOOL_TIER = "standard"
+DEFAULT_COMPANY_TIER = "standard"
+
+# Unknown companies with one of these words in their name are in the same industry
+INDUSTRY_TOKENS = frozenset(["ai", "tech", "technology", "technologies"])
+
+# Words dropped during normalization so "The University of Texas at Austin"
+# and "Palantir Technologies Inc." hit the same keys as their short forms
+_STOP_TOKENS = frozenset(["the", "at"])
+_COMPANY_SUFFIXES = frozenset(["inc", "llc", "ltd", "corp", "corporation", "co", "company", "plc", "gmbh", "technologies"])
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+# Education strings are "School, Degree" but LLM output also uses dashes, pipes and parentheses
+_SEGMENT_SEPARATORS = re.compile(r"[,|()]|\s[-–—]\s")
+
+
+def normalize_entity(text: str) -> str:
+    """Lowercase, turn "&" into "and", drop punctuation and stop words, collapse whitespace"""
+    text = str(text or "").lower().replace("&", " and ")
+    tokens = [token for token in _NON_ALNUM.sub(" ", text).split() if token not in _STOP_TOKENS]
+    return " ".join(tokens)
+
+
+def _strip_company_suffixes(name: str) -> str:
+    tokens = name.split()
+    while len(tokens) > 1 and tokens[-1] in _COMPANY_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+class EntityIndex:
+    """
+    Alias -> (canonical id, tier) hash map built once from an entity dictionary.
+
+    Aliases in whole_segment are only found by lookup(), never by search().
+    """
+
+    def __init__(self, entities: Dict[str, Tuple[str, List[str]]], whole_segment: FrozenSet[str] = frozenset()):
+        self.aliases: Dict[str, Tuple[str, str]] = {}
+        self.whole_segment = frozenset(normalize_entity(alias) for alias in whole_segment)
+        for canonical, (tier, aliases) in entities.items():
+            for alias in [canonical, *aliases]:
+                key = normalize_entity(alias)
+                if key in self.aliases and self.aliases[key][0] != canonical:
+                    raise ValueError(f"Alias {alias!r} maps to both {self.aliases[key][0]} and {canonical}")
+                self.aliases[key] = (canonical, tier)
+        self.max_tokens = max(len(key.split()) for key in self.aliases)
+
+    def lookup(self, normalized: str) -> Optional[Tuple[str, str]]:
+        """Exact alias hit for an already normalized name"""
+        return self.aliases.get(normalized)
+
+    def search(self, normalized: str) -> Optional[Tuple[str, str]]:
+        """
+        Longest alias appearing as whole words inside a normalized string.
+
+        Only token n-grams are looked up, so "mit" never matches inside
+        "smith" and "ai" never matches inside "bain".
+        """
+        tokens = normalized.split()
+        for size in range(min(self.max_tokens, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                key = " ".join(tokens[start:start + size])
+                hit = self.aliases.get(key)
+                if hit and key not in self.whole_segment:
+                    return hit
+        return None
+
+
+SCHOOL_INDEX = EntityIndex(SCHOOLS, WHOLE_SEGMENT_SCHOOL_ALIASES)
+COMPANY_INDEX = EntityIndex(COMPANIES)
+
+
+def resolve_school(education: str) -> Tuple[str, str]:
+    """
+    Resolve an education string like "Stanford University, MS Computer Science".
+
+    Returns:
+        (school id, tier); the id is the canonical id, or the normalized
+        school name when the school is not in the dictionary
+    """
+    segments = [normalize_entity(segment) for segment in _SEGMENT_SEPARATORS.split(str(education or ""))]
+    segments = [segment for segment in segments if segment]
+    for segment in segments:
+        hit = SCHOOL_INDEX.lookup(segment)
+        if hit:
+            return hit
+    for segment in segments:
+        hit = SCHOOL_INDEX.search(segment)
+        if hit:
+            return hit
+    return (segments[0] if segments else "", DEFAULT_SCHOOL_TIER)
+
+
+def resolve_company(company: str) -> Tuple[str, str]:
+    """
+    Resolve a company name like "Palantir Technologies Inc." or "Scale AI".
+
+    Returns:
+        (company id, tier); unknown companies keep their normalized name as
+        the id and are "industry" tier when the name reads as AI or tech
+    """
+    normalized = normalize_entity(company)
+    hit = COMPANY_INDEX.lookup(normalized) or COMPANY_INDEX.lookup(_strip_company_suffixes(normalized)) or COMPANY_INDEX.search(normalized)
+    if hit:
+        return hit
+    if INDUSTRY_TOKENS.intersection(normalized.split()):
+        return (normalized, "industry")
+    return (normalized, DEFAULT_COMPANY_TIER)
@@ -0,0 +1,175 @@
+"""
+Bulk Export
+Streams a job's saved results out of the candidate store as CSV, JSONL or
+Parquet for downstream ATS imports. Rows are read a page at a time with the
+store's keyset pagination and encoded page by page, so memory stays constant
+however many rows a job has.
+
+Parquet needs the pyarrow package; CSV and JSONL need nothing extra.
+
+Usage:
+    python export.py JOB_ID                                  # CSV to stdout
+    python export.py JOB_ID --format parquet --output results.parquet
+    python export.py JOB_ID --format jsonl --db candidates.db --chunk-size 5000
+"""
+
+import argparse
+import csv
+import io
+import sys
+from typing import Dict, Any, Iterable, Iterator, List
+
+from candidate_store import CandidateStore, DIMENSION_COLUMNS
+from serialization import dumps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None
+
+# Rows read from the store per page
+DEFAULT_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    "candidate_id", "name", "linkedin_url", "headline", "location", "experience", "education", "skills", "company",
+    "fit_score", *DIMENSION_COLUMNS.values(), "outreach_message", "scored_at",
+)
+FLOAT_COLUMNS = frozenset(("fit_score", *DIMENSION_COLUMNS.values()))
+
+
+def export_row(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a stored candidate into EXPORT_COLUMNS, one column per breakdown dimension"""
+    breakdown = candidate.get("score_breakdown") or {}
+    row = {column: candidate.get(column) for column in EXPORT_COLUMNS}
+    for dimension, column in DIMENSION_COLUMNS.items():
+        row[column] = breakdown.get(dimension)
+    return row
+
+
+def iter_chunks(store: CandidateStore, job_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """A job's candidates, best fit first, as lists of export rows of at most chunk_size"""
+    cursor = None
+    while True:
+        candidates, cursor = store.job_candidates(job_id, chunk_size, cursor)
+        if candidates:
+            yield [export_row(candidate) for candidate in candidates]
+        if cursor is None:
+            return
+
+
+def write_csv(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # header of an empty export
+        yield buffer.getvalue().encode("utf-8")
+
+
+def write_jsonl(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield b"".join(dumps(row) + b"\n" for row in chunk)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands the written bytes back to the generator streaming them"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def write_parquet(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """One row group per chunk; the footer follows the last one"""
+    if pyarrow is None:
+        raise RuntimeError("Parquet export needs the pyarrow package")
+    schema = pyarrow.schema([
+        (column, pyarrow.float64() if column in FLOAT_COLUMNS else pyarrow.string()) for column in EXPORT_COLUMNS
+    ])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    try:
+        for chunk in chunks:
+            writer.write_table(pyarrow.Table.from_pylist(chunk, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+# Format -> (writer, media type, file extension)
+FORMATS = {
+    "csv": (write_csv, "text/csv", "csv"),
+    "jsonl": (write_jsonl, "application/x-ndjson", "jsonl"),
+    "parquet": (write_parquet, "application/vnd.apache.parquet", "parquet"),
+}
+
+
+def stream_export(store: CandidateStore, job_id: str, file_format: str = "csv", chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Encoded export of a job's saved candidates, a chunk at a time.
+
+    job_id is a sourcing run's job_id or a job description hash, as for
+    CandidateStore.job_candidates.
+
+    Raises ValueError for an unknown format and RuntimeError when Parquet is
+    requested without pyarrow, both before anything is read.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}, expected one of {tuple(FORMATS)}")
+    if file_format == "parquet" and pyarrow is None:
+        raise RuntimeError("Parquet export needs the pyarrow package")
+    writer = FORMATS[file_format][0]
+    return writer(iter_chunks(store, job_id, chunk_size))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a job's saved candidates")
+    parser.add_argument("job_id", help="job_id returned by /sourcing, or the job description hash")
+    parser.add_argument("--format", choices=tuple(FORMATS), default="csv")
+    parser.add_argument("--output", help="file to write (default: stdout)")
+    parser.add_argument("--db", default="candidates.db", help="candidate store to read")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows read and encoded at a time")
+    args = parser.parse_args()
+
+    store = CandidateStore(args.db)
+    if store.resolve_job(args.job_id) is None:
+        parser.exit(1, f"Unknown job: {args.job_id}\n")
+    try:
+        chunks = stream_export(store, args.job_id, args.format, args.chunk_size)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in chunks:
+            output.write(data)
+    finally:
+        if args.output:
+            output.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Pipeline Instrumentation
+Lightweight per-stage wall time, item counts, throughput and LLM latency
+percentiles for a single sourcing run, plus throttled UI progress updates.
+
+Agent methods call timed_stage()/timed_llm_call() without being handed a
+timer: the active PipelineTimer is tracked in a context variable, and the
+helpers are no-ops when no run is being timed.
+"""
+
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Callable, Iterator
+
+import metrics
+
+logger = logging.getLogger("synapse.pipeline")
+
+_current_timer: ContextVar[Optional["PipelineTimer"]] = ContextVar("current_timer", default=None)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0.0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class PipelineTimer:
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.llm_latencies: List[float] = []
+        self.llm_errors = 0
+        # LLM calls may be recorded from worker threads
+        self._llm_lock = threading.Lock()
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0) -> Iterator[Dict[str, float]]:
+        """
+        Time a pipeline stage.
+
+        Yields the stage record so callers that only learn the item count
+        inside the block can set record["items"] themselves. Repeated stages
+        with the same name accumulate.
+        """
+        record = self.stages.setdefault(name, {"seconds": 0.0, "items": 0})
+        record["items"] += items
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] += time.perf_counter() - start
+
+    def record_llm_call(self, latency: float, ok: bool = True):
+        with self._llm_lock:
+            self.llm_latencies.append(latency)
+            if not ok:
+                self.llm_errors += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Return stage timings and LLM latency percentiles as plain JSON-able data"""
+        stages = {}
+        for name, record in self.stages.items():
+            seconds = record["seconds"]
+            stages[name] = {
+                "seconds": round(seconds, 6),
+                "items": int(record["items"]),
+                "items_per_second": round(record["items"] / seconds, 1) if seconds > 0 and record["items"] else None,
+            }
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 6),
+            "stages": stages,
+            "llm": {
+                "calls": len(self.llm_latencies),
+                "errors": self.llm_errors,
+                "p50_ms": round(percentile(self.llm_latencies, 50) * 1000, 1),
+                "p90_ms": round(percentile(self.llm_latencies, 90) * 1000, 1),
+                "p99_ms": round(percentile(self.llm_latencies, 99) * 1000, 1),
+            },
+        }
+
+    def log(self):
+        logger.info("%s timings %s", self.name, json.dumps(self.summary()))
+
+    def export_metrics(self):
+        """Fold this run's stage timings into the process-wide Prometheus metrics"""
+        for name, record in self.stages.items():
+            metrics.STAGE_LATENCY.labels(name).observe(record["seconds"])
+            metrics.STAGE_ITEMS.labels(name).inc(record["items"])
+        score = self.stages.get("score")
+        if score and score["items"]:
+            metrics.CANDIDATES_SCORED.inc(score["items"])
+            if score["seconds"] > 0:
+                metrics.SCORING_THROUGHPUT.set(score["items"] / score["seconds"])
+
+
+@contextmanager
+def pipeline_timer(name: str = "pipeline") -> Iterator[PipelineTimer]:
+    """Make a new PipelineTimer the active timer for the duration of the block"""
+    timer = PipelineTimer(name)
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+        timer.log()
+        timer.export_metrics()
+
+
+def current_timer() -> Optional[PipelineTimer]:
+    return _current_timer.get()
+
+
+@contextmanager
+def timed_stage(name: str, items: int = 0) -> Iterator[Dict[str, float]]:
+    """Time a stage on the active timer, if any"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield {"seconds": 0.0, "items": items}
+        return
+    with timer.stage(name, items) as record:
+        yield record
+
+
+@contextmanager
+def timed_llm_call() -> Iterator[None]:
+    """Record the latency of an LLM call on the active timer and in metrics; exceptions count as errors"""
+    timer = _current_timer.get()
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        latency = time.perf_counter() - start
+        metrics.LLM_LATENCY.observe(latency)
+        metrics.LLM_ERRORS.inc()
+        if timer is not None:
+            timer.record_llm_call(latency, ok=False)
+        raise
+    latency = time.perf_counter() - start
+    metrics.LLM_LATENCY.observe(latency)
+    if timer is not None:
+        timer.record_llm_call(latency)
+
+
+def in_current_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Bind fn to a copy of the caller's context, for running on a worker thread.
+
+    Pool threads don't inherit context variables, so without this the active
+    timer would not see LLM calls made there. Wrap once per submitted task.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+class ThrottledProgress:
+    """
+    Forward progress updates to a UI callback at most every min_interval seconds.
+
+    Updating a Streamlit progress bar per candidate costs one websocket message
+    each; throttling keeps the bar live while sending a handful of updates.
+    """
+
+    def __init__(self, update: Callable[[float], Any], total: int, min_interval: float = 0.1):
+        self.update = update
+        self.total = max(total, 1)
+        self.min_interval = min_interval
+        self.last_update = 0.0
+
+    def advance(self, done: int):
+        now = time.perf_counter()
+        if done >= self.total or now - self.last_update >= self.min_interval:
+            self.last_update = now
+            self.update(min(done / self.total, 1.0))
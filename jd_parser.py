@@ -0,0 +1,287 @@
+"""
+Job Description Parsing
+Local, deterministic extraction of the search terms sourcing needs from a
+job description: title, skills, location, company and seniority. It is a
+handful of regular expressions over the text, so parsing a job never waits
+on the network.
+
+An LLM can optionally enrich the local terms (SYNAPSE_JD_ENRICHMENT=llm).
+Enrichment runs in the background and its result is cached per job
+description hash: the first request for a job uses the local terms, later
+requests for the same job get the enriched ones.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Optional
+
+import llm_budget
+import metrics
+from candidate_parser import RELEVANT_SKILL_TERMS
+from instrumentation import timed_llm_call
+from llm_backend import parse_json_text, estimate_tokens
+from shared_cache import SharedCache
+from skill_embeddings import SKILL_CONCEPTS
+
+JD_ENRICHMENT = os.getenv("SYNAPSE_JD_ENRICHMENT", "off").lower()
+
+# Keys of the search terms dict; "experience" holds the seniority level
+SEARCH_TERM_FIELDS = ("title", "skills", "location", "company", "experience")
+
+DEFAULT_TITLE = "Software Engineer"
+MAX_SKILLS = 8
+MAX_ENRICHED_JOBS = 256
+ENRICHMENT_TTL = 7 * 24 * 3600
+# Token reservation for an enrichment call, on top of the job description itself
+ENRICHMENT_PROMPT_TOKENS = 60
+ENRICHMENT_OUTPUT_TOKENS = 150
+
+_US_STATES = (
+    "AL AK AZ AR CA CO CT DE DC FL GA HI ID IL IN IA KS KY LA ME MD MA MI MN MS MO MT NE NV NH NJ NM NY "
+    "NC ND OH OK OR PA RI SC SD TN TX UT VT VA WA WV WI WY"
+).split()
+
+_LABEL = r"^\s*(?:{})\s*:\s*(.+?)\s*$"
+_TITLE_LABEL = re.compile(_LABEL.format("job title|title|position|role"), re.IGNORECASE | re.MULTILINE)
+_COMPANY_LABEL = re.compile(_LABEL.format("company|employer|organization"), re.IGNORECASE | re.MULTILINE)
+_LOCATION_LABEL = re.compile(_LABEL.format("location|office|based in"), re.IGNORECASE | re.MULTILINE)
+
+_HIRING_PHRASE = re.compile(r"(?:looking for|hiring|seeking)\s+(?:an?\s+)?((?:[A-Z][\w+/&-]*,? ?){1,6})")
+_AT_COMPANY = re.compile(r"\s+(?:at|@)\s+(.+)$")
+_PARENTHETICAL = re.compile(r"\s*\([^)]*\)")
+_JOIN_COMPANY = re.compile(r"\b(?:[Jj]oin|About) +([A-Z][\w.&-]*(?: +[A-Z][\w.&-]*){0,3})")
+_CITY_STATE = re.compile(r"\b([A-Z][a-z]+(?: +[A-Z][a-z]+){0,2}), *(" + "|".join(_US_STATES) + r")\b")
+_LOCATED_IN = re.compile(r"\b(?:located|based|office) +in +([A-Z][a-z]+(?: +[A-Z][a-z]+){0,2})")
+_NOT_A_TITLE = re.compile(r"^(?:about|who|we|our|the)\b", re.IGNORECASE)
+_REMOTE = re.compile(r"\bremote\b", re.IGNORECASE)
+_YEARS = re.compile(r"(\d+)\s*\+?\s*(?:-\s*\d+\s*)?(?:years?|yrs?)", re.IGNORECASE)
+
+_SENIORITY = re.compile(r"\b(principal|staff|lead|senior|sr\.?|mid[- ]level|junior|jr\.?|entry[- ]level|intern)\b", re.IGNORECASE)
+_SENIORITY_LEVELS = {
+    "principal": "Principal", "staff": "Staff", "lead": "Lead", "senior": "Senior", "sr": "Senior",
+    "mid-level": "Mid-Level", "mid level": "Mid-Level", "junior": "Junior", "jr": "Junior",
+    "entry-level": "Entry Level", "entry level": "Entry Level", "intern": "Intern",
+}
+
+# Skills recognised in job text: the rubric's terms plus every alias in the skill lexicon
+_SKILL_VOCABULARY = sorted(
+    {term for term in RELEVANT_SKILL_TERMS} | {alias for aliases in SKILL_CONCEPTS.values() for alias in aliases}
+    | {"java", "c++", "rust", "sql", "spark", "javascript", "typescript", "react"},
+    key=len, reverse=True,
+)
+# Longest alternative first, whole words only, with an optional plural ("LLMs")
+_SKILLS = re.compile(
+    r"(?<![\w+#])(" + "|".join(re.escape(term) for term in _SKILL_VOCABULARY) + r")s?(?![\w+#])",
+    re.IGNORECASE,
+)
+
+
+def job_hash(job_description: str) -> str:
+    """Stable cache key for a job description"""
+    return hashlib.sha256(job_description.strip().encode("utf-8")).hexdigest()
+
+
+def _first(pattern: re.Pattern, text: str) -> str:
+    match = pattern.search(text)
+    return match.group(1).strip() if match else ""
+
+
+def _heading(job_description: str) -> str:
+    """First non-empty line, if it reads like a job title heading rather than a sentence"""
+    for line in job_description.splitlines():
+        line = line.strip().strip("#*").strip()
+        if line:
+            is_title = len(line) <= 100 and not line.endswith(".") and not _NOT_A_TITLE.match(line)
+            return line if is_title else ""
+    return ""
+
+
+def extract_title(job_description: str, heading: str) -> str:
+    title = _first(_TITLE_LABEL, job_description)
+    if not title and heading:
+        title = _AT_COMPANY.sub("", heading)
+    if not title:
+        title = _first(_HIRING_PHRASE, job_description).rstrip(", ")
+    return _PARENTHETICAL.sub("", title).strip(" ,-") or DEFAULT_TITLE
+
+
+def extract_company(job_description: str, heading: str) -> str:
+    company = _first(_COMPANY_LABEL, job_description)
+    if not company and heading:
+        company = _first(_AT_COMPANY, heading)
+    if not company:
+        company = _first(_JOIN_COMPANY, job_description)
+    return _PARENTHETICAL.sub("", company).strip(" ,.-")
+
+
+def extract_location(job_description: str) -> str:
+    location = _first(_LOCATION_LABEL, job_description)
+    if not location:
+        match = _CITY_STATE.search(job_description)
+        location = f"{match.group(1)}, {match.group(2)}" if match else _first(_LOCATED_IN, job_description)
+    if not location and _REMOTE.search(job_description):
+        location = "Remote"
+    return location
+
+
+def extract_skills(job_description: str) -> str:
+    """Known skills in order of first mention, as written in the job"""
+    skills: Dict[str, str] = {}
+    for match in _SKILLS.finditer(job_description):
+        skills.setdefault(match.group(1).lower(), match.group(1))
+        if len(skills) >= MAX_SKILLS:
+            break
+    return ", ".join(skills.values())
+
+
+def extract_seniority(job_description: str, title: str) -> str:
+    """Seniority named in the title, then the body, else inferred from the years asked for"""
+    for text in (title, job_description):
+        match = _SENIORITY.search(text)
+        if match:
+            return _SENIORITY_LEVELS[match.group(1).lower().rstrip(".")]
+    years = _YEARS.search(job_description)
+    if not years:
+        return ""
+    years = int(years.group(1))
+    return "Junior" if years < 2 else "Mid-Level" if years < 5 else "Senior"
+
+
+@lru_cache(maxsize=256)
+def _parse(job_description: str) -> tuple:
+    heading = _heading(job_description)
+    title = extract_title(job_description, heading)
+    return (
+        ("title", title),
+        ("skills", extract_skills(job_description)),
+        ("location", extract_location(job_description)),
+        ("company", extract_company(job_description, heading)),
+        ("experience", extract_seniority(job_description, title)),
+    )
+
+
+def parse_job_description(job_description: str) -> Dict[str, str]:
+    """
+    Extract search terms from a job description without calling a model.
+
+    Returns:
+        Dictionary with title, skills, location, company and experience
+        (seniority level); fields the job doesn't mention are empty strings,
+        except title, which defaults to "Software Engineer"
+    """
+    return dict(_parse(job_description))
+
+
+class JobDescriptionParser:
+    """
+    Local search term extraction, optionally enriched by a model.
+
+    Enriched terms are cached per job hash in a bounded LRU shared by every
+    parser in the process, so they survive Streamlit reruns, and, given a
+    shared cache, in its "job_profile" namespace for other processes.
+    Enrichment requests are deduplicated while in flight.
+    """
+
+    _cache: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+    _pending = set()
+    _lock = threading.Lock()
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    def __init__(self, model=None, enrichment: str = JD_ENRICHMENT, shared_cache: Optional[SharedCache] = None):
+        self.model = model
+        self.enrichment = enrichment
+        self.shared_cache = shared_cache
+
+    def search_terms(self, job_description: str) -> Dict[str, str]:
+        """Local terms, overlaid with the cached enrichment for this job if there is one"""
+        terms = parse_job_description(job_description)
+        if self.enrichment != "llm" or self.model is None:
+            return terms
+
+        key = job_hash(job_description)
+        with self._lock:
+            enriched = self._cache.get(key)
+            if enriched is not None:
+                self._cache.move_to_end(key)
+        if enriched is None and self.shared_cache is not None:
+            enriched = self.shared_cache.get("job_profile", key)
+            if enriched is not None:
+                self._remember(key, enriched)
+        metrics.record_cache("jd_enrichment", enriched is not None)
+        if enriched is None:
+            self._schedule(key, job_description)
+            return terms
+        return {**terms, **enriched}
+
+    def _schedule(self, key: str, job_description: str):
+        cls = type(self)
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="jd-enrichment")
+        cls._executor.submit(self._enrich_and_cache, key, job_description)
+
+    def _enrich_and_cache(self, key: str, job_description: str):
+        # Enrichment is optional, so it is the first call dropped when the process runs short of tokens
+        reservation = llm_budget.reserve(estimate_tokens(job_description) + ENRICHMENT_PROMPT_TOKENS, ENRICHMENT_OUTPUT_TOKENS)
+        if reservation is None:
+            llm_budget.record_degradation("jd_extraction", "skipped")
+            with self._lock:
+                self._pending.discard(key)
+            return
+
+        try:
+            enriched = self.enrich(job_description)
+        except Exception:
+            # The local terms stay in use; the next request for this job retries
+            metrics.LLM_FALLBACKS.labels("jd_extraction").inc()
+            enriched = None
+        finally:
+            reservation.release()
+        with self._lock:
+            self._pending.discard(key)
+        if enriched:
+            self._remember(key, enriched)
+            if self.shared_cache is not None:
+                self.shared_cache.set("job_profile", key, enriched, ENRICHMENT_TTL)
+
+    def _remember(self, key: str, enriched: Dict[str, str]):
+        with self._lock:
+            self._cache[key] = enriched
+            self._cache.move_to_end(key)
+            while len(self._cache) > MAX_ENRICHED_JOBS:
+                self._cache.popitem(last=False)
+
+    def enrich(self, job_description: str) -> Dict[str, str]:
+        """Ask the model for the search terms; returns only the fields it filled in"""
+        prompt = f"""
+        Extract key information from this job description:
+        {job_description}
+
+        Return as JSON with these fields:
+        - title: job title
+        - skills: key technical skills
+        - location: preferred location
+        - company: company name
+        - experience: required experience level
+        """
+
+        with timed_llm_call():
+            response = self.model.generate_content(prompt)
+        data = parse_json_text(response.text)
+
+        enriched = {}
+        for field in SEARCH_TERM_FIELDS:
+            value = data.get(field)
+            if isinstance(value, list):
+                value = ", ".join(str(item) for item in value)
+            if isinstance(value, (str, int, float)) and str(value).strip():
+                enriched[field] = str(value).strip()
+        return enriched
@@ -3,8 +3,14 @@ Fake LinkedIn Candidates Dataset
 Based on the Synapse Fit Score Rubric
 """
 
+import os
 import random
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Optional, Tuple
+
+# Parsed candidates kept across all cached pools (see PoolCache)
+MAX_CACHED_POOL_CANDIDATES = int(os.getenv("SYNAPSE_POOL_CACHE_CANDIDATES", "200000"))
 
 # Elite schools (9-10 points)
 ELITE_SCHOOLS = [
@@ -119,79 +125,129 @@ LAST_NAMES = [
     "Flores", "Reyes", "Morales", "Gutierrez", "Castro", "Vargas", "Mendoza"
 ]
 
-def scrape_candidates(job_description: str, num_candidates: int = 50) -> List[Dict[str, Any]]:
+def pool_profile(job_description: str) -> Tuple[bool, bool, bool, bool]:
+    """
+    Return the job requirements that shape the generated candidate pool.
+    
+    Two job descriptions with the same profile produce equivalent pools, so
+    callers can reuse a pool across job description edits.
+    
+    Returns:
+        Tuple of (is_ml_role, is_senior, is_mountain_view, is_california)
+    """
+    job_lower = job_description.lower()
+    is_ml_role = any(term in job_lower for term in ["ml", "machine learning", "ai", "llm", "code generation"])
+    is_senior = any(term in job_lower for term in ["senior", "lead", "principal", "staff"])
+    is_mountain_view = "mountain view" in job_lower
+    is_california = "california" in job_lower or "ca" in job_lower
+    return is_ml_role, is_senior, is_mountain_view, is_california
+
+class PoolCache:
+    """
+    Least recently used generated pools, keyed by (pool profile, pool size).
+
+    Bounded by the total number of candidates held rather than the number of
+    pools, since one 100k pool outweighs a thousand default-size ones. A
+    pool larger than the whole budget is not cached.
+    """
+
+    def __init__(self, max_candidates: int = MAX_CACHED_POOL_CANDIDATES):
+        self.max_candidates = max_candidates
+        self.pools: "OrderedDict[Hashable, List[Dict[str, Any]]]" = OrderedDict()
+        self.candidates = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        with self.lock:
+            pool = self.pools.get(key)
+            if pool is not None:
+                self.pools.move_to_end(key)
+            return pool
+
+    def put(self, key: Hashable, pool: List[Dict[str, Any]]):
+        if len(pool) > self.max_candidates:
+            return
+        with self.lock:
+            previous = self.pools.pop(key, None)
+            if previous is not None:
+                self.candidates -= len(previous)
+            while self.pools and self.candidates + len(pool) > self.max_candidates:
+                self.candidates -= len(self.pools.popitem(last=False)[1])
+            self.pools[key] = pool
+            self.candidates += len(pool)
+
+def scrape_candidates(job_description: str, num_candidates: int = 50, seed: Optional[int] = None) -> List[Dict[str, Any]]:
     """
     Generate fake LinkedIn candidates based on the job description and scoring rubric.
     
     Args:
         job_description: The job description to match candidates against
         num_candidates: Number of candidates to generate
+        seed: Optional seed for a reproducible pool (benchmarks, tests); the
+            shared module-level random state is used when omitted
     
     Returns:
         List of candidate dictionaries with realistic profile data
     """
     candidates = []
+    rng = random.Random(seed) if seed is not None else random
     
     # Extract job requirements from description
-    job_lower = job_description.lower()
-    is_ml_role = any(term in job_lower for term in ["ml", "machine learning", "ai", "llm", "code generation"])
-    is_senior = any(term in job_lower for term in ["senior", "lead", "principal", "staff"])
-    is_mountain_view = "mountain view" in job_lower
-    is_california = "california" in job_lower or "ca" in job_lower
+    is_ml_role, is_senior, is_mountain_view, is_california = pool_profile(job_description)
     
     for i in range(num_candidates):
         # Generate name
-        first_name = random.choice(FIRST_NAMES)
-        last_name = random.choice(LAST_NAMES)
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
         name = f"{first_name} {last_name}"
         
         # Generate LinkedIn URL
-        linkedin_url = f"linkedin.com/in/{first_name.lower()}-{last_name.lower()}-{random.randint(100, 999)}"
+        linkedin_url = f"linkedin.com/in/{first_name.lower()}-{last_name.lower()}-{rng.randint(100, 999)}"
         
         # Generate education based on scoring
-        education_quality = random.choices(
+        education_quality = rng.choices(
             ["elite", "strong", "standard"],
             weights=[0.2, 0.4, 0.4]  # 20% elite, 40% strong, 40% standard
         )[0]
         
         if education_quality == "elite":
-            school = random.choice(ELITE_SCHOOLS)
-            degree = random.choice(["MS Computer Science", "PhD Computer Science", "MS Machine Learning"])
+            school = rng.choice(ELITE_SCHOOLS)
+            degree = rng.choice(["MS Computer Science", "PhD Computer Science", "MS Machine Learning"])
         elif education_quality == "strong":
-            school = random.choice(STRONG_SCHOOLS)
-            degree = random.choice(["MS Computer Science", "BS Computer Science", "MS Data Science"])
+            school = rng.choice(STRONG_SCHOOLS)
+            degree = rng.choice(["MS Computer Science", "BS Computer Science", "MS Data Science"])
         else:
-            school = random.choice(STANDARD_SCHOOLS)
-            degree = random.choice(["BS Computer Science", "BS Engineering", "MS Software Engineering"])
+            school = rng.choice(STANDARD_SCHOOLS)
+            degree = rng.choice(["BS Computer Science", "BS Engineering", "MS Software Engineering"])
         
         education = f"{school}, {degree}"
         
         # Generate experience years
         if is_senior:
-            experience_years = random.randint(4, 12)
+            experience_years = rng.randint(4, 12)
         else:
-            experience_years = random.randint(1, 6)
+            experience_years = rng.randint(1, 6)
         
         experience = f"{experience_years} years"
         
         # Generate company based on scoring
-        company_quality = random.choices(
+        company_quality = rng.choices(
             ["top", "relevant", "standard"],
             weights=[0.3, 0.5, 0.2]  # 30% top, 50% relevant, 20% standard
         )[0]
         
         if company_quality == "top":
-            company = random.choice(TOP_TECH_COMPANIES)
+            company = rng.choice(TOP_TECH_COMPANIES)
         elif company_quality == "relevant":
-            company = random.choice(RELEVANT_TECH_COMPANIES)
+            company = rng.choice(RELEVANT_TECH_COMPANIES)
         else:
-            company = random.choice(STANDARD_COMPANIES)
+            company = rng.choice(STANDARD_COMPANIES)
         
         # Generate job title
         if is_ml_role:
-            job_title = random.choice(ML_JOB_TITLES)
+            job_title = rng.choice(ML_JOB_TITLES)
         else:
-            job_title = random.choice([
+            job_title = rng.choice([
                 "Senior Software Engineer", "Software Engineer", "Backend Engineer",
                 "Full Stack Engineer", "DevOps Engineer", "Data Engineer"
             ])
@@ -202,25 +258,25 @@ def scrape_candidates(job_description: str, num_candidates: int = 50) -> List[Di
         if is_mountain_view:
             location = "Mountain View, CA"
         elif is_california:
-            location = random.choice([loc for loc in LOCATIONS if "CA" in loc])
+            location = rng.choice([loc for loc in LOCATIONS if "CA" in loc])
         else:
-            location = random.choice(LOCATIONS)
+            location = rng.choice(LOCATIONS)
         
         # Generate skills
         if is_ml_role:
-            num_skills = random.randint(4, 8)
-            skills = random.sample(ML_SKILLS, num_skills)
+            num_skills = rng.randint(4, 8)
+            skills = rng.sample(ML_SKILLS, num_skills)
         else:
-            skills = random.sample([
+            skills = rng.sample([
                 "Python", "Java", "JavaScript", "React", "Node.js", "SQL",
                 "Docker", "Kubernetes", "AWS", "Git", "REST APIs", "Microservices"
-            ], random.randint(4, 8))
+            ], rng.randint(4, 8))
         
         skills_str = ", ".join(skills)
         
         # Generate tenure at current role
-        tenure_years = random.randint(1, 5)
-        tenure_months = random.randint(0, 11)
+        tenure_years = rng.randint(1, 5)
+        tenure_months = rng.randint(0, 11)
         if tenure_months == 0:
             tenure = f"{tenure_years} years"
         else:
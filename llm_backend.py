@@ -0,0 +1,436 @@
+"""
+LLM Backends
+Pluggable model backends behind the generate_content() interface the agents
+call: the real Gemini model, or a local fake that simulates latency, rate
+limiting (429), server errors (500), malformed JSON and token usage without
+a network or quota.
+
+The backend is chosen by the SYNAPSE_LLM_BACKEND environment variable
+("gemini", the default, or "fake"). The fake is tuned with:
+
+    SYNAPSE_FAKE_LLM_LATENCY_MS     median latency per call (default 800)
+    SYNAPSE_FAKE_LLM_LATENCY_SIGMA  log-normal spread of the latency (default 0.5)
+    SYNAPSE_FAKE_LLM_RATE_LIMIT     probability of a 429 per call (default 0)
+    SYNAPSE_FAKE_LLM_ERROR_RATE     probability of a 500 per call (default 0)
+    SYNAPSE_FAKE_LLM_MALFORMED_RATE probability of malformed JSON (default 0)
+    SYNAPSE_FAKE_LLM_RPM            requests per minute before 429s (default unlimited)
+    SYNAPSE_FAKE_LLM_SEED           seed for reproducible runs
+"""
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional
+
+from linkedin_scrapper import scrape_candidates
+import llm_budget
+
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+_CODE_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?|\n?\s*```\s*$")
+
+
+def parse_json_text(text: str) -> Any:
+    """json.loads model output, tolerating the markdown code fences models like to add"""
+    return json.loads(_CODE_FENCE.sub("", text.strip()))
+
+
+class JSONObjectStream:
+    """
+    Incremental parser for a JSON array of objects arriving in chunks.
+
+    feed() returns each top-level object as soon as its closing brace
+    arrives. Text outside objects (the array brackets, commas, code fences,
+    chatter) is skipped, and an object that fails to parse is dropped without
+    losing the ones around it, so a partly broken response still yields
+    every valid object. Each character is scanned once.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.start = -1
+        self.in_string = False
+        self.escaped = False
+        self.errors = 0
+
+    def feed(self, text: str) -> List[Any]:
+        self.buffer += text
+        objects = []
+        buffer = self.buffer
+        for pos in range(self.pos, len(buffer)):
+            char = buffer[pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                # Strings only matter inside objects, where they may contain braces
+                self.in_string = self.depth > 0
+            elif char == "{":
+                if self.depth == 0:
+                    self.start = pos
+                self.depth += 1
+            elif char == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        objects.append(json.loads(buffer[self.start:pos + 1]))
+                    except ValueError:
+                        self.errors += 1
+                    self.start = -1
+
+        # Keep only the unfinished object, if any, for the next chunk
+        if self.depth > 0:
+            self.buffer = buffer[self.start:]
+            self.pos = len(self.buffer)
+            self.start = 0
+        else:
+            self.buffer = ""
+            self.pos = 0
+        return objects
+
+    def close(self) -> List[Any]:
+        """
+        End of stream: salvage objects trapped behind an unfinished one.
+
+        An unbalanced quote or brace inside one object swallows everything
+        after it, so the scan restarts just past that object's opening brace.
+        """
+        objects = []
+        while self.depth > 0:
+            rest = self.buffer[1:]  # the buffer starts at the unfinished object's brace
+            self.errors += 1
+            self.buffer, self.pos, self.depth, self.start = "", 0, 0, -1
+            self.in_string = self.escaped = False
+            objects.extend(self.feed(rest))
+        return objects
+
+
+def iter_json_objects(chunks: Iterable[str]) -> Iterator[Any]:
+    """Yield the top-level objects of a streamed JSON array as each one completes"""
+    stream = JSONObjectStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+    yield from stream.close()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token, as Gemini documents)"""
+    return max(1, math.ceil(len(text) / 4)) if text else 0
+
+
+class LLMError(Exception):
+    """An LLM call failed; code mirrors the HTTP status, as google.api_core exceptions do"""
+    code = 500
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        if code is not None:
+            self.code = code
+
+
+class RateLimitError(LLMError):
+    code = 429
+
+
+class ServerError(LLMError):
+    code = 500
+
+
+class UsageMetadata:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class LLMResponse:
+    """Response shaped like Gemini's: .text plus .usage_metadata token counts"""
+
+    def __init__(self, text: str, usage_metadata: UsageMetadata):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class LLMStreamResponse:
+    """
+    Streamed response shaped like Gemini's stream=True result.
+
+    Iterating yields chunks with a .text attribute as they arrive; .text
+    returns the whole response, consuming any chunks not yet read.
+
+    on_finish(stream, error) runs once, when the stream has been read to the
+    end, fails, or is closed or dropped unread, so whatever a call holds or
+    owes (a concurrency slot, its token usage) is settled when the stream
+    actually ends rather than when it is returned.
+    """
+
+    def __init__(self, chunks: Iterable[Any], on_finish: Optional[Callable[["LLMStreamResponse", Optional[BaseException]], None]] = None):
+        self._chunks = iter(chunks)
+        self._received: List[str] = []
+        self._on_finish = on_finish
+        self.usage_metadata: Optional[UsageMetadata] = None
+
+    def __iter__(self) -> Iterator[Any]:
+        error = None
+        try:
+            for chunk in self._chunks:
+                self._received.append(chunk.text)
+                self.usage_metadata = getattr(chunk, "usage_metadata", None) or self.usage_metadata
+                yield chunk
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._finish(error)
+
+    @property
+    def text(self) -> str:
+        for _ in self:
+            pass
+        return "".join(self._received)
+
+    @property
+    def received_text(self) -> str:
+        """Text of the chunks read so far"""
+        return "".join(self._received)
+
+    def _finish(self, error: Optional[BaseException] = None):
+        on_finish, self._on_finish = self._on_finish, None
+        if on_finish is not None:
+            on_finish(self, error)
+
+    def close(self):
+        """End the stream without reading the rest"""
+        self._finish()
+
+    def __del__(self):
+        self._finish()
+
+
+def stream_usage(prompt: str, stream: LLMStreamResponse) -> UsageMetadata:
+    """Usage a finished stream reported, or an estimate from the prompt and the text it produced"""
+    usage = stream.usage_metadata
+    if usage is not None and getattr(usage, "candidates_token_count", 0):
+        return usage
+    return UsageMetadata(estimate_tokens(prompt), estimate_tokens(stream.received_text))
+
+
+class ModelBackend:
+    """Base class: tracks call and token usage across threads"""
+
+    name = "base"
+
+    def __init__(self):
+        self._usage_lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        raise NotImplementedError
+
+    def record_usage(self, usage: Optional[UsageMetadata], ok: bool = True):
+        prompt_tokens = (usage.prompt_token_count or 0) if usage is not None else 0
+        output_tokens = (usage.candidates_token_count or 0) if usage is not None else 0
+        with self._usage_lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+        if usage is not None:
+            # Bill the active sourcing job and the process-wide window
+            llm_budget.charge_usage(prompt_tokens, output_tokens)
+
+    def usage(self) -> Dict[str, int]:
+        with self._usage_lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": self.prompt_tokens + self.output_tokens,
+            }
+
+
+class GeminiBackend(ModelBackend):
+    name = "gemini"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, api_key: Optional[str] = None):
+        super().__init__()
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        try:
+            response = self.model.generate_content(prompt, stream=stream, **kwargs)
+        except Exception:
+            self.record_usage(None, ok=False)
+            raise
+        if stream:
+            # Streamed responses only carry usage once consumed; it is charged when the stream ends
+            return LLMStreamResponse(response, on_finish=lambda chunks, error: self.record_usage(stream_usage(prompt, chunks), ok=error is None))
+        self.record_usage(getattr(response, "usage_metadata", None))
+        return response
+
+
+class FakeModelBackend(ModelBackend):
+    """
+    Offline stand-in for Gemini.
+
+    Latency is log-normal around latency_ms. Failures are injected before the
+    latency is spent on the happy path, except 500s, which fail after it, the
+    way an overloaded server does. Responses are plausible for the prompts
+    the agents send: a JSON object for job extraction, a JSON array for
+    profile generation, a score for fit judging and a greeting for outreach.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 800.0, latency_sigma: float = 0.5,
+                 rate_limit_rate: float = 0.0, error_rate: float = 0.0, malformed_rate: float = 0.0,
+                 requests_per_minute: Optional[int] = None, seed: Optional[int] = None,
+                 stream_chunk_chars: int = 200):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.requests_per_minute = requests_per_minute
+        self.stream_chunk_chars = stream_chunk_chars
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._window: deque = deque()
+        self._window_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "FakeModelBackend":
+        rpm = os.getenv("SYNAPSE_FAKE_LLM_RPM")
+        seed = os.getenv("SYNAPSE_FAKE_LLM_SEED")
+        return cls(
+            latency_ms=float(os.getenv("SYNAPSE_FAKE_LLM_LATENCY_MS", "800")),
+            latency_sigma=float(os.getenv("SYNAPSE_FAKE_LLM_LATENCY_SIGMA", "0.5")),
+            rate_limit_rate=float(os.getenv("SYNAPSE_FAKE_LLM_RATE_LIMIT", "0")),
+            error_rate=float(os.getenv("SYNAPSE_FAKE_LLM_ERROR_RATE", "0")),
+            malformed_rate=float(os.getenv("SYNAPSE_FAKE_LLM_MALFORMED_RATE", "0")),
+            requests_per_minute=int(rpm) if rpm else None,
+            seed=int(seed) if seed else None,
+        )
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self.rng.random()
+
+    def sample_latency(self) -> float:
+        """Seconds for one call, drawn from a log-normal with median latency_ms"""
+        if self.latency_ms <= 0:
+            return 0.0
+        with self._rng_lock:
+            return self.rng.lognormvariate(math.log(self.latency_ms / 1000), self.latency_sigma)
+
+    def _over_quota(self) -> bool:
+        """Sliding one-minute request window, like a per-minute API quota"""
+        if not self.requests_per_minute:
+            return False
+        now = time.monotonic()
+        with self._window_lock:
+            while self._window and now - self._window[0] >= 60:
+                self._window.popleft()
+            if len(self._window) >= self.requests_per_minute:
+                return True
+            self._window.append(now)
+            return False
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        latency = self.sample_latency()
+
+        if self._over_quota() or self._random() < self.rate_limit_rate:
+            # Quota rejections come back fast, before any generation
+            time.sleep(min(latency, 0.05))
+            self.record_usage(None, ok=False)
+            raise RateLimitError("429 Resource has been exhausted (e.g. check quota).")
+
+        if self._random() < self.error_rate:
+            time.sleep(latency)
+            self.record_usage(None, ok=False)
+            raise ServerError("500 An internal error has occurred.")
+
+        text = self.respond(prompt)
+        # Only JSON answers get malformed; free-text prompts (outreach) get free text back
+        if self._random() < self.malformed_rate and text.startswith(("{", "[")):
+            text = self.malform(text)
+
+        usage = UsageMetadata(estimate_tokens(prompt), estimate_tokens(text))
+        if stream:
+            # Charged when the stream ends, as GeminiBackend does
+            return LLMStreamResponse(self._stream(text, usage, latency), on_finish=lambda chunks, error: self.record_usage(stream_usage(prompt, chunks), ok=error is None))
+        self.record_usage(usage)
+        time.sleep(latency)
+        return LLMResponse(text, usage)
+
+    def _stream(self, text: str, usage: UsageMetadata, latency: float) -> Iterator[LLMResponse]:
+        pieces = [text[i:i + self.stream_chunk_chars] for i in range(0, len(text), self.stream_chunk_chars)] or [""]
+        delay = latency / len(pieces)
+        for piece in pieces:
+            time.sleep(delay)
+            yield LLMResponse(piece, usage)
+
+    def respond(self, prompt: str) -> str:
+        """Canned but plausible output for each kind of prompt the agents send"""
+        if '{"score"' in prompt:
+            with self._rng_lock:
+                score = round(self.rng.uniform(4.0, 10.0), 1)
+            return json.dumps({"score": score, "reason": "Relevant experience for the role."})
+
+        if "JSON array" in prompt:
+            with self._rng_lock:
+                seed = self.rng.randrange(2**32)
+            profiles = scrape_candidates(prompt, 5, seed=seed)
+            return json.dumps(profiles, indent=2)
+
+        if "Return as JSON" in prompt:
+            return json.dumps({
+                "title": "Software Engineer",
+                "skills": "Python, Machine Learning",
+                "location": "Mountain View",
+                "company": "Windsurf",
+                "experience": "Senior",
+            })
+
+        match = re.search(r"Candidate:\s*(.+)", prompt)
+        name = match.group(1).strip() if match else "there"
+        return (
+            f"Hi {name},\n\nYour background caught my attention, and I think it lines up well with a role "
+            f"we're hiring for. Would you be open to a short call this week to talk it through?"
+        )
+
+    def malform(self, text: str) -> str:
+        """Break JSON output the way real model output breaks: markdown fences or truncation"""
+        if self._random() < 0.5:
+            return f"```json\n{text}\n```"
+        return text[:max(1, len(text) // 2)]
+
+
+def load_backend(model_name: str = DEFAULT_MODEL) -> ModelBackend:
+    """Create the backend selected by SYNAPSE_LLM_BACKEND"""
+    backend = os.getenv("SYNAPSE_LLM_BACKEND", "gemini").lower()
+    if backend == "fake":
+        return FakeModelBackend.from_env()
+    if backend == "gemini":
+        return GeminiBackend(model_name)
+    raise ValueError(f"Unknown SYNAPSE_LLM_BACKEND: {backend}")
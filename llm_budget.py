@@ -0,0 +1,226 @@
+"""
+LLM Token and Cost Budgets
+Token and cost accounting for every model call, per sourcing job and per
+process-wide time window, plus the budgets pipelines degrade against.
+
+Before a call, a caller reserves its estimated tokens. A denied reservation
+means the call would overrun a budget, and the caller degrades: a shorter
+prompt, then a template instead of the model. Actual usage reported by the
+backend is charged when the call returns. Like the pipeline timer, the
+active job budget lives in a context variable, so agent methods don't need
+it passed in.
+
+Configured with:
+
+    SYNAPSE_JOB_TOKEN_BUDGET        tokens one sourcing job may spend (default unlimited)
+    SYNAPSE_JOB_COST_BUDGET         USD one sourcing job may spend (default unlimited)
+    SYNAPSE_WINDOW_TOKEN_BUDGET     tokens the whole process may spend per window (default unlimited)
+    SYNAPSE_BUDGET_WINDOW_SECONDS   length of that window (default 3600)
+    SYNAPSE_LLM_INPUT_COST_PER_1M   USD per million prompt tokens (default 0.075)
+    SYNAPSE_LLM_OUTPUT_COST_PER_1M  USD per million output tokens (default 0.30)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, Optional
+
+import metrics
+
+# Gemini 1.5 Flash list prices
+INPUT_COST_PER_TOKEN = float(os.getenv("SYNAPSE_LLM_INPUT_COST_PER_1M", "0.075")) / 1_000_000
+OUTPUT_COST_PER_TOKEN = float(os.getenv("SYNAPSE_LLM_OUTPUT_COST_PER_1M", "0.30")) / 1_000_000
+
+_current_budget: ContextVar[Optional["JobBudget"]] = ContextVar("current_budget", default=None)
+
+
+def _optional_env(name: str, kind=float) -> Optional[float]:
+    value = os.getenv(name)
+    return kind(value) if value else None
+
+
+def token_cost(prompt_tokens: int, output_tokens: int) -> float:
+    """USD cost of a call"""
+    return prompt_tokens * INPUT_COST_PER_TOKEN + output_tokens * OUTPUT_COST_PER_TOKEN
+
+
+class WindowBudget:
+    """Tokens spent by the whole process over a sliding time window"""
+
+    def __init__(self, max_tokens: Optional[int] = None, window_seconds: float = 3600.0):
+        self.max_tokens = max_tokens
+        self.window_seconds = window_seconds
+        self.spent: deque = deque()  # (time, tokens)
+        self.spent_tokens = 0
+        self.pending_tokens = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "WindowBudget":
+        return cls(
+            max_tokens=_optional_env("SYNAPSE_WINDOW_TOKEN_BUDGET", int),
+            window_seconds=float(os.getenv("SYNAPSE_BUDGET_WINDOW_SECONDS", "3600")),
+        )
+
+    def _expire(self, now: float):
+        while self.spent and now - self.spent[0][0] >= self.window_seconds:
+            self.spent_tokens -= self.spent.popleft()[1]
+
+    def try_reserve(self, tokens: int) -> bool:
+        with self.lock:
+            self._expire(time.monotonic())
+            if self.max_tokens is not None and self.spent_tokens + self.pending_tokens + tokens > self.max_tokens:
+                return False
+            self.pending_tokens += tokens
+            return True
+
+    def release(self, tokens: int):
+        with self.lock:
+            self.pending_tokens -= tokens
+
+    def charge(self, tokens: int):
+        with self.lock:
+            self.spent.append((time.monotonic(), tokens))
+            self.spent_tokens += tokens
+
+
+# Shared by every job in the process
+WINDOW_BUDGET = WindowBudget.from_env()
+
+
+class Reservation:
+    """Tokens set aside for one call; release it once the call has returned"""
+
+    def __init__(self, budget: Optional["JobBudget"], window: WindowBudget, prompt_tokens: int, output_tokens: int):
+        self.budget = budget
+        self.window = window
+        self.tokens = prompt_tokens + output_tokens
+        self.cost = token_cost(prompt_tokens, output_tokens)
+        self.released = False
+
+    def release(self):
+        if self.released:
+            return
+        self.released = True
+        self.window.release(self.tokens)
+        if self.budget is not None:
+            self.budget.release(self)
+
+
+class JobBudget:
+    """Token and cost limits and usage for one sourcing job"""
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost: Optional[float] = None, window: WindowBudget = WINDOW_BUDGET):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.window = window
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cost = 0.0
+        self.pending_tokens = 0
+        self.pending_cost = 0.0
+        self.degraded: Dict[str, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "JobBudget":
+        return cls(
+            max_tokens=_optional_env("SYNAPSE_JOB_TOKEN_BUDGET", int),
+            max_cost=_optional_env("SYNAPSE_JOB_COST_BUDGET"),
+        )
+
+    def try_reserve(self, reservation: Reservation) -> bool:
+        with self.lock:
+            tokens = self.prompt_tokens + self.output_tokens + self.pending_tokens + reservation.tokens
+            if self.max_tokens is not None and tokens > self.max_tokens:
+                return False
+            if self.max_cost is not None and self.cost + self.pending_cost + reservation.cost > self.max_cost:
+                return False
+            self.pending_tokens += reservation.tokens
+            self.pending_cost += reservation.cost
+            return True
+
+    def release(self, reservation: Reservation):
+        with self.lock:
+            self.pending_tokens -= reservation.tokens
+            self.pending_cost -= reservation.cost
+
+    def charge(self, prompt_tokens: int, output_tokens: int):
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.output_tokens += output_tokens
+            self.cost += token_cost(prompt_tokens, output_tokens)
+
+    def record_degradation(self, operation: str, level: str):
+        with self.lock:
+            levels = self.degraded.setdefault(operation, {})
+            levels[level] = levels.get(level, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Usage so far as plain JSON-able data"""
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+                "total_tokens": self.prompt_tokens + self.output_tokens,
+                "cost_usd": round(self.cost, 6),
+                "token_budget": self.max_tokens,
+                "cost_budget_usd": self.max_cost,
+                "degraded": {operation: dict(levels) for operation, levels in self.degraded.items()},
+            }
+
+
+@contextmanager
+def job_budget(budget: Optional[JobBudget] = None) -> Iterator[JobBudget]:
+    """Make a job budget (by default from the environment) the active one for the duration of the block"""
+    budget = budget or JobBudget.from_env()
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def current_budget() -> Optional[JobBudget]:
+    return _current_budget.get()
+
+
+def reserve(prompt_tokens: int, output_tokens: int) -> Optional[Reservation]:
+    """
+    Set aside tokens for a call against the active job budget and the window.
+
+    Returns None if the call would overrun either; the caller should degrade.
+    """
+    budget = _current_budget.get()
+    reservation = Reservation(budget, WINDOW_BUDGET, prompt_tokens, output_tokens)
+    if not WINDOW_BUDGET.try_reserve(reservation.tokens):
+        return None
+    if budget is not None and not budget.try_reserve(reservation):
+        WINDOW_BUDGET.release(reservation.tokens)
+        return None
+    return reservation
+
+
+def record_degradation(operation: str, level: str):
+    """Count a call shortened ("short"), replaced by a template ("template") or dropped ("skipped") to stay in budget"""
+    metrics.LLM_BUDGET_DEGRADATIONS.labels(operation, level).inc()
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.record_degradation(operation, level)
+
+
+def charge_usage(prompt_tokens: int, output_tokens: int):
+    """Charge a finished call's tokens to the active job budget, the window and the metrics"""
+    metrics.LLM_TOKENS.labels("prompt").inc(prompt_tokens)
+    metrics.LLM_TOKENS.labels("output").inc(output_tokens)
+    metrics.LLM_COST.inc(token_cost(prompt_tokens, output_tokens))
+    WINDOW_BUDGET.charge(prompt_tokens + output_tokens)
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.charge(prompt_tokens, output_tokens)
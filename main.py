@@ -1,234 +1,137 @@
 import streamlit as st
-import google.generativeai as genai
 import pandas as pd
 import requests
 import json
+import math
 import re
 import time
 import sqlite3
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import os
 from datetime import datetime
-from linkedin_scrapper import scrape_candidates
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from linkedin_scrapper import scrape_candidates, pool_profile, PoolCache
+from rubric import incremental_breakdown, fit_score, TopK
+from candidate_parser import parse_candidate, parse_job, display_fields
+from scoring import score_dimension
+from candidate_store import CandidateStore
+import export
+from dedup import CandidateDeduplicator
+from jd_parser import job_hash, parse_job_description
+from ranking import RankingConfig, RERANKERS, build_reranker, rerank_shortlist
+import metrics
+from instrumentation import pipeline_timer, timed_stage, timed_llm_call, in_current_context, ThrottledProgress
+from rate_limit import AdaptiveModel, LLM_CONCURRENCY
+from llm_backend import load_backend, estimate_tokens
+import llm_budget
+from profiling import profile_mode, profile_run, caches_bypassed
 from dotenv import load_dotenv
 
 load_dotenv()
 
-gemini_api_key = os.getenv("GEMINI_API_KEY")
+# Gemini by default; SYNAPSE_LLM_BACKEND=fake swaps in the offline stand-in.
+# Calls share the process-wide adaptive concurrency limit (see rate_limit.py)
+model = AdaptiveModel(load_backend("gemini-1.5-flash"), LLM_CONCURRENCY)
 
-# Configure Gemini API
-genai.configure(api_key=gemini_api_key)
-model = genai.GenerativeModel("gemini-1.5-flash")
+# Re-ranking defaults and budgets; the reranker and shortlist size can be changed in the sidebar
+ranking_defaults = RankingConfig.from_env()
+
+# Output tokens reserved per outreach message: about 200 words, or 120 for the short prompt
+OUTREACH_OUTPUT_TOKENS = {"full": 300, "short": 160}
 
 class LinkedInSourcingAgent:
-    def __init__(self):
-        self.db_path = "candidates.db"
-        self.init_database()
-        
-    def init_database(self):
-        """Initialize SQLite database for caching"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS candidates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT,
-                linkedin_url TEXT UNIQUE,
-                headline TEXT,
-                location TEXT,
-                experience TEXT,
-                education TEXT,
-                skills TEXT,
-                company TEXT,
-                job_description TEXT,
-                fit_score REAL,
-                score_breakdown TEXT,
-                outreach_message TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
-        conn.close()
+    def __init__(self, store: CandidateStore):
+        self.store = store
+        self.candidate_pools = PoolCache()  # (pool profile, size) -> parsed candidates, LRU
+        self.deduplicator = CandidateDeduplicator(store)
     
-    def search_linkedin(self, job_description: str) -> List[Dict[str, Any]]:
+    def search_linkedin(self, job_description: str, num_candidates: int = 100) -> List[Dict[str, Any]]:
         """Search for LinkedIn profiles based on job description"""
+        # Job description edits that keep the same pool profile reuse the pool,
+        # along with the job-independent scores cached on its candidates
+        profile = (pool_profile(job_description), num_candidates)
+        # Profiled runs generate the pool again, so the profile shows that work
+        cached = None if caches_bypassed() else self.candidate_pools.get(profile)
+        metrics.record_cache("candidate_pool", cached is not None)
+        if cached is not None:
+            return cached
+        
         st.info("🔍 Generating candidate profiles...")
         
-        # Use the fake dataset instead of Gemini
-        candidates = scrape_candidates(job_description, num_candidates=100)
+        with timed_stage("generate", items=num_candidates):
+            # Use the fake dataset instead of Gemini
+            candidates = scrape_candidates(job_description, num_candidates=num_candidates)
+            
+            # Parse profile strings into typed scoring fields once, at ingest
+            candidates = [parse_candidate(candidate) for candidate in candidates]
         
-        # Add some delay to simulate processing
-        time.sleep(2)
+        with timed_stage("dedupe", items=len(candidates)):
+            # Collapse repeated people before paying to score them
+            candidates = self.deduplicator.dedupe(candidates)
         
+        self.candidate_pools.put(profile, candidates)
         return candidates  # Return all candidates for scoring
     
-    def score_candidates(self, candidates: List[Dict[str, Any]], job_description: str) -> List[Dict[str, Any]]:
+    def score_candidates(self, candidates: List[Dict[str, Any]], job_description: str, top_k: int = 20) -> List[Dict[str, Any]]:
         """Score candidates using the fit score algorithm"""
         st.info("📊 Scoring all candidates...")
         
-        scored_candidates = []
+        top = TopK(top_k)
+        pruned = 0
         progress_bar = st.progress(0)
+        progress = ThrottledProgress(progress_bar.progress, len(candidates))
+        
+        with timed_stage("score", items=len(candidates)):
+            for i, candidate in enumerate(candidates):
+                # Scoring stops early once a candidate can't beat the current K-th best
+                score_breakdown = self.calculate_fit_score(candidate, job_description, threshold=top.threshold)
+                if score_breakdown is None:
+                    pruned += 1
+                else:
+                    scored_candidate = {
+                        **candidate,
+                        "fit_score": fit_score(score_breakdown),
+                        "score_breakdown": score_breakdown
+                    }
+                    top.push(scored_candidate["fit_score"], scored_candidate)
+                
+                # Update progress bar (throttled, one websocket message per interval)
+                progress.advance(i + 1)
         
-        for i, candidate in enumerate(candidates):
-            score_breakdown = self.calculate_fit_score(candidate, job_description)
-            total_score = sum(score_breakdown.values()) / len(score_breakdown)
-            
-            scored_candidate = {
-                **candidate,
-                "fit_score": round(total_score, 1),
-                "score_breakdown": score_breakdown
-            }
-            scored_candidates.append(scored_candidate)
-            
-            # Update progress bar
-            progress = (i + 1) / len(candidates)
-            progress_bar.progress(progress)
-        
-        # Sort by fit score (highest first)
-        scored_candidates.sort(key=lambda x: x["fit_score"], reverse=True)
-        
-        # Return top 20 candidates
-        return scored_candidates[:20]
-    
-    def calculate_fit_score(self, candidate: Dict[str, Any], job_description: str) -> Dict[str, float]:
-        """Calculate fit score using the provided rubric"""
-        breakdown = {}
-        
-        # Education (20%)
-        education_score = self.score_education(candidate.get("education", ""))
-        breakdown["education"] = education_score
-        
-        # Career Trajectory (20%)
-        trajectory_score = self.score_trajectory(candidate.get("experience", ""))
-        breakdown["trajectory"] = trajectory_score
-        
-        # Company Relevance (15%)
-        company_score = self.score_company(candidate.get("company", ""), job_description)
-        breakdown["company"] = company_score
-        
-        # Experience Match (25%)
-        experience_score = self.score_experience(candidate.get("skills", ""), job_description)
-        breakdown["skills"] = experience_score
-        
-        # Location Match (10%)
-        location_score = self.score_location(candidate.get("location", ""), job_description)
-        breakdown["location"] = location_score
-        
-        # Tenure (10%)
-        tenure_score = self.score_tenure(candidate.get("tenure", ""))
-        breakdown["tenure"] = tenure_score
-        
-        return breakdown
-    
-    def score_education(self, education: str) -> float:
-        """Score education based on school prestige"""
-        elite_schools = ["stanford", "mit", "harvard", "berkeley", "cmu", "caltech", "princeton", "yale"]
-        strong_schools = ["ucla", "usc", "nyu", "columbia", "cornell", "georgia tech", "michigan", "illinois", "ut austin"]
-        
-        education_lower = education.lower()
-        
-        for school in elite_schools:
-            if school in education_lower:
-                return 9.5
-        
-        for school in strong_schools:
-            if school in education_lower:
-                return 7.5
-        
-        return 6.0
-    
-    def score_trajectory(self, experience: str) -> float:
-        """Score career trajectory"""
-        try:
-            years = int(re.findall(r'\d+', experience)[0])
-            if years >= 5:
-                return 8.0
-            elif years >= 3:
-                return 7.0
-            elif years >= 1:
-                return 6.0
-            else:
-                return 4.0
-        except:
-            return 5.0
-    
-    def score_company(self, company: str, job_description: str) -> float:
-        """Score company relevance"""
-        top_companies = ["google", "microsoft", "apple", "amazon", "meta", "netflix", "airbnb", "uber", "openai", "anthropic", "stripe", "palantir", "databricks"]
-        relevant_companies = ["salesforce", "adobe", "oracle", "intel", "nvidia", "amd", "cisco", "vmware", "splunk", "mongodb", "datadog", "snowflake", "twilio"]
-        
-        company_lower = company.lower()
-        
-        for top_company in top_companies:
-            if top_company in company_lower:
-                return 9.0
-        
-        for relevant_company in relevant_companies:
-            if relevant_company in company_lower:
-                return 7.5
-        
-        # Check if company is in same industry
-        if "ai" in company_lower or "tech" in company_lower:
-            return 7.0
-        
-        return 6.0
-    
-    def score_experience(self, skills: str, job_description: str) -> float:
-        """Score experience/skills match"""
-        job_lower = job_description.lower()
-        skills_lower = skills.lower()
-        
-        # Count matching skills
-        relevant_terms = ["python", "machine learning", "ai", "ml", "tensorflow", "pytorch", "deep learning", "llm", "code generation", "neural networks", "scikit-learn"]
-        matches = sum(1 for term in relevant_terms if term in skills_lower and term in job_lower)
+        metrics.CANDIDATES_PRUNED.inc(pruned)
         
-        if matches >= 3:
-            return 9.0
-        elif matches >= 2:
-            return 7.5
-        elif matches >= 1:
-            return 6.0
-        else:
-            return 4.0
+        # Return top K candidates by fit score (highest first, ties keep pool order)
+        with timed_stage("rank", items=len(top.heap)):
+            return top.items()
     
-    def score_location(self, location: str, job_description: str) -> float:
-        """Score location match"""
-        job_lower = job_description.lower()
-        location_lower = location.lower()
+    def calculate_fit_score(self, candidate: Dict[str, Any], job_description: str, threshold: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Calculate fit score using the provided rubric (None if it can't beat threshold)"""
+        candidate = parse_candidate(candidate)
+        job = parse_job(job_description)
         
-        if "mountain view" in job_lower and "mountain view" in location_lower:
-            return 10.0
-        elif "california" in job_lower and "california" in location_lower:
-            return 8.0
-        elif "remote" in job_lower:
-            return 6.0
-        else:
-            return 4.0
-    
-    def score_tenure(self, tenure: str) -> float:
-        """Score tenure at current role"""
-        try:
-            years = int(re.findall(r'\d+', tenure)[0])
-            if 2 <= years <= 4:
-                return 9.0
-            elif 1 <= years < 2:
-                return 7.0
-            elif years >= 5:
-                return 6.0
-            else:
-                return 4.0
-        except:
-            return 5.0
+        # Only dimensions whose inputs changed since the candidate was last scored are recomputed
+        return incremental_breakdown(candidate, job, score_dimension, threshold)
     
     def generate_outreach(self, scored_candidates: List[Dict[str, Any]], job_description: str) -> List[Dict[str, Any]]:
         """Generate personalized outreach messages"""
         st.info("💬 Generating outreach messages for top candidates...")
         
+        outreach_targets = scored_candidates[:10]  # Generate outreach for top 10
+        with timed_stage("outreach", items=len(outreach_targets)):
+            # Budget is reserved in rank order, so the best candidates get the fullest messages
+            plans = [self.plan_outreach(candidate, job_description) for candidate in outreach_targets]
+            # Messages are written concurrently; the adaptive limiter decides how many calls actually run at once
+            with ThreadPoolExecutor(max_workers=max(1, len(outreach_targets))) as executor:
+                futures = [
+                    executor.submit(in_current_context(self.create_personalized_message), candidate, job_description, detail, reservation)
+                    for candidate, (detail, reservation) in zip(outreach_targets, plans)
+                ]
+                messages = [future.result() for future in futures]
+        
         outreach_candidates = []
-        for candidate in scored_candidates[:10]:  # Generate outreach for top 10
-            message = self.create_personalized_message(candidate, job_description)
-            
+        for candidate, message in zip(outreach_targets, messages):
             outreach_candidate = {
                 **candidate,
                 "outreach_message": message
@@ -237,9 +140,41 @@ class LinkedInSourcingAgent:
         
         return outreach_candidates
     
-    def create_personalized_message(self, candidate: Dict[str, Any], job_description: str) -> str:
-        """Create personalized LinkedIn message"""
-        prompt = f"""
+    def plan_outreach(self, candidate: Dict[str, Any], job_description: str):
+        """
+        Pick the most detailed message the token budget still allows.
+        
+        Returns (detail, reservation): "full" or "short" with the tokens set
+        aside for the call, or "template" with None when even the short
+        prompt would overrun the budget.
+        """
+        for detail in ("full", "short"):
+            prompt = self.outreach_prompt(candidate, job_description, detail)
+            reservation = llm_budget.reserve(estimate_tokens(prompt), OUTREACH_OUTPUT_TOKENS[detail])
+            if reservation is not None:
+                if detail != "full":
+                    llm_budget.record_degradation("outreach", detail)
+                return detail, reservation
+        llm_budget.record_degradation("outreach", "template")
+        return "template", None
+    
+    def outreach_prompt(self, candidate: Dict[str, Any], job_description: str, detail: str = "full") -> str:
+        """Outreach prompt; the short one summarizes the job instead of quoting all of it"""
+        if detail == "short":
+            job = parse_job_description(job_description)
+            job_summary = job["title"]
+            if job["company"]:
+                job_summary += f" at {job['company']}"
+            if job["location"]:
+                job_summary += f" in {job['location']}"
+            if job["skills"]:
+                job_summary += f", needing {job['skills']}"
+            return f"""
+        Write a LinkedIn outreach message under 120 words to {candidate['name']} ({candidate['headline']}, {candidate['company']}) about this role: {job_summary}
+        
+        Mention one of their skills ({candidate['skills']}), keep a professional tone and end with a call to action. Start with "Hi [Name],"
+        """
+        return f"""
         Create a personalized LinkedIn outreach message for this candidate:
         
         Candidate: {candidate['name']}
@@ -260,44 +195,111 @@ class LinkedInSourcingAgent:
         
         Start with "Hi [Name],"
         """
-        
+    
+    def template_message(self, candidate: Dict[str, Any], job_description: str) -> str:
+        """Outreach written without the model"""
+        return f"Hi {candidate['name']}, I noticed your impressive background in {candidate['skills']} at {candidate['company']}. Your experience aligns perfectly with our {job_description[:50]}... role. Would you be interested in discussing this opportunity?"
+    
+    def create_personalized_message(self, candidate: Dict[str, Any], job_description: str, detail: str = "full",
+                                    reservation: Optional[llm_budget.Reservation] = None) -> str:
+        """Create personalized LinkedIn message at the detail plan_outreach chose"""
         try:
-            response = model.generate_content(prompt)
-            return response.text.strip()
-        except:
-            return f"Hi {candidate['name']}, I noticed your impressive background in {candidate['skills']} at {candidate['company']}. Your experience aligns perfectly with our {job_description[:50]}... role. Would you be interested in discussing this opportunity?"
+            if detail == "template":
+                return self.template_message(candidate, job_description)
+            prompt = self.outreach_prompt(candidate, job_description, detail)
+            
+            try:
+                with timed_llm_call():
+                    response = model.generate_content(prompt)
+                return response.text.strip()
+            except:
+                metrics.LLM_FALLBACKS.labels("outreach").inc()
+                return self.template_message(candidate, job_description)
+        finally:
+            if reservation is not None:
+                reservation.release()
     
     def save_to_database(self, candidates: List[Dict[str, Any]], job_description: str):
         """Save candidates to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with timed_stage("persist", items=len(candidates)):
+            self.store.save_candidates(candidates, job_description)
+
+@st.cache_resource
+def get_candidate_store() -> CandidateStore:
+    """Shared database connection, created once per server process"""
+    return CandidateStore("candidates.db")
+
+@st.cache_resource
+def get_agent() -> LinkedInSourcingAgent:
+    """Shared agent, so candidate pools and cached scores survive reruns"""
+    return LinkedInSourcingAgent(get_candidate_store())
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def run_sourcing_pipeline(jd_hash: str, _job_description: str, pool_size: int = 100, top_k: int = 20, reranker: str = "none", shortlist_size: int = 50) -> Dict[str, Any]:
+    """
+    Run search, scoring, outreach and persistence for a job description.
+    
+    Cached by job description hash (the description itself is excluded from
+    hashing), so reruns and repeated submissions reuse the computed results
+    instead of paying for candidate generation and Gemini calls again.
+    """
+    agent = get_agent()
+    config = RankingConfig(reranker, shortlist_size, ranking_defaults.rerank_weight, ranking_defaults.time_budget, ranking_defaults.max_llm_calls)
+    # SYNAPSE_PROFILE profiles every uncached run (see profiling.py)
+    profiler = profile_mode()
+    profiling = profile_run(f"streamlit_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{jd_hash[:8]}", profiler) if profiler else nullcontext()
+    
+    # Every LLM call below is charged to this job's token and cost budget
+    with profiling as profile, pipeline_timer("sourcing") as timer, llm_budget.job_budget() as budget:
+        # Step 1: Search for candidates
+        candidates = agent.search_linkedin(_job_description, num_candidates=pool_size)
+        if not candidates:
+            return {"total_candidates_scored": 0, "scored_candidates": [], "final_candidates": [], "timings": timer.summary(), "usage": budget.summary()}
+        
+        # Step 2: Score all candidates, keeping enough for the re-ranking shortlist
+        ranked = agent.score_candidates(candidates, _job_description, top_k=max(top_k, config.shortlist_size))
         
-        for candidate in candidates:
-            cursor.execute('''
-                INSERT OR REPLACE INTO candidates 
-                (name, linkedin_url, headline, location, experience, education, skills, company, 
-                 job_description, fit_score, score_breakdown, outreach_message)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                candidate.get('name', ''),
-                candidate.get('linkedin_url', ''),
-                candidate.get('headline', ''),
-                candidate.get('location', ''),
-                candidate.get('experience', ''),
-                candidate.get('education', ''),
-                candidate.get('skills', ''),
-                candidate.get('company', ''),
-                job_description,
-                candidate.get('fit_score', 0),
-                json.dumps(candidate.get('score_breakdown', {})),
-                candidate.get('outreach_message', '')
-            ))
+        # Step 2b: Re-rank the shortlist with the expensive scorer, if any, and keep the top K
+        scored_candidates = rerank_shortlist(ranked, _job_description, build_reranker(config, model), config)[:top_k]
         
-        conn.commit()
-        conn.close()
+        # Step 3: Generate outreach for top 10
+        final_candidates = agent.generate_outreach(scored_candidates, _job_description)
+        
+        # Step 4: Save to database
+        agent.save_to_database(scored_candidates, _job_description)
+    
+    results = {
+        "total_candidates_scored": len(candidates),
+        "scored_candidates": [display_fields(candidate) for candidate in scored_candidates],
+        "final_candidates": [display_fields(candidate) for candidate in final_candidates],
+        "timings": timer.summary(),
+        "usage": budget.summary(),
+    }
+    if profile is not None:
+        profile.save_summary({"timings": results["timings"], "usage": results["usage"]})
+        results["profile"] = profile.summary()
+    return results
 
-# Initialize the agent
-agent = LinkedInSourcingAgent()
+# Columns of the paginated results table
+BREAKDOWN_COLUMNS = ["education_score", "trajectory_score", "company_score", "skills_score", "location_score", "tenure_score"]
+TABLE_COLUMNS = ["rank", "name", "fit_score", "headline", "location", "company", "education", "experience", "tenure", "skills", "linkedin_url"]
+SORT_COLUMNS = ["rank", "fit_score"] + BREAKDOWN_COLUMNS + ["name", "company", "location"]
+# Present only when the shortlist was re-ranked
+RERANK_COLUMNS = ["final_score", "rerank_score"]
+
+def results_dataframe(scored_candidates: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Flatten ranked candidates and their score breakdowns into one table"""
+    df = pd.DataFrame(scored_candidates)
+    breakdown = pd.DataFrame(df.pop("score_breakdown").tolist()).add_suffix("_score")
+    df = pd.concat([df, breakdown[BREAKDOWN_COLUMNS]], axis=1)
+    df.insert(0, "rank", range(1, len(df) + 1))
+    return df
+
+def results_page(df: pd.DataFrame, sort_column: str, ascending: bool, page: int, page_size: int) -> pd.DataFrame:
+    """Sort on the server and return one page, so only page_size rows reach the browser"""
+    sorted_df = df.sort_values(sort_column, ascending=ascending, kind="stable")
+    start = (page - 1) * page_size
+    return sorted_df.iloc[start:start + page_size]
 
 # Streamlit UI
 st.set_page_config(page_title="Synapse LinkedIn Sourcing Agent", layout="wide")
@@ -312,106 +314,147 @@ job_description = st.sidebar.text_area(
     height=200,
     placeholder="Paste the job description here..."
 )
+pool_size = st.sidebar.selectbox("Candidate pool size", [100, 1000, 10000], index=0)
+top_k = st.sidebar.selectbox("Candidates to rank", [20, 100, 500, 5000], index=0)
+reranker = st.sidebar.selectbox("Re-rank shortlist with", RERANKERS, index=RERANKERS.index(ranking_defaults.reranker))
+shortlist_size = st.sidebar.selectbox("Shortlist size", [20, 50, 100, 200], index=1)
 
 # Main content
 if st.sidebar.button("🔍 Start Sourcing", type="primary"):
     if job_description:
         with st.spinner("Processing..."):
-            # Step 1: Search for candidates
-            candidates = agent.search_linkedin(job_description)
+            # Results live in session state so widget clicks rerender them without recomputing
+            st.session_state.results = run_sourcing_pipeline(
+                job_hash(job_description), job_description, pool_size, top_k, reranker, shortlist_size
+            )
+            # Build the results table once per run, not on every widget interaction
+            scored = st.session_state.results["scored_candidates"]
+            st.session_state.results_df = results_dataframe(scored) if scored else None
+    else:
+        st.error("Please enter a job description.")
+
+results = st.session_state.get("results")
+if results is not None:
+    scored_candidates = results["scored_candidates"]
+    final_candidates = results["final_candidates"]
+    
+    if scored_candidates:
+        # Display results
+        st.success(f"✅ Scored {results['total_candidates_scored']} candidates, showing top {len(scored_candidates)}!")
+        
+        results_df = st.session_state.results_df
+        rerank_columns = [column for column in RERANK_COLUMNS if column in results_df.columns]
+        
+        # Create tabs for different views
+        tab1, tab2, tab3 = st.tabs([f"📊 Top {len(scored_candidates)} Candidates", "📈 Score Breakdown", "💬 Outreach Messages"])
+        
+        with tab1:
+            # One dataframe per page instead of a widget group per candidate
+            st.subheader(f"🏆 Top {len(scored_candidates)} Candidates")
             
-            if candidates:
-                # Step 2: Score all candidates and get top 20
-                scored_candidates = agent.score_candidates(candidates, job_description)
-                
-                # Step 3: Generate outreach for top 10
-                final_candidates = agent.generate_outreach(scored_candidates, job_description)
-                
-                # Step 4: Save to database
-                agent.save_to_database(scored_candidates, job_description)
-                
-                # Display results
-                st.success(f"✅ Scored {len(candidates)} candidates, showing top {len(scored_candidates)}!")
-                
-                # Create tabs for different views
-                tab1, tab2, tab3 = st.tabs(["📊 Top 20 Candidates", "📈 Score Breakdown", "💬 Outreach Messages"])
-                
-                with tab1:
-                    # Display top 20 candidates with contact buttons
-                    st.subheader("🏆 Top 20 Candidates (Sorted by Score)")
-                    
-                    for i, candidate in enumerate(scored_candidates, 1):
-                        with st.container():
-                            col1, col2, col3 = st.columns([3, 1, 1])
-                            
-                            with col1:
-                                st.markdown(f"**{i}. {candidate['name']}**")
-                                st.markdown(f"*{candidate['headline']}*")
-                                st.markdown(f"📍 {candidate['location']} | 🏢 {candidate['company']}")
-                                st.markdown(f"🎓 {candidate['education']}")
-                                st.markdown(f"💼 {candidate['experience']} | ⏱️ {candidate['tenure']}")
-                                st.markdown(f"🛠️ **Skills:** {candidate['skills']}")
-                            
-                            with col2:
-                                st.metric("Fit Score", f"{candidate['fit_score']}/10")
-                            
-                            with col3:
-                                # Fake LinkedIn contact button
-                                if st.button(f"📧 Contact", key=f"contact_{i}"):
-                                    st.success(f"✅ Message sent to {candidate['name']} on LinkedIn!")
-                                    st.info(f"LinkedIn URL: https://{candidate['linkedin_url']}")
-                            
-                            st.divider()
-                
-                with tab2:
-                    # Display score breakdown
-                    st.subheader("📊 Detailed Score Breakdown")
-                    for candidate in scored_candidates[:10]:  # Show breakdown for top 10
-                        st.subheader(f"{candidate['name']} - Score: {candidate['fit_score']}")
-                        breakdown = candidate['score_breakdown']
-                        
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric("Education", f"{breakdown['education']:.1f}/10")
-                            st.metric("Trajectory", f"{breakdown['trajectory']:.1f}/10")
-                            st.metric("Company", f"{breakdown['company']:.1f}/10")
-                        
-                        with col2:
-                            st.metric("Skills", f"{breakdown['skills']:.1f}/10")
-                            st.metric("Location", f"{breakdown['location']:.1f}/10")
-                            st.metric("Tenure", f"{breakdown['tenure']:.1f}/10")
-                        
-                        st.divider()
-                
-                with tab3:
-                    # Display outreach messages
-                    st.subheader("💬 Personalized Outreach Messages (Top 10)")
-                    for i, candidate in enumerate(final_candidates, 1):
-                        st.subheader(f"Message for {candidate['name']} (#{i})")
-                        st.write(candidate['outreach_message'])
-                        
-                        col1, col2 = st.columns([1, 1])
-                        with col1:
-                            if st.button(f"📧 Send Message", key=f"send_{i}"):
-                                st.success(f"✅ Message sent to {candidate['name']}!")
-                        with col2:
-                            if st.button(f"📋 Copy Message", key=f"copy_{i}"):
-                                st.info("📋 Message copied to clipboard!")
-                        
-                        st.divider()
-                
-                # Export results
-                st.download_button(
-                    label="📥 Download Top 20 Results (JSON)",
-                    data=json.dumps(scored_candidates, indent=2),
-                    file_name=f"top_20_candidates_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json"
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                sort_column = st.selectbox("Sort by", SORT_COLUMNS + rerank_columns, key="sort_column")
+            with col2:
+                ascending = st.selectbox("Order", ["Descending", "Ascending"], key="sort_order") == "Ascending"
+            with col3:
+                page_size = st.selectbox("Rows per page", [20, 50, 100, 250], key="page_size")
+            num_pages = max(1, math.ceil(len(results_df) / page_size))
+            if st.session_state.get("page", 1) > num_pages:
+                st.session_state.page = num_pages
+            with col4:
+                page = st.number_input("Page", min_value=1, max_value=num_pages, value=1, step=1, key="page")
+            
+            page_df = results_page(results_df, sort_column, ascending, page, page_size)
+            st.caption(f"Page {page} of {num_pages}")
+            st.dataframe(
+                page_df[TABLE_COLUMNS[:3] + rerank_columns + TABLE_COLUMNS[3:]],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "fit_score": st.column_config.ProgressColumn("Fit Score", min_value=0, max_value=10, format="%.1f"),
+                    "final_score": st.column_config.NumberColumn("Final Score", format="%.1f"),
+                    "rerank_score": st.column_config.NumberColumn("Re-rank Score", format="%.1f"),
+                    "linkedin_url": st.column_config.LinkColumn("LinkedIn"),
+                },
+            )
+            
+            # Fake LinkedIn contact button for a candidate on the current page
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                contact_rank = st.selectbox(
+                    "Candidate",
+                    page_df["rank"].tolist(),
+                    format_func=lambda rank: f"{rank}. {results_df.at[rank - 1, 'name']}",
+                    key="contact_rank"
                 )
+            with col2:
+                if st.button("📧 Contact", key="contact"):
+                    candidate = scored_candidates[contact_rank - 1]
+                    st.success(f"✅ Message sent to {candidate['name']} on LinkedIn!")
+                    st.info(f"LinkedIn URL: https://{candidate['linkedin_url']}")
+        
+        with tab2:
+            # Display score breakdown for the current page
+            st.subheader("📊 Detailed Score Breakdown")
+            st.dataframe(
+                page_df[["rank", "name", "fit_score"] + BREAKDOWN_COLUMNS],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    column: st.column_config.NumberColumn(column.replace("_score", "").title(), format="%.1f")
+                    for column in BREAKDOWN_COLUMNS
+                },
+            )
+        
+        with tab3:
+            # Display outreach messages
+            st.subheader("💬 Personalized Outreach Messages (Top 10)")
+            for i, candidate in enumerate(final_candidates, 1):
+                st.subheader(f"Message for {candidate['name']} (#{i})")
+                st.write(candidate['outreach_message'])
                 
-            else:
-                st.error("No candidates found. Try refining your job description.")
+                col1, col2 = st.columns([1, 1])
+                with col1:
+                    if st.button(f"📧 Send Message", key=f"send_{i}"):
+                        st.success(f"✅ Message sent to {candidate['name']}!")
+                with col2:
+                    if st.button(f"📋 Copy Message", key=f"copy_{i}"):
+                        st.info("📋 Message copied to clipboard!")
+                
+                st.divider()
+        
+        # Pipeline timings of the run that produced these results
+        with st.expander("⏱️ Pipeline timings"):
+            timings = results["timings"]
+            st.caption(f"Total: {timings['total_seconds']:.3f}s")
+            st.dataframe(pd.DataFrame.from_dict(timings["stages"], orient="index"), use_container_width=True)
+            st.json(timings["llm"])
+            usage = results["usage"]
+            st.caption(f"LLM tokens: {usage['total_tokens']:,} (${usage['cost_usd']:.4f})")
+            if usage["degraded"]:
+                st.warning(f"Over the token budget, some calls were shortened or skipped: {usage['degraded']}")
+            if results.get("profile"):
+                st.caption(f"Profile saved to {results['profile']['files']['profile']}")
+                st.json(results["profile"]["steps"])
+        
+        # Export results in the same flat layout as export.py and GET /jobs/{job_id}/export
+        export_formats = [file_format for file_format in export.FORMATS if file_format != "parquet" or export.pyarrow is not None]
+        export_format = st.selectbox("Export format", export_formats, key="export_format")
+        writer, media_type, extension = export.FORMATS[export_format]
+        outreach_messages = {candidate["candidate_id"]: candidate["outreach_message"] for candidate in final_candidates}
+        rows = [
+            export.export_row({**candidate, "outreach_message": outreach_messages.get(candidate["candidate_id"], "")})
+            for candidate in scored_candidates
+        ]
+        st.download_button(
+            label=f"📥 Download Top {len(scored_candidates)} Results ({export_format.upper()})",
+            data=b"".join(writer([rows])),
+            file_name=f"top_{len(scored_candidates)}_candidates_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+            mime=media_type
+        )
     else:
-        st.error("Please enter a job description.")
+        st.error("No candidates found. Try refining your job description.")
 
 # Display sample job description
 st.sidebar.markdown("---")
@@ -0,0 +1,210 @@
+"""
+Prometheus-style Metrics
+Minimal counters, gauges and histograms rendered in the Prometheus text
+exposition format, plus the metrics the sourcing pipeline reports.
+
+Metrics are updated once per request, stage or LLM call, never per
+candidate, so keeping them costs nothing measurable on the scoring path.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["MetricsRegistry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values: str) -> "_Metric":
+        """Return the child metric for a set of label values"""
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self) -> "_Metric":
+        child = object.__new__(type(self))
+        child._lock = threading.Lock()
+        child._copy_layout(self)
+        child._init_value()
+        return child
+
+    def _copy_layout(self, parent: "_Metric"):
+        pass
+
+    def _init_value(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        if not self.labelnames:
+            return [(suffix, labels, value) for suffix, labels, value in self._child_samples(self, ())]
+        samples = []
+        for key, child in sorted(self._children.items()):
+            samples.extend(self._child_samples(child, key))
+        return samples
+
+    def _child_samples(self, child: "_Metric", key: Tuple[str, ...]) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_value()
+
+    def _init_value(self):
+        self._value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def _child_samples(self, child, key):
+        return [("", _format_labels(self.labelnames, key), child._value)]
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_value()
+
+    def _init_value(self):
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def _child_samples(self, child, key):
+        return [("", _format_labels(self.labelnames, key), child._value)]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["MetricsRegistry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+        self._init_value()
+
+    def _copy_layout(self, parent):
+        self.buckets = parent.buckets
+
+    def _init_value(self):
+        # One slot per bucket plus +Inf; counts are per bucket and made cumulative on render
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def _child_samples(self, child, key):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child._counts):
+            cumulative += count
+            samples.append(("_bucket", _format_labels(self.labelnames, key, ("le", _format_value(bound))), cumulative))
+        samples.append(("_sum", _format_labels(self.labelnames, key), child._sum))
+        samples.append(("_count", _format_labels(self.labelnames, key), cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text format"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# HTTP
+REQUESTS = Counter("synapse_http_requests_total", "HTTP requests handled", ["method", "path", "status"])
+REQUEST_LATENCY = Histogram("synapse_http_request_duration_seconds", "HTTP request latency", ["method", "path"])
+REQUESTS_IN_FLIGHT = Gauge("synapse_http_requests_in_flight", "Requests currently being processed (queue depth)")
+
+# Pipeline
+STAGE_LATENCY = Histogram("synapse_stage_duration_seconds", "Wall time per pipeline stage", ["stage"])
+STAGE_ITEMS = Counter("synapse_stage_items_total", "Items processed per pipeline stage", ["stage"])
+CANDIDATES_SCORED = Counter("synapse_candidates_scored_total", "Candidates scored against a job")
+SCORING_THROUGHPUT = Gauge("synapse_scoring_throughput_candidates_per_second", "Scoring throughput of the most recent run")
+CANDIDATES_PRUNED = Counter("synapse_candidates_pruned_total", "Candidates dropped mid-scoring because they could not reach the top K")
+DUPLICATES_DROPPED = Counter("synapse_duplicate_candidates_total", "Duplicate candidate profiles dropped before scoring")
+COALESCED_REQUESTS = Counter("synapse_coalesced_requests_total", "Requests that awaited an identical in-flight computation", ["operation"])
+
+# LLM
+LLM_LATENCY = Histogram("synapse_llm_call_duration_seconds", "LLM call latency")
+LLM_ERRORS = Counter("synapse_llm_errors_total", "LLM calls that raised an error")
+LLM_FALLBACKS = Counter("synapse_llm_fallbacks_total", "Times a hard-coded fallback replaced an LLM result", ["operation"])
+LLM_RETRIES = Counter("synapse_llm_retries_total", "LLM calls retried after a rate limit or overload response")
+LLM_CONCURRENCY_LIMIT = Gauge("synapse_llm_concurrency_limit", "Current adaptive limit on concurrent LLM calls")
+LLM_IN_FLIGHT = Gauge("synapse_llm_calls_in_flight", "LLM calls currently running")
+LLM_TOKENS = Counter("synapse_llm_tokens_total", "Tokens billed for LLM calls", ["kind"])
+LLM_COST = Counter("synapse_llm_cost_usd_total", "Estimated USD cost of LLM calls")
+LLM_BUDGET_DEGRADATIONS = Counter("synapse_llm_budget_degradations_total", "LLM calls shortened or replaced by a template to stay within a token or cost budget", ["operation", "level"])
+
+# Caches
+CACHE_REQUESTS = Counter("synapse_cache_requests_total", "Cache lookups by result", ["cache", "result"])
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
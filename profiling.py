@@ -0,0 +1,149 @@
+"""
+On-Demand Profiling
+Opt-in profiling of single sourcing runs, for finding where a slow request
+spends its time. A profiled run saves, under SYNAPSE_PROFILE_DIR:
+
+    <name>.prof   cProfile stats (python -m pstats, snakeviz), or
+    <name>.html   a pyinstrument flame chart, when that profiler is chosen
+    <name>.json   per-stage wall times plus the cumulative time of the main
+                  pipeline steps (search, scoring, outreach, DB writes)
+
+Profiling is off unless asked for:
+
+    SYNAPSE_PROFILE      profile every run: off (default), cprofile or pyinstrument
+    SYNAPSE_PROFILE_DIR  where profiles are saved (default profiles)
+
+The API also profiles a single /sourcing request sent with an X-Profile
+header (cprofile, pyinstrument, or 1 for cprofile). pyinstrument is an
+optional dependency. Both profilers follow the thread running the
+pipeline; calls made from worker threads show up as time spent waiting
+for them.
+
+A profiled run skips the BYPASSED_CACHES (see caches_bypassed), so a
+repeated job description is profiled doing the real search and LLM work
+rather than cache lookups.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, Optional
+
+try:
+    import pyinstrument
+except ImportError:  # optional dependency
+    pyinstrument = None
+
+PROFILERS = ("cprofile", "pyinstrument")
+PROFILE_MODE = os.getenv("SYNAPSE_PROFILE", "off").lower()
+PROFILE_DIR = os.getenv("SYNAPSE_PROFILE_DIR", "profiles")
+
+# Pipeline steps whose cumulative time is reported from cProfile stats
+STEP_FUNCTIONS = (
+    "search_linkedin", "score_candidates", "rerank_shortlist", "generate_outreach", "save_candidates", "save_to_database",
+)
+
+# Caches a profiled run reads around; results it computes are still written back
+BYPASSED_CACHES = ("candidate_pool", "llm")
+
+_UNSAFE_NAME = re.compile(r"[^\w.-]")
+_profiling: ContextVar[bool] = ContextVar("profiling", default=False)
+
+
+def caches_bypassed() -> bool:
+    """True inside profile_run(), where the BYPASSED_CACHES must not be read (worker threads need in_current_context)"""
+    return _profiling.get()
+
+
+def profile_mode(requested: Optional[str] = None) -> Optional[str]:
+    """
+    Profiler for a run: the one requested (e.g. by header), else SYNAPSE_PROFILE.
+
+    Returns None when the run should not be profiled. Raises ValueError for
+    an unknown profiler and RuntimeError for pyinstrument when it is not
+    installed.
+    """
+    mode = (requested or PROFILE_MODE).strip().lower()
+    if mode in ("", "off", "0", "false", "none"):
+        return None
+    if mode in ("1", "true", "on"):
+        mode = "cprofile"
+    if mode not in PROFILERS:
+        raise ValueError(f"Unknown profiler {mode!r}, expected one of {PROFILERS}")
+    if mode == "pyinstrument" and pyinstrument is None:
+        raise RuntimeError("The pyinstrument profiler needs the pyinstrument package")
+    return mode
+
+
+def step_timings(stats: pstats.Stats) -> Dict[str, Dict[str, float]]:
+    """Calls and cumulative seconds of each of STEP_FUNCTIONS that ran"""
+    steps = {}
+    for (_, _, function), (_, calls, _, cumulative, _) in stats.stats.items():
+        if function in STEP_FUNCTIONS:
+            step = steps.setdefault(function, {"calls": 0, "cumulative_seconds": 0.0})
+            step["calls"] += calls
+            step["cumulative_seconds"] = round(step["cumulative_seconds"] + cumulative, 6)
+    return steps
+
+
+class RunProfile:
+    """Files saved for one profiled run; summary() is what callers report back"""
+
+    def __init__(self, name: str, mode: str, directory: str = PROFILE_DIR):
+        self.name = _UNSAFE_NAME.sub("_", name)
+        self.mode = mode
+        self.directory = directory
+        self.files: Dict[str, str] = {}
+        self.steps: Dict[str, Dict[str, float]] = {}
+
+    def path(self, extension: str) -> str:
+        return os.path.join(self.directory, f"{self.name}.{extension}")
+
+    def save_summary(self, timings: Dict[str, Any]):
+        """Write the run's stage timings next to the profile"""
+        self.files["summary"] = self.path("json")
+        with open(self.files["summary"], "w") as f:
+            json.dump({"name": self.name, "profiler": self.mode, "bypassed_caches": list(BYPASSED_CACHES), "steps": self.steps, **timings}, f, indent=2)
+
+    def summary(self) -> Dict[str, Any]:
+        return {"profiler": self.mode, "bypassed_caches": list(BYPASSED_CACHES), "files": dict(self.files), "steps": self.steps}
+
+
+@contextmanager
+def profile_run(name: str, mode: str, directory: str = PROFILE_DIR) -> Iterator[RunProfile]:
+    """
+    Profile the block in the current thread with the given profiler (see profile_mode).
+
+    The profile file is saved when the block exits, even if it raised; call
+    save_summary() afterwards to add the stage timings.
+    """
+    os.makedirs(directory, exist_ok=True)
+    run = RunProfile(name, mode, directory)
+    token = _profiling.set(True)
+    try:
+        if mode == "pyinstrument":
+            profiler = pyinstrument.Profiler(async_mode="disabled")
+            profiler.start()
+            try:
+                yield run
+            finally:
+                profiler.stop()
+                run.files["profile"] = run.path("html")
+                with open(run.files["profile"], "w") as f:
+                    f.write(profiler.output_html())
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield run
+            finally:
+                profiler.disable()
+                run.files["profile"] = run.path("prof")
+                profiler.dump_stats(run.files["profile"])
+                run.steps = step_timings(pstats.Stats(profiler))
+    finally:
+        _profiling.reset(token)
@@ -0,0 +1,189 @@
+"""
+Two-Stage Ranking
+Stage one scores the whole pool with the fast rubric and keeps a shortlist;
+stage two re-ranks that shortlist with a more expensive scorer (semantic
+skill matching or an LLM judge) under a time and LLM call budget. Outreach
+then runs on the final order.
+
+Configured with:
+
+    SYNAPSE_RERANKER              none (default), semantic or llm
+    SYNAPSE_SHORTLIST_SIZE        candidates re-ranked in stage two (default 50)
+    SYNAPSE_RERANK_WEIGHT         weight of the stage two score in the final score (default 0.5)
+    SYNAPSE_RERANK_TIME_BUDGET    seconds stage two may spend (default 10)
+    SYNAPSE_RERANK_MAX_LLM_CALLS  LLM calls stage two may make (default 50)
+"""
+
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, Optional
+
+import llm_budget
+import metrics
+from candidate_parser import parse_candidate
+from instrumentation import timed_stage, timed_llm_call
+from llm_backend import parse_json_text, estimate_tokens
+from skill_embeddings import SKILL_INDEX, job_skill_phrases
+
+RERANKERS = ("none", "semantic", "llm")
+
+# Output tokens reserved per judgement; the reply is one short JSON object
+RERANK_OUTPUT_TOKENS = 60
+
+_SCORE_PATTERN = re.compile(r'"?score"?\s*[:=]\s*(\d+(?:\.\d+)?)', re.IGNORECASE)
+
+
+class RankingConfig:
+    def __init__(self, reranker: str = "none", shortlist_size: int = 50, rerank_weight: float = 0.5,
+                 time_budget: float = 10.0, max_llm_calls: int = 50):
+        if reranker not in RERANKERS:
+            raise ValueError(f"Unknown reranker {reranker!r}, expected one of {RERANKERS}")
+        self.reranker = reranker
+        self.shortlist_size = shortlist_size
+        self.rerank_weight = rerank_weight
+        self.time_budget = time_budget
+        self.max_llm_calls = max_llm_calls
+
+    @classmethod
+    def from_env(cls) -> "RankingConfig":
+        return cls(
+            reranker=os.getenv("SYNAPSE_RERANKER", "none").lower(),
+            shortlist_size=int(os.getenv("SYNAPSE_SHORTLIST_SIZE", "50")),
+            rerank_weight=float(os.getenv("SYNAPSE_RERANK_WEIGHT", "0.5")),
+            time_budget=float(os.getenv("SYNAPSE_RERANK_TIME_BUDGET", "10")),
+            max_llm_calls=int(os.getenv("SYNAPSE_RERANK_MAX_LLM_CALLS", "50")),
+        )
+
+
+@lru_cache(maxsize=128)
+def job_phrases(job_description: str) -> FrozenSet[str]:
+    """Skill phrases of a job description, extracted once per job rather than per candidate"""
+    return job_skill_phrases(job_description.lower())
+
+
+class SemanticReranker:
+    """Scores a candidate 0-10 by how closely their three most relevant skills match the job"""
+
+    name = "semantic"
+    uses_llm = False
+
+    def score(self, candidate: Dict[str, Any], job_description: str) -> Optional[float]:
+        candidate = parse_candidate(candidate)
+        relevances = sorted(SKILL_INDEX.skill_relevances(candidate["skill_set"], job_phrases(job_description)), reverse=True)
+        return 10 * sum(relevances[:3]) / 3
+
+
+class LLMReranker:
+    """Asks the model to judge a candidate's fit on a 1-10 scale"""
+
+    name = "llm"
+    uses_llm = True
+
+    def __init__(self, model):
+        self.model = model
+
+    def score(self, candidate: Dict[str, Any], job_description: str) -> Optional[float]:
+        prompt = f"""
+        Rate how well this candidate fits the job on a scale from 1 to 10.
+
+        Candidate: {candidate['name']}
+        Current Role: {candidate['headline']}
+        Experience: {candidate['experience']}
+        Education: {candidate['education']}
+        Skills: {candidate['skills']}
+        Company: {candidate['company']}
+        Location: {candidate['location']}
+
+        Job Description: {job_description}
+
+        Respond with JSON only: {{"score": <1-10>, "reason": "<one sentence>"}}
+        """
+
+        reservation = llm_budget.reserve(estimate_tokens(prompt), RERANK_OUTPUT_TOKENS)
+        if reservation is None:
+            # Out of tokens: the candidate keeps its stage one position
+            llm_budget.record_degradation("rerank", "skipped")
+            return None
+
+        try:
+            with timed_llm_call():
+                response = self.model.generate_content(prompt)
+            return self.parse_score(response.text)
+        except Exception:
+            metrics.LLM_FALLBACKS.labels("rerank").inc()
+            return None
+        finally:
+            reservation.release()
+
+    @staticmethod
+    def parse_score(text: str) -> float:
+        try:
+            score = float(parse_json_text(text)["score"])
+        except (ValueError, KeyError, TypeError):
+            # Truncated or chatty output usually still contains the score
+            match = _SCORE_PATTERN.search(text)
+            if not match:
+                raise
+            score = float(match.group(1))
+        return min(max(score, 0.0), 10.0)
+
+
+def build_reranker(config: RankingConfig, model=None):
+    """Return the stage two scorer for a config, or None when re-ranking is off"""
+    if config.reranker == "semantic":
+        return SemanticReranker()
+    if config.reranker == "llm":
+        if model is None:
+            raise ValueError("The llm reranker needs a model backend")
+        return LLMReranker(model)
+    return None
+
+
+def rerank_shortlist(ranked: List[Dict[str, Any]], job_description: str, reranker, config: RankingConfig) -> List[Dict[str, Any]]:
+    """
+    Re-rank the head of a stage one ranking.
+
+    The top shortlist_size candidates are scored by the reranker, best stage
+    one score first, until the time or LLM call budget runs out. Each gets a
+    rerank_score and a final_score blending it with the rubric fit_score, and
+    they are reordered by final_score. Shortlisted candidates the budget did
+    not reach, or whose scoring failed, follow in stage one order, then the
+    rest of the ranking.
+
+    Args:
+        ranked: Stage one ranking, best first, with fit_score set
+        job_description: Job to score against
+        reranker: Object from build_reranker, or None to keep stage one order
+        config: Ranking configuration with the shortlist size and budgets
+
+    Returns:
+        The new ranking; re-ranked candidates are copies with the extra scores
+    """
+    if reranker is None or not ranked:
+        return ranked
+
+    shortlist, rest = ranked[:config.shortlist_size], ranked[config.shortlist_size:]
+    deadline = time.perf_counter() + config.time_budget
+    llm_calls = 0
+    reranked, unreached = [], []
+
+    with timed_stage("rerank") as record:
+        for candidate in shortlist:
+            over_budget = time.perf_counter() >= deadline or (reranker.uses_llm and llm_calls >= config.max_llm_calls)
+            if over_budget:
+                unreached.append(candidate)
+                continue
+            llm_calls += reranker.uses_llm
+            score = reranker.score(candidate, job_description)
+            if score is None:
+                unreached.append(candidate)
+                continue
+            final_score = (1 - config.rerank_weight) * candidate["fit_score"] + config.rerank_weight * score
+            reranked.append({**candidate, "rerank_score": round(score, 1), "final_score": round(final_score, 1)})
+        record["items"] = len(reranked)
+
+    # Stable sort keeps stage one order among equal final scores
+    reranked.sort(key=lambda candidate: candidate["final_score"], reverse=True)
+    return reranked + unreached + rest
@@ -0,0 +1,230 @@
+"""
+LLM Rate Limiting
+Limits shared by every LLM caller in the process:
+
+- a token bucket, so concurrent calls stay under the provider's
+  requests-per-minute quota instead of being spaced out with fixed sleeps
+- an adaptive (AIMD) concurrency limit, which grows while calls are fast
+  and succeed and is halved on 429s, timeouts and sustained latency rises,
+  so throughput tracks what the provider can actually serve
+
+Configured with:
+
+    SYNAPSE_LLM_RPM              requests per minute (default 60)
+    SYNAPSE_LLM_BURST            requests allowed back to back before pacing starts (default 10)
+    SYNAPSE_LLM_CONCURRENCY      starting concurrency limit (default 4)
+    SYNAPSE_LLM_MAX_CONCURRENCY  ceiling for the concurrency limit (default 32)
+    SYNAPSE_LLM_MAX_RETRIES      retries of a rate limited (429/503) call (default 3)
+"""
+
+import os
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional, Tuple
+
+import metrics
+from llm_backend import LLMStreamResponse
+
+# Status codes meaning the provider is overloaded; the concurrency limit backs off
+OVERLOAD_CODES = (408, 429, 503, 504)
+# Of those, the ones worth retrying after a pause
+RETRY_CODES = (429, 503)
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    acquire() reserves the next token and sleeps until it is due, outside the
+    lock, so waiting callers are released in arrival order at the bucket's rate.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(
+            rate_per_second=float(os.getenv("SYNAPSE_LLM_RPM", "60")) / 60,
+            burst=int(os.getenv("SYNAPSE_LLM_BURST", "10")),
+        )
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a token; returns False, without taking one, if that would take longer than timeout"""
+        if self.rate <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            if timeout is not None and wait > timeout:
+                return False
+            self.tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+
+# Shared by every LLM call site in the process
+LLM_RATE_LIMITER = RateLimiter.from_env()
+
+
+def error_code(error: BaseException) -> Optional[int]:
+    """HTTP-style status of an LLM error (LLMError and google.api_core exceptions carry .code)"""
+    code = getattr(error, "code", None)
+    if callable(code):  # grpc errors expose code() instead
+        return None
+    try:
+        return int(code) if code is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Additive-increase, multiplicative-decrease limit on concurrent LLM calls.
+
+    Every limit's worth of healthy calls raises the limit by one, so it grows
+    by about one per round of calls. A call that is rate limited or times
+    out multiplies it by backoff, and so does a latency rise that persists:
+    the median of the last latency_window successful calls exceeding
+    latency_tolerance times the long-run average. A single slow call, which
+    log-normal latencies produce all the time, moves the median very little.
+    Only calls started after the last cut can cut again, so one burst of
+    failures counts once.
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32, backoff: float = 0.5,
+                 latency_tolerance: float = 2.0, latency_window: int = 20, max_retries: int = 3, retry_delay: float = 1.0):
+        self.limit = float(min(max(initial, min_limit), max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.in_flight = 0
+        self.successes = 0
+        self.average_latency: Optional[float] = None
+        self.recent_latencies: deque = deque(maxlen=latency_window)
+        self.last_cut = float("-inf")
+        self.condition = threading.Condition()
+        metrics.LLM_CONCURRENCY_LIMIT.set(int(self.limit))
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveConcurrencyLimiter":
+        return cls(
+            initial=int(os.getenv("SYNAPSE_LLM_CONCURRENCY", "4")),
+            max_limit=int(os.getenv("SYNAPSE_LLM_MAX_CONCURRENCY", "32")),
+            max_retries=int(os.getenv("SYNAPSE_LLM_MAX_RETRIES", "3")),
+        )
+
+    def acquire(self) -> float:
+        """Wait for a free slot; returns the start time to pass to release()"""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+            metrics.LLM_IN_FLIGHT.set(self.in_flight)
+        return time.monotonic()
+
+    def release(self, started: float, error: Optional[BaseException] = None):
+        """Free a slot and adjust the limit from the call's outcome"""
+        latency = time.monotonic() - started
+        with self.condition:
+            self.in_flight -= 1
+            if error is not None:
+                overloaded = isinstance(error, TimeoutError) or error_code(error) in OVERLOAD_CODES
+            else:
+                self.recent_latencies.append(latency)
+                overloaded = (
+                    self.average_latency is not None
+                    and len(self.recent_latencies) == self.recent_latencies.maxlen
+                    and statistics.median(self.recent_latencies) > self.average_latency * self.latency_tolerance
+                )
+                # The average follows every success, slowly, so a lasting slowdown becomes the new normal
+                self.average_latency = latency if self.average_latency is None else 0.98 * self.average_latency + 0.02 * latency
+
+            if overloaded:
+                if started >= self.last_cut:
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.last_cut = time.monotonic()
+                    self.successes = 0
+                    # The next cut needs a full window of latencies measured at the new limit
+                    self.recent_latencies.clear()
+            elif error is None:
+                self.successes += 1
+                if self.successes >= int(self.limit):
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self.successes = 0
+
+            metrics.LLM_CONCURRENCY_LIMIT.set(int(self.limit))
+            metrics.LLM_IN_FLIGHT.set(self.in_flight)
+            self.condition.notify_all()
+
+    def start(self, fn: Callable[..., Any], *args, rate_limiter: Optional[RateLimiter] = None, **kwargs) -> Tuple[float, Any]:
+        """
+        Run fn in a slot, retrying rate limited calls with jittered exponential backoff.
+
+        Every attempt, retries included, first takes a token from rate_limiter
+        when one is given. The slot of the attempt that succeeded is still
+        held; pass the returned start time to release() once the call is done.
+
+        Returns:
+            (start time, fn's result)
+        """
+        for attempt in range(self.max_retries + 1):
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            started = self.acquire()
+            try:
+                return started, fn(*args, **kwargs)
+            except Exception as error:
+                self.release(started, error)
+                if error_code(error) not in RETRY_CODES or attempt == self.max_retries:
+                    raise
+                metrics.LLM_RETRIES.inc()
+                time.sleep(self.retry_delay * 2 ** attempt * random.uniform(0.5, 1.0))
+
+    def call(self, fn: Callable[..., Any], *args, rate_limiter: Optional[RateLimiter] = None, **kwargs) -> Any:
+        """Run fn in a slot, as start() does, and free the slot when it returns"""
+        started, result = self.start(fn, *args, rate_limiter=rate_limiter, **kwargs)
+        self.release(started)
+        return result
+
+
+class AdaptiveModel:
+    """
+    Model backend whose generate_content calls go through an AdaptiveConcurrencyLimiter,
+    and through a rate limiter when one is given.
+
+    A streamed call keeps its slot, and its latency keeps counting, until the
+    stream has been read to the end or closed.
+    """
+
+    def __init__(self, model, limiter: AdaptiveConcurrencyLimiter, rate_limiter: Optional[RateLimiter] = None):
+        self.model = model
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        if not stream:
+            return self.limiter.call(self.model.generate_content, prompt, stream=False, rate_limiter=self.rate_limiter, **kwargs)
+        started, response = self.limiter.start(self.model.generate_content, prompt, stream=True, rate_limiter=self.rate_limiter, **kwargs)
+        return LLMStreamResponse(response, on_finish=lambda _, error: self.limiter.release(started, error))
+
+    def __getattr__(self, name: str) -> Any:
+        # name, usage() and the rest come from the wrapped backend
+        return getattr(self.model, name)
+
+
+# Shared by every model wrapped in AdaptiveModel in the process
+LLM_CONCURRENCY = AdaptiveConcurrencyLimiter.from_env()
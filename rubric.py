@@ -0,0 +1,158 @@
+"""
+Fit Score Rubric Dependencies
+Declares which candidate fields and job inputs each rubric dimension reads,
+so a dimension is only re-scored when one of its inputs actually changes,
+and each dimension's best possible score and relative cost, so top-K scoring
+can stop evaluating a candidate that can no longer make the cut.
+"""
+
+import heapq
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from candidate_parser import SCORE_CACHE_FIELD
+
+# Dimension -> inputs it depends on. Candidate inputs are fields added by
+# candidate_parser.parse_candidate, job inputs are keys of candidate_parser.parse_job.
+RUBRIC_DEPENDENCIES = {
+    "education": {"candidate": ("school_tier",), "job": ()},
+    "trajectory": {"candidate": ("experience_years",), "job": ()},
+    "company": {"candidate": ("company_tier",), "job": ()},
+    "skills": {"candidate": ("skill_set",), "job": ("skill_terms",)},
+    "location": {"candidate": ("location_normalized",), "job": ("mountain_view", "california", "remote")},
+    "tenure": {"candidate": ("tenure_months",), "job": ()},
+}
+
+# Highest score each dimension's scorer can return
+DIMENSION_MAX_SCORES = {
+    "education": 9.5,
+    "trajectory": 8.0,
+    "company": 9.0,
+    "skills": 9.0,
+    "location": 10.0,
+    "tenure": 9.0,
+}
+
+# Relative cost of scoring each dimension; cheap dimensions are evaluated
+# first so expensive ones (e.g. model-based matching) are the ones skipped
+DIMENSION_COSTS = {
+    "education": 1,
+    "trajectory": 1,
+    "company": 1,
+    "tenure": 1,
+    "location": 2,
+    "skills": 3,
+}
+
+DIMENSIONS = tuple(RUBRIC_DEPENDENCIES)
+SCORING_ORDER = tuple(sorted(DIMENSIONS, key=lambda dimension: DIMENSION_COSTS[dimension]))
+JOB_INDEPENDENT_DIMENSIONS = tuple(d for d, deps in RUBRIC_DEPENDENCIES.items() if not deps["job"])
+JOB_DEPENDENT_DIMENSIONS = tuple(d for d, deps in RUBRIC_DEPENDENCIES.items() if deps["job"])
+
+
+def job_inputs(dimension: str, job: Dict[str, Any]) -> Tuple:
+    """Return the values of the job inputs a dimension depends on"""
+    return tuple(job[key] for key in RUBRIC_DEPENDENCIES[dimension]["job"])
+
+
+def fit_score(breakdown: Dict[str, float]) -> float:
+    """Overall fit score: the mean of the dimension scores, to one decimal"""
+    return round(sum(breakdown.values()) / len(breakdown), 1)
+
+
+def incremental_breakdown(
+    candidate: Dict[str, Any],
+    job: Dict[str, Any],
+    score_dimension: Callable[[str, Dict[str, Any], Dict[str, Any]], float],
+    threshold: Optional[float] = None,
+) -> Optional[Dict[str, float]]:
+    """
+    Score every rubric dimension, reusing the candidate's cached scores.
+
+    Each cached score remembers the job inputs it was computed from, so a new
+    job description only re-scores the dimensions whose job inputs changed.
+    Job-independent dimensions (education, trajectory, company, tenure) are
+    scored once per candidate.
+
+    With a threshold, cached scores are used first and the rest are scored
+    cheapest first; as soon as the best fit score still reachable (remaining
+    dimensions at their maximum) is no higher than the threshold, scoring
+    stops and None is returned.
+
+    Args:
+        candidate: Parsed candidate dictionary
+        job: Parsed job inputs from candidate_parser.parse_job
+        score_dimension: Callable scoring one dimension for (dimension, candidate, job)
+        threshold: Fit score the candidate must beat, e.g. the current K-th best
+
+    Returns:
+        Score breakdown keyed by dimension, or None if the candidate was pruned
+    """
+    cache = candidate.get(SCORE_CACHE_FIELD)
+    if cache is None:
+        cache = candidate[SCORE_CACHE_FIELD] = {}
+
+    scores = {}
+    pending = []
+    for dimension in SCORING_ORDER:
+        cached = cache.get(dimension)
+        if cached is not None and cached[0] == job_inputs(dimension, job):
+            scores[dimension] = cached[1]
+        else:
+            pending.append(dimension)
+
+    if threshold is not None:
+        upper_bound = sum(scores.values()) + sum(DIMENSION_MAX_SCORES[dimension] for dimension in pending)
+    for dimension in pending:
+        if threshold is not None and _cannot_beat(upper_bound, threshold):
+            return None
+        score = score_dimension(dimension, candidate, job)
+        cache[dimension] = (job_inputs(dimension, job), score)
+        scores[dimension] = score
+        if threshold is not None:
+            upper_bound -= DIMENSION_MAX_SCORES[dimension] - score
+
+    # Dimension order fixes the summation order, and so the exact fit score
+    breakdown = {dimension: scores[dimension] for dimension in DIMENSIONS}
+    if threshold is not None and fit_score(breakdown) <= threshold:
+        return None
+    return breakdown
+
+
+def _cannot_beat(upper_bound: float, threshold: float) -> bool:
+    """True if even a total of upper_bound would not round above threshold"""
+    # The margin absorbs float drift in the running bound, so pruning never
+    # drops a candidate whose exact fit score would have made the cut
+    return round(upper_bound / len(DIMENSIONS) + 1e-9, 1) <= threshold
+
+
+class TopK:
+    """
+    Running top K items by fit score.
+
+    Ties keep arrival order, exactly like heapq.nlargest over the same
+    sequence, and threshold is the score a new item has to beat once K
+    items are held.
+    """
+
+    def __init__(self, k: int):
+        self.k = k
+        self.heap: List[Tuple[float, int, Any]] = []
+        self.count = 0
+
+    @property
+    def threshold(self) -> Optional[float]:
+        if self.k > 0 and len(self.heap) >= self.k:
+            return self.heap[0][0]
+        return None
+
+    def push(self, score: float, item: Any):
+        # Earlier arrivals get larger tie-breakers, so they win ties
+        entry = (score, -self.count, item)
+        self.count += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif self.k > 0 and entry[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self) -> List[Any]:
+        """Held items, best first"""
+        return [item for _, _, item in sorted(self.heap, key=lambda entry: entry[:2], reverse=True)]
@@ -0,0 +1,116 @@
+"""
+Fit Score Rubric Scorers
+Scores each rubric dimension of a parsed candidate against a parsed job.
+Plain functions with no side effects at import, shared by the CLI, the
+API, the Streamlit apps and columnar pool scoring (see candidate_pool.py).
+Each scorer's highest score is declared in rubric.DIMENSION_MAX_SCORES.
+"""
+
+from typing import Dict, Any, FrozenSet, Optional
+from skill_embeddings import skill_matches
+
+
+def score_dimension(dimension: str, candidate: Dict[str, Any], job: Dict[str, Any]) -> float:
+    """Score a single rubric dimension for a parsed candidate"""
+    # Education (20%)
+    if dimension == "education":
+        return score_education(candidate["school_tier"])
+
+    # Career Trajectory (20%)
+    elif dimension == "trajectory":
+        return score_trajectory(candidate["experience_years"])
+
+    # Company Relevance (15%)
+    elif dimension == "company":
+        return score_company(candidate["company_tier"])
+
+    # Experience Match (25%)
+    elif dimension == "skills":
+        return score_experience(candidate["skill_set"], job)
+
+    # Location Match (10%)
+    elif dimension == "location":
+        return score_location(candidate["location_normalized"], job)
+
+    # Tenure (10%)
+    elif dimension == "tenure":
+        return score_tenure(candidate["tenure_months"])
+
+    raise ValueError(f"Unknown rubric dimension: {dimension}")
+
+
+def score_education(school_tier: str) -> float:
+    """Score education based on school prestige"""
+    if school_tier == "elite":
+        return 9.5
+    elif school_tier == "strong":
+        return 7.5
+    else:
+        return 6.0
+
+
+def score_trajectory(experience_years: Optional[int]) -> float:
+    """Score career trajectory"""
+    if experience_years is None:
+        return 5.0
+    elif experience_years >= 5:
+        return 8.0
+    elif experience_years >= 3:
+        return 7.0
+    elif experience_years >= 1:
+        return 6.0
+    else:
+        return 4.0
+
+
+def score_company(company_tier: str) -> float:
+    """Score company relevance"""
+    if company_tier == "top":
+        return 9.0
+    elif company_tier == "relevant":
+        return 7.5
+    elif company_tier == "industry":
+        return 7.0
+    else:
+        return 6.0
+
+
+def score_experience(skill_set: FrozenSet[str], job: Dict[str, Any]) -> float:
+    """Score experience/skills match"""
+    # Count the candidate's skills that match the job (exact or semantic, see skill_embeddings)
+    matches = skill_matches(skill_set, job["skill_terms"])
+
+    if matches >= 3:
+        return 9.0
+    elif matches >= 2:
+        return 7.5
+    elif matches >= 1:
+        return 6.0
+    else:
+        return 4.0
+
+
+def score_location(location: str, job: Dict[str, Any]) -> float:
+    """Score location match"""
+    if job["mountain_view"] and "mountain view" in location:
+        return 10.0
+    elif job["california"] and "california" in location:
+        return 8.0
+    elif job["remote"]:
+        return 6.0
+    else:
+        return 4.0
+
+
+def score_tenure(tenure_months: Optional[int]) -> float:
+    """Score tenure at current role"""
+    if tenure_months is None:
+        return 5.0
+    elif 24 <= tenure_months < 60:
+        return 9.0
+    elif 12 <= tenure_months < 24:
+        return 7.0
+    elif tenure_months >= 60:
+        return 6.0
+    else:
+        return 4.0
@@ -0,0 +1,35 @@
+"""
+Fast JSON Serialization
+Response encoding for payloads that are already plain dicts, lists, strings
+and numbers. orjson is used when it is installed and is several times faster;
+otherwise the standard library encoder with compact separators.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Encode plain data as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response that skips FastAPI's response model validation.
+
+    Return it directly from an endpoint with content that already matches
+    the endpoint's response_model; the model still documents the schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
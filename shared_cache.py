@@ -0,0 +1,249 @@
+"""
+Shared Cache
+A cache tier shared by every worker process on a host, so a job description
+computed by one uvicorn/gunicorn worker is a hit on all the others. It holds
+sourcing results, job profiles and LLM responses.
+
+Values are JSON (never pickle, since other processes write the entries)
+under a namespace and a key, with an optional TTL. Backends implement the
+SharedCache interface:
+
+    MemoryCache   in-process LRU, for a single worker
+    SQLiteCache   one SQLite file in WAL mode, shared by all local workers (default)
+    RedisCache    a Redis server, for workers on several hosts (needs the redis package)
+
+Configured with:
+
+    SYNAPSE_SHARED_CACHE              sqlite (default), memory, off, or a redis:// URL
+    SYNAPSE_SHARED_CACHE_PATH         SQLite file (default synapse_cache.db)
+    SYNAPSE_SHARED_CACHE_MAX_ENTRIES  entries kept before least recently used ones are evicted (default 10000)
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+import metrics
+
+DEFAULT_MAX_ENTRIES = 10_000
+# Evictions are checked once per this many writes rather than on every write
+EVICTION_INTERVAL = 100
+# Hits refresh an entry's recency at most this often, so reads rarely write
+TOUCH_INTERVAL = 60.0
+
+
+def cache_key(*parts: Any) -> str:
+    """Stable key for a tuple of parameters (a job description, top K, a prompt, ...)"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+class SharedCache:
+    """Interface: JSON values by (namespace, key), with optional expiry in seconds"""
+
+    name = "base"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value, or compute, store and return it; None results are not cached"""
+        value = self.get(namespace, key)
+        metrics.record_cache(namespace, value is not None)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(namespace, key, value, ttl)
+        return value
+
+
+class NullCache(SharedCache):
+    """Caching switched off"""
+
+    name = "off"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        pass
+
+    def delete(self, namespace: str, key: str):
+        pass
+
+
+class MemoryCache(SharedCache):
+    name = "memory"
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[str, Optional[float]]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.time():
+                del self.entries[(namespace, key)]
+                return None
+            self.entries.move_to_end((namespace, key))
+        # Stored encoded, so callers can't mutate a cached value in place
+        return json.loads(entry[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        entry = (_encode(value), time.time() + ttl if ttl else None)
+        with self.lock:
+            self.entries[(namespace, key)] = entry
+            self.entries.move_to_end((namespace, key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, namespace: str, key: str):
+        with self.lock:
+            self.entries.pop((namespace, key), None)
+
+
+class SQLiteCache(SharedCache):
+    """
+    Cache in a local SQLite file.
+
+    WAL mode lets every worker read while one writes. Expired entries are
+    dropped when read and in periodic sweeps; the sweeps also evict the least
+    recently used entries beyond max_entries.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str = "synapse_cache.db", max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        # FastAPI calls in from different threads; access is serialized by the lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.init_database()
+
+    def init_database(self):
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_accessed_at ON cache_entries (accessed_at)")
+            self.conn.commit()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            if expires_at is not None and expires_at <= now:
+                self.conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+                self.conn.commit()
+                return None
+            if now - accessed_at >= TOUCH_INTERVAL:
+                self.conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+                self.conn.commit()
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, _encode(value), now + ttl if ttl else None, now)
+            )
+            self.writes += 1
+            if self.writes % EVICTION_INTERVAL == 0:
+                self._evict(now)
+            self.conn.commit()
+
+    def delete(self, namespace: str, key: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+            self.conn.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        with self.lock:
+            self._evict(time.time())
+            self.conn.commit()
+
+    def _evict(self, now: float):
+        self.conn.execute("DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()
+        if count > self.max_entries:
+            self.conn.execute('''
+                DELETE FROM cache_entries WHERE (namespace, key) IN (
+                    SELECT namespace, key FROM cache_entries ORDER BY accessed_at LIMIT ?
+                )
+            ''', (count - self.max_entries,))
+
+
+class RedisCache(SharedCache):
+    """Cache in Redis; expiry is native and eviction follows the server's maxmemory policy"""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        value = self.client.get(f"synapse:{namespace}:{key}")
+        return None if value is None else json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        self.client.set(f"synapse:{namespace}:{key}", _encode(value), px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, namespace: str, key: str):
+        self.client.delete(f"synapse:{namespace}:{key}")
+
+
+def load_cache() -> SharedCache:
+    """Create the cache selected by SYNAPSE_SHARED_CACHE"""
+    backend = os.getenv("SYNAPSE_SHARED_CACHE", "sqlite")
+    max_entries = int(os.getenv("SYNAPSE_SHARED_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES)))
+    if backend.startswith(("redis://", "rediss://")):
+        return RedisCache(backend)
+    backend = backend.lower()
+    if backend == "sqlite":
+        return SQLiteCache(os.getenv("SYNAPSE_SHARED_CACHE_PATH", "synapse_cache.db"), max_entries)
+    if backend == "memory":
+        return MemoryCache(max_entries)
+    if backend in ("off", "none"):
+        return NullCache()
+    raise ValueError(f"Unknown SYNAPSE_SHARED_CACHE: {backend}")
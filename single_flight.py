@@ -0,0 +1,45 @@
+"""
+Request Coalescing
+Single-flight execution for async endpoints: while a computation for a key
+is running, identical requests await the same result instead of starting
+their own. The work runs in the thread pool, so blocking pipeline code
+doesn't stall the event loop meanwhile.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict
+
+from starlette.concurrency import run_in_threadpool
+
+import metrics
+
+
+class SingleFlight:
+    """
+    At most one in-flight computation per key, shared by every caller.
+
+    The computation runs as its own task, so a caller disconnecting (and
+    being cancelled) does not cancel it for the others. Results are not
+    kept once the computation finishes; pair with a cache for that.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.in_flight: Dict[str, asyncio.Task] = {}
+
+    async def run(self, key: str, compute: Callable[[], Any]) -> Any:
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run_in_threadpool(compute))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            metrics.COALESCED_REQUESTS.labels(self.name).inc()
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self.in_flight.get(key) is task:
+            del self.in_flight[key]
+        # Mark a failure as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
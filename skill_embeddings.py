@@ -0,0 +1,231 @@
+"""
+Semantic Skill Matching
+Hashed character n-gram embeddings for skills, enriched with a small skill
+concept lexicon so related skills ("Transformers", "LLMs", "JAX", "PyTorch")
+land near each other. Everything runs locally on the CPU with NumPy.
+
+Candidate skills are embedded once, at ingest, into a shared SkillIndex. A
+job is embedded once as the set of its 1-3 word phrases, and one matrix
+product against the index gives every known skill its relevance to the job;
+scoring a candidate is then a handful of dictionary lookups.
+
+The mode is chosen by SYNAPSE_SKILL_MATCHING: "keyword" (default, exact
+matches against the rubric's skill terms) or "semantic".
+"""
+
+import os
+import re
+import threading
+import zlib
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+import numpy as np
+
+SKILL_MATCHING = os.getenv("SYNAPSE_SKILL_MATCHING", "keyword").lower()
+
+EMBEDDING_DIM = 1024
+NGRAM_SIZE = 3
+# Weight of a shared concept relative to the unit-norm character n-gram part;
+# two skills sharing only one concept score about 0.6 (0.47 if one of them
+# belongs to two concepts), while unrelated skills rarely pass 0.35
+CONCEPT_WEIGHT = 1.2
+# Cosine similarity at which a candidate skill counts as matching the job
+MATCH_THRESHOLD = 0.45
+# Cached job relevance vectors
+MAX_CACHED_JOBS = 16
+
+# Concept -> aliases; skills that are aliases of a concept share its feature
+SKILL_CONCEPTS = {
+    "machine learning": ["machine learning", "ml", "ai", "artificial intelligence", "scikit-learn", "sklearn", "xgboost"],
+    "deep learning": ["deep learning", "neural networks", "neural network", "pytorch", "tensorflow", "jax", "keras", "transformers", "cuda"],
+    "language models": ["llm", "large language models", "large language model", "transformers", "nlp", "natural language processing",
+                        "code generation", "rag", "fine tuning", "fine-tuning", "hugging face", "huggingface", "prompt engineering"],
+    "computer vision": ["computer vision", "opencv", "image recognition", "object detection"],
+    "python data": ["python", "numpy", "pandas", "jupyter"],
+    "ml infrastructure": ["mlops", "ml infrastructure", "distributed training", "kubernetes", "docker", "ray"],
+    "cloud": ["aws", "gcp", "azure", "cloud"],
+}
+
+_STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or our the their this to we with you your
+will who what how can all into about over more than any such via using work working build building team
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+
+
+def normalize_skill(skill: str) -> str:
+    return " ".join(str(skill).lower().split())
+
+
+def _singular(text: str) -> str:
+    return text[:-1] if len(text) > 3 and text.endswith("s") and not text.endswith("ss") else text
+
+
+_CONCEPT_INDEX: Dict[str, List[str]] = {}
+for _concept, _aliases in SKILL_CONCEPTS.items():
+    for _alias in _aliases:
+        _CONCEPT_INDEX.setdefault(_singular(normalize_skill(_alias)), []).append(_concept)
+
+
+def _feature(name: str):
+    """Stable bucket and sign for a feature string"""
+    digest = zlib.crc32(name.encode("utf-8"))
+    return digest % EMBEDDING_DIM, 1.0 if digest & 0x80000000 else -1.0
+
+
+def embed(text: str) -> np.ndarray:
+    """Unit-length embedding of one skill or phrase"""
+    text = _singular(normalize_skill(text))
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+
+    padded = f"^{text}$"
+    for start in range(max(1, len(padded) - NGRAM_SIZE + 1)):
+        bucket, sign = _feature(padded[start:start + NGRAM_SIZE])
+        vector[bucket] += sign
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+
+    for concept in _CONCEPT_INDEX.get(text, ()):
+        bucket, sign = _feature(f"concept:{concept}")
+        vector[bucket] += sign * CONCEPT_WEIGHT
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def job_skill_phrases(job_lower: str) -> FrozenSet[str]:
+    """1-3 word phrases of a job description that could name a skill"""
+    tokens = _TOKEN.findall(job_lower)
+    phrases = set()
+    for size in (1, 2, 3):
+        for start in range(len(tokens) - size + 1):
+            words = tokens[start:start + size]
+            if words[0] in _STOP_WORDS or words[-1] in _STOP_WORDS:
+                continue
+            phrases.add(" ".join(word.strip(".-") for word in words))
+    phrases.discard("")
+    return frozenset(phrases)
+
+
+class SkillIndex:
+    """
+    Embeddings of every skill seen so far, plus cached per-job relevance.
+
+    Skills are appended as they are ingested; a job's relevance is computed
+    for the whole vocabulary with one matrix product and extended the same
+    way when new skills arrive later.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows: Dict[str, int] = {}
+        self.vectors = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        self.jobs: Dict[FrozenSet[str], np.ndarray] = {}  # job phrases -> phrase embeddings
+        self.relevance: Dict[FrozenSet[str], np.ndarray] = {}  # job phrases -> relevance per skill row
+
+    def add(self, skills: Iterable[str]):
+        """Embed skills not yet in the index"""
+        pending = {normalize_skill(skill) for skill in skills} - self.rows.keys()
+        if not pending:
+            return
+        with self.lock:
+            new = [skill for skill in pending if skill not in self.rows]
+            if not new:
+                return
+            for skill in new:
+                self.rows[skill] = len(self.rows)
+            self.vectors = np.concatenate([self.vectors, np.stack([embed(skill) for skill in new])])
+
+    def job_relevance(self, phrases: FrozenSet[str]) -> np.ndarray:
+        """Best cosine similarity between each indexed skill and any phrase of the job"""
+        relevance = self.relevance.get(phrases)
+        if relevance is not None and len(relevance) == len(self.rows):
+            return relevance
+        with self.lock:
+            relevance = self.relevance.get(phrases)
+            if relevance is not None and len(relevance) == len(self.rows):
+                return relevance
+
+            job_vectors = self.jobs.get(phrases)
+            if job_vectors is None:
+                if len(self.jobs) >= MAX_CACHED_JOBS:
+                    oldest = next(iter(self.jobs))
+                    del self.jobs[oldest]
+                    self.relevance.pop(oldest, None)
+                job_vectors = self.jobs[phrases] = np.stack([embed(phrase) for phrase in phrases]) if phrases else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+            known = 0 if relevance is None else len(relevance)
+            new_rows = self.vectors[known:]
+            if len(job_vectors):
+                added = (new_rows @ job_vectors.T).max(axis=1)
+            else:
+                added = np.zeros(len(new_rows), dtype=np.float32)
+            relevance = added if relevance is None else np.concatenate([relevance, added])
+            self.relevance[phrases] = relevance
+            return relevance
+
+    def skill_relevances(self, skill_set: FrozenSet[str], phrases: FrozenSet[str]) -> List[float]:
+        """Relevance to the job of each of the candidate's skills"""
+        skills = distinct_skills(skill_set)
+        self.add(skills)
+        relevance = self.job_relevance(phrases)
+        return [float(relevance[self.rows[skill]]) for skill in skills]
+
+    def match_count(self, skill_set: FrozenSet[str], phrases: FrozenSet[str]) -> int:
+        """Number of the candidate's skills that semantically match the job"""
+        return sum(1 for value in self.skill_relevances(skill_set, phrases) if value >= MATCH_THRESHOLD)
+
+    def matches(self, skills: List[str], phrases: FrozenSet[str]) -> np.ndarray:
+        """Whether each of a list of skills semantically matches the job"""
+        self.add(skills)
+        relevance = self.job_relevance(phrases)
+        rows = np.fromiter((self.rows[normalize_skill(skill)] for skill in skills), dtype=np.int64, count=len(skills))
+        return relevance[rows] >= MATCH_THRESHOLD
+
+    def save(self, path: str, skills: Optional[Iterable[str]] = None):
+        """Write embeddings (all, or only the given skills) to an .npz file"""
+        with self.lock:
+            names = sorted(self.rows) if skills is None else sorted({normalize_skill(skill) for skill in skills} & self.rows.keys())
+            vectors = self.vectors[[self.rows[name] for name in names]] if names else np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        np.savez(path, skills=np.array(names, dtype=str), vectors=vectors)
+
+    def load(self, path: str):
+        """Merge precomputed embeddings from an .npz file written by save()"""
+        data = np.load(path)
+        names = [str(name) for name in data["skills"]]
+        vectors = data["vectors"]
+        with self.lock:
+            keep = [i for i, name in enumerate(names) if name not in self.rows]
+            for i in keep:
+                self.rows[names[i]] = len(self.rows)
+            if keep:
+                self.vectors = np.concatenate([self.vectors, vectors[keep].astype(np.float32)])
+
+
+SKILL_INDEX = SkillIndex()
+
+
+def distinct_skills(skill_set: FrozenSet[str]) -> List[str]:
+    """The candidate's skills counted once each; parse_skills stores plurals in both forms"""
+    return [skill for skill in skill_set if _singular(skill) == skill or _singular(skill) not in skill_set]
+
+
+def skill_matches(skill_set: FrozenSet[str], skill_terms: FrozenSet[str]) -> int:
+    """Skill matches for the experience score in the configured matching mode"""
+    if SKILL_MATCHING == "semantic":
+        return SKILL_INDEX.match_count(skill_set, skill_terms)
+    return len(skill_terms & skill_set)
+
+
+def vocabulary_matches(vocabulary: List[str], skill_terms: FrozenSet[str]) -> np.ndarray:
+    """
+    Whether each skill of a vocabulary matches the job, in the configured matching mode.
+
+    Counting a candidate's matching skills in this array gives skill_matches,
+    over distinct_skills in semantic mode.
+    """
+    if SKILL_MATCHING == "semantic":
+        return SKILL_INDEX.matches(vocabulary, skill_terms)
+    return np.fromiter((skill in skill_terms for skill in vocabulary), dtype=bool, count=len(vocabulary))